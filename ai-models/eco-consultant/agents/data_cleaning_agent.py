@@ -1,33 +1,149 @@
 # agents/data_cleaning_agent.py
 
 import os
+import tempfile
+import numpy as np
 import pandas as pd
 import logging
+from pandas.api.types import is_bool_dtype, is_float_dtype, is_numeric_dtype
+from storage.table_store import TableStore
+from monitoring.metrics import timed
+
+# Two independent 64-bit row hashes make a 128-bit key, so collisions are negligible
+HASH_KEYS = ('0123456789123456', 'fair-platform-02')
+PARTITION_BYTES = 64 * 2**20
 
 class DataCleaningAgent:
-    def __init__(self, raw_data_path, processed_data_path):
+    def __init__(self, raw_data_path, processed_data_path, chunksize=None, store=None):
         self.raw_data_path = raw_data_path
         self.processed_data_path = processed_data_path
-        os.makedirs(self.processed_data_path, exist_ok=True)
+        # Rows per chunk for streaming mode; None loads whole files
+        self.chunksize = chunksize
+        self.store = store or TableStore(processed_data_path)
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-    def clean_csv(self, file_name):
+    def clean_csv(self, file_name, chunksize=None):
         logging.info(f"Starting cleaning for {file_name}")
-        raw_file = os.path.join(self.raw_data_path, file_name)
-        processed_file = os.path.join(self.processed_data_path, file_name)
+        processed_file = self.store.path(file_name)
 
         try:
-            df = pd.read_csv(raw_file)
-            logging.info(f"Loaded data from {raw_file}")
-            # Example cleaning steps:
-            df.drop_duplicates(inplace=True)
-            logging.info("Dropped duplicates")
-            df.fillna(method='ffill', inplace=True)
-            logging.info("Filled missing values")
-            # More cleaning as per requirements
-
-            df.to_csv(processed_file, index=False)
+            with timed('cleaning', file=file_name) as timer, self.store.writer(file_name) as writer:
+                timer.rows = 0
+                for chunk in self.clean_chunks(file_name, chunksize):
+                    writer.write(chunk)
+                    timer.rows += len(chunk)
             logging.info(f"Data cleaned and saved to {processed_file}")
         except Exception as e:
             logging.error(f"Error cleaning {file_name}: {e}")
             raise
+
+    def clean_chunks(self, file_name, chunksize=None):
+        """Yield the cleaned data without writing it: the whole file as one frame,
+        or bounded chunks when a chunksize is set."""
+        raw_file = os.path.join(self.raw_data_path, file_name)
+        chunksize = chunksize or self.chunksize
+        if chunksize:
+            yield from self.clean_csv_streaming(raw_file, chunksize)
+            return
+        df = pd.read_csv(raw_file)
+        logging.info(f"Loaded data from {raw_file}")
+        # Example cleaning steps:
+        df.drop_duplicates(inplace=True)
+        logging.info("Dropped duplicates")
+        df.ffill(inplace=True)
+        logging.info("Filled missing values")
+        # More cleaning as per requirements
+        yield df
+
+    def clean_csv_streaming(self, raw_file, chunksize):
+        """Same output as the in-memory path with memory bounded by chunksize.
+
+        Pass 1 reads the file in chunks, hashes every row and spills (hash, row
+        number) records into hash partitions on disk, recording the dtypes pandas
+        inferred per chunk.  Rows only hash alike when their chunks were read
+        with the same dtypes, so if any column was inferred differently across
+        chunks (an all-null chunk of a text column, ints in one chunk and floats
+        in another) the hashing is redone with the dtypes the whole-file read
+        would have chosen.  Each partition is then deduplicated on its own,
+        marking later copies in an on-disk row bitmap.  Pass 2 rereads the file
+        with those dtypes, drops the marked rows and forward-fills, carrying the
+        last seen values across chunk boundaries.
+        """
+        n_partitions = int(min(1024, max(1, os.path.getsize(raw_file) // PARTITION_BYTES)))
+        with tempfile.TemporaryDirectory(dir=self.processed_data_path) as tmp_dir:
+            seen_dtypes, n_rows = _spill_row_hashes(raw_file, chunksize, tmp_dir, n_partitions)
+            dtypes = {column: _promote(set(column_dtypes)) for column, column_dtypes in seen_dtypes.items()}
+            if any(len(column_dtypes) > 1 for column_dtypes in seen_dtypes.values()):
+                logging.info("Chunk dtypes differ; hashing rows again with whole-file dtypes")
+                _spill_row_hashes(raw_file, chunksize, tmp_dir, n_partitions, dtype=dtypes)
+            duplicates = np.memmap(os.path.join(tmp_dir, 'duplicates'), dtype=bool, mode='w+', shape=(max(n_rows, 1),))
+            for partition in range(n_partitions):
+                _mark_duplicates(os.path.join(tmp_dir, f'{partition}.bin'), duplicates)
+            logging.info(f"Marked {int(duplicates[:n_rows].sum())} duplicate rows out of {n_rows}")
+
+            # Header-only input yields no chunks but should still give a header-only output
+            yield pd.read_csv(raw_file, nrows=0)
+            carry = None
+            offset = 0
+            for chunk in pd.read_csv(raw_file, chunksize=chunksize, dtype=dtypes):
+                keep = ~np.asarray(duplicates[offset:offset + len(chunk)])
+                offset += len(chunk)
+                chunk = chunk[keep].ffill()
+                if carry is not None:
+                    chunk = chunk.fillna(carry)
+                if len(chunk):
+                    carry = chunk.iloc[-1]
+                yield chunk
+            del duplicates
+
+
+def _spill_row_hashes(raw_file, chunksize, tmp_dir, n_partitions, dtype=None):
+    # Returns the dtypes seen per column and the row count; rewrites the partition files
+    seen_dtypes = {}
+    n_rows = 0
+    files = [open(os.path.join(tmp_dir, f'{p}.bin'), 'wb') for p in range(n_partitions)]
+    try:
+        for chunk in pd.read_csv(raw_file, chunksize=chunksize, dtype=dtype):
+            for column, dtype in chunk.dtypes.items():
+                seen_dtypes.setdefault(column, set()).add(dtype)
+            canonical = chunk.apply(_canonical_column)
+            records = np.empty((len(chunk), 3), dtype=np.uint64)
+            records[:, 0] = pd.util.hash_pandas_object(canonical, index=False, hash_key=HASH_KEYS[0]).to_numpy()
+            records[:, 1] = pd.util.hash_pandas_object(canonical, index=False, hash_key=HASH_KEYS[1]).to_numpy()
+            records[:, 2] = np.arange(n_rows, n_rows + len(chunk), dtype=np.uint64)
+            n_rows += len(chunk)
+            partitions = records[:, 0] % np.uint64(n_partitions)
+            for p in np.unique(partitions):
+                files[p].write(records[partitions == p].tobytes())
+    finally:
+        for f in files:
+            f.close()
+    return seen_dtypes, n_rows
+
+
+def _mark_duplicates(partition_file, duplicates):
+    records = np.fromfile(partition_file, dtype=np.uint64).reshape(-1, 3)
+    if len(records) == 0:
+        return
+    # Sort by key, then row number: every row after the first of its key is a duplicate
+    records = records[np.lexsort((records[:, 2], records[:, 1], records[:, 0]))]
+    repeat = np.zeros(len(records), dtype=bool)
+    repeat[1:] = (records[1:, 0] == records[:-1, 0]) & (records[1:, 1] == records[:-1, 1])
+    duplicates[records[repeat, 2].astype(np.int64)] = True
+
+
+def _canonical_column(series):
+    # Hashes see bits, drop_duplicates sees values: -0.0 + 0.0 is 0.0.  Other dtypes
+    # hash as read, so int64 ids stay exact
+    if is_float_dtype(series):
+        return series + 0.0
+    return series
+
+
+def _promote(dtypes):
+    # The dtype a whole-file read would have inferred from the per-chunk ones
+    if len(dtypes) == 1:
+        return dtypes.pop()
+    if all(is_numeric_dtype(d) and not is_bool_dtype(d) for d in dtypes):
+        return np.result_type(*dtypes)
+    return object
@@ -1,17 +1,234 @@
 # agents/data_ingestion_agent.py
 
-from kafka import KafkaProducer
+import asyncio
+import ipaddress
 import json
+import logging
+import os
+import random
+import uuid
+from urllib.parse import urlsplit
+import httpx
+from monitoring.metrics import REGISTRY, timed
+
+# Connections kept open across all hosts, and concurrent downloads per host
+MAX_CONNECTIONS = int(os.environ.get('INGESTION_MAX_CONNECTIONS', 64))
+PER_HOST_LIMIT = int(os.environ.get('INGESTION_PER_HOST_LIMIT', 4))
+MAX_RETRIES = int(os.environ.get('INGESTION_MAX_RETRIES', 3))
+RETRY_BACKOFF = 0.5
+TIMEOUT = 30.0
+STREAM_CHUNK_SIZE = 1 << 16
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+# data_fetched events are batched by the producer: up to KAFKA_BATCH_BYTES per
+# partition, or whatever arrived within KAFKA_LINGER_MS, compressed together
+KAFKA_COMPRESSION = os.environ.get('INGESTION_KAFKA_COMPRESSION', 'gzip')
+KAFKA_LINGER_MS = int(os.environ.get('INGESTION_KAFKA_LINGER_MS', 50))
+KAFKA_BATCH_BYTES = 64 * 1024
+# Hosts sources may be fetched from, comma separated; unset allows any public host
+ALLOWED_HOSTS = {host.strip().lower() for host in os.environ.get('INGESTION_ALLOWED_HOSTS', '').split(',') if host.strip()}
+SOURCE_SCHEMES = ('http', 'https')
+
+
+class IngestionError(Exception):
+    pass
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.retry_after = response.headers.get('Retry-After')
+
+
+def check_source(url):
+    """Raise ValueError unless url is an http(s) URL on a host sources may come from.
+
+    With INGESTION_ALLOWED_HOSTS set only those hosts pass; otherwise any host
+    except localhost and loopback, private, link-local or reserved addresses.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in SOURCE_SCHEMES:
+        raise ValueError(f"Unsupported scheme in {url!r}; use http or https")
+    host = (parts.hostname or '').lower()
+    if not host:
+        raise ValueError(f"No host in {url!r}")
+    if ALLOWED_HOSTS:
+        if host not in ALLOWED_HOSTS:
+            raise ValueError(f"Host {host} is not in INGESTION_ALLOWED_HOSTS")
+        return
+    if host == 'localhost' or host.endswith('.localhost'):
+        raise ValueError(f"Host {host} is not allowed")
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return
+    if not address.is_global:
+        raise ValueError(f"Address {host} is not allowed")
+
+
+def raw_file_name(url):
+    # Raw files are named after the last path segment, e.g. .../data/emissions -> emissions.csv
+    name = urlsplit(url).path.rstrip('/').split('/')[-1] or 'index'
+    return name if name.endswith('.csv') else name + '.csv'
+
 
 class DataIngestionAgent:
-    def __init__(self, raw_data_path, kafka_server='localhost:9092'):
+    def __init__(self, raw_data_path, kafka_server='localhost:9092', producer=None,
+                 max_connections=MAX_CONNECTIONS, per_host_limit=PER_HOST_LIMIT,
+                 max_retries=MAX_RETRIES, retry_backoff=RETRY_BACKOFF, timeout=TIMEOUT, source_check=None):
+        """source_check (e.g. check_source) is called with every URL requested,
+        redirects included, and fails the download when it raises ValueError."""
         self.raw_data_path = raw_data_path
-        self.producer = KafkaProducer(
-            bootstrap_servers=kafka_server,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8')
-        )
+        if producer is None:
+            # Imported here: only needed for a real broker, a producer object can be passed in instead
+            try:
+                from kafka import KafkaProducer
+            except ImportError:
+                raise ImportError("DataIngestionAgent needs kafka-python to connect to a broker")
+            producer = KafkaProducer(
+                bootstrap_servers=kafka_server,
+                value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+                compression_type=KAFKA_COMPRESSION,
+                linger_ms=KAFKA_LINGER_MS,
+                batch_size=KAFKA_BATCH_BYTES
+            )
+        self.producer = producer
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.source_check = source_check
+        self._client = None
+        self._client_loop = None
+        self._host_limits = {}
         os.makedirs(self.raw_data_path, exist_ok=True)
 
     def fetch_data_from_api(self, api_url, params=None):
-        # Existing method renamed for consistency
-        # ... implementation ...
+        return self._fetch_one(api_url, params)
+
+    def download_file(self, file_url):
+        return self._fetch_one(file_url)
+
+    def _fetch_one(self, url, params=None):
+        # Blocking wrapper for scripts; async callers use fetch_many directly
+        async def run():
+            try:
+                return await self.fetch_many([{'url': url, 'params': params}])
+            finally:
+                await self.aclose()
+        result = asyncio.run(run())[0]
+        if result['status'] != 'ok':
+            raise IngestionError(result['error'])
+        return result
+
+    async def fetch_many(self, requests):
+        """Download every request ({'url': ..., 'params': ...} or a plain URL) concurrently.
+
+        Bodies are streamed to raw_data_path as they arrive, at most
+        per_host_limit at a time per host over one pooled client.  Transport
+        errors and retryable statuses are retried with jittered exponential
+        backoff; a source waiting to retry gives up its host slot meanwhile.
+        Returns one result dict per request, in order.  A data_fetched event is
+        queued for each success; the producer sends it within KAFKA_LINGER_MS,
+        batched with other events, and aclose() flushes whatever is left.
+        File writes and producer calls run on the loop's default executor.
+        """
+        client = self._session()
+        return await asyncio.gather(*(
+            self._fetch(client, request) if isinstance(request, str)
+            else self._fetch(client, request['url'], request.get('params'))
+            for request in requests
+        ))
+
+    async def aclose(self):
+        # Call on shutdown: closes the pooled client and flushes queued events
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = self._client_loop = None
+        await asyncio.get_running_loop().run_in_executor(None, self.producer.flush)
+
+    def _session(self):
+        # One pooled client (and set of per-host limits) per event loop
+        loop = asyncio.get_running_loop()
+        if self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=self.timeout,
+                follow_redirects=True,
+                event_hooks={'request': [self._check_request]} if self.source_check else None
+            )
+            self._client_loop = loop
+            self._host_limits = {}
+        return self._client
+
+    async def _check_request(self, request):
+        try:
+            self.source_check(str(request.url))
+        except ValueError as e:
+            # An httpx error, so the download fails like any other without retrying
+            raise httpx.RequestError(str(e), request=request)
+
+    async def _fetch(self, client, url, params=None):
+        host = urlsplit(url).netloc
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        result = {'url': url, 'file': raw_file_name(url)}
+        # Timed from the first wait for a host slot to the last attempt, backoff included
+        with timed('ingestion', log=False) as timer:
+            for attempt in range(self.max_retries + 1):
+                delay = None
+                async with limit:
+                    try:
+                        result['bytes'] = await self._download(client, url, params, result['file'])
+                        result['status'] = 'ok'
+                    except (httpx.TransportError, _RetryableStatus) as e:
+                        if attempt == self.max_retries:
+                            result.update(status='failed', error=str(e))
+                        else:
+                            delay = self.retry_backoff * 2 ** attempt * (0.5 + random.random())
+                            retry_after = getattr(e, 'retry_after', None)
+                            if retry_after and retry_after.isdigit():
+                                delay = max(delay, int(retry_after))
+                            logging.warning(f"Fetching {url} failed ({e}), retrying in {delay:.1f}s")
+                    except httpx.HTTPError as e:
+                        result.update(status='failed', error=str(e))
+                if delay is None:
+                    break
+                REGISTRY.inc('ingestion_retries_total', help='Download attempts retried', host=host)
+                # Outside the host slot, so other downloads from the host go ahead meanwhile
+                await asyncio.sleep(delay)
+            result['attempts'] = attempt + 1
+            timer.bytes = result.get('bytes')
+        REGISTRY.inc('ingestion_downloads_total', help='Downloads by outcome', host=host, status=result['status'])
+        if result['status'] == 'ok':
+            # send blocks for up to max_block_ms while the producer's buffer is full, so it runs off the loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.producer.send, 'data_fetched', {'source': url, 'file': result['file'], 'bytes': result['bytes']})
+        else:
+            logging.error(f"Giving up on {url}: {result['error']}")
+        return result
+
+    async def _download(self, client, url, params, file_name):
+        path = os.path.join(self.raw_data_path, file_name)
+        # Unique per attempt: two URLs can map to the same file name
+        tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        loop = asyncio.get_running_loop()
+        size = 0
+        try:
+            async with client.stream('GET', url, params=params) as response:
+                if response.status_code in RETRY_STATUS:
+                    raise _RetryableStatus(response)
+                response.raise_for_status()
+                # File calls run on the default executor: a slow disk must not stall the other downloads
+                f = await loop.run_in_executor(None, open, tmp_path, 'wb')
+                try:
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                        await loop.run_in_executor(None, f.write, chunk)
+                        size += len(chunk)
+                finally:
+                    await loop.run_in_executor(None, f.close)
+            await loop.run_in_executor(None, os.replace, tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return size
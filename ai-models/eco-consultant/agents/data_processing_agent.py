@@ -1,21 +1,291 @@
 # agents/data_processing_agent.py
 
-from kafka import KafkaConsumer
+import functools
 import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from monitoring.metrics import REGISTRY, timed
+
+PROCESSING_WORKERS = int(os.environ.get('PROCESSING_WORKERS', 4))
+# Messages polled per batch; also the default cap on queued + running messages
+PROCESSING_BATCH_SIZE = int(os.environ.get('PROCESSING_BATCH_SIZE', 100))
+# Seconds a source URL is remembered; a repeat inside the window is acknowledged without reprocessing
+DEDUP_WINDOW = float(os.environ.get('PROCESSING_DEDUP_WINDOW', 600))
+COMMIT_INTERVAL = 1.0
+
+
+class ProcessingError(Exception):
+    pass
+
 
 class DataProcessingAgent:
-    def __init__(self, kafka_server='localhost:9092'):
-        self.consumer = KafkaConsumer(
-            'data_fetched',
-            bootstrap_servers=kafka_server,
-            auto_offset_reset='earliest',
-            enable_auto_commit=True,
-            group_id='data_processing_group',
-            value_deserializer=lambda x: json.loads(x.decode('utf-8'))
-        )
+    def __init__(self, kafka_server='localhost:9092', consumer=None, max_workers=PROCESSING_WORKERS,
+                 batch_size=PROCESSING_BATCH_SIZE, max_in_flight=None, dedup_window=DEDUP_WINDOW,
+                 ordered=False, max_retries=2, retry_backoff=1.0, poll_timeout_ms=1000):
+        """ordered=True runs the messages of each partition one after another;
+        otherwise any message can run on any worker.  Offsets are committed only
+        up to the first message of a partition that has not finished.  A consumer
+        passed in should be subscribed with this agent as its rebalance listener
+        (on_partitions_revoked / on_partitions_assigned)."""
+        if consumer is None:
+            # Imported here: only needed for a real broker, a consumer object can be passed in instead
+            try:
+                from kafka import KafkaConsumer
+            except ImportError:
+                raise ImportError("DataProcessingAgent needs kafka-python to connect to a broker")
+            consumer = KafkaConsumer(
+                bootstrap_servers=kafka_server,
+                auto_offset_reset='earliest',
+                enable_auto_commit=False,
+                group_id='data_processing_group',
+                max_poll_records=batch_size,
+                value_deserializer=lambda x: json.loads(x.decode('utf-8'))
+            )
+            consumer.subscribe(['data_fetched'], listener=_rebalance_listener(self))
+        self.consumer = consumer
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight or max(batch_size, max_workers)
+        self.dedup_window = dedup_window
+        self.ordered = ordered
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.poll_timeout_ms = poll_timeout_ms
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._offsets = {}
+        self._committed = {}
+
+    def stop(self):
+        # Finishes the messages already dispatched, commits them and returns from listen_and_process
+        self._stop.set()
 
     def listen_and_process(self, process_callback):
-        for message in self.consumer:
-            data = message.value
-            api_url = data['source']
-            process_callback(api_url)
+        """Poll in batches and run process_callback(source) on a worker pool.
+
+        Polling blocks once max_in_flight messages are queued or running, so a
+        slow callback throttles the consumer instead of piling up records (keep
+        the consumer's max_poll_interval_ms above the longest such wait).  A
+        message that still fails after max_retries stops the loop: the work
+        that finished is committed and ProcessingError is raised, so the
+        failed message is redelivered on restart.
+        """
+        self._stop.clear()
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.max_in_flight)
+        self._offsets = {}
+        self._committed = {}
+        self._partition_queues = {}
+        self._seen = OrderedDict()
+        self._error = None
+        self.stats = {'processed': 0, 'skipped': 0, 'failed': 0, 'revoked': 0}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            self._pool = pool
+            while not self._stop.is_set():
+                batch = self.consumer.poll(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+                for tp, records in batch.items():
+                    for record in records:
+                        while not self._slots.acquire(timeout=COMMIT_INTERVAL):
+                            self._commit()
+                        self._dispatch(tp, record, process_callback)
+                self._commit()
+            # Drain: every slot comes back once all dispatched messages are done
+            for _ in range(self.max_in_flight):
+                self._slots.acquire()
+        self._commit()
+        if self._error is not None:
+            raise ProcessingError(f"Processing stopped: {self._error}") from self._error
+        return self.stats
+
+    def on_partitions_revoked(self, revoked):
+        """Rebalance hook, called from inside poll before partitions move to another consumer.
+
+        What has finished on them is committed while this consumer still owns
+        them, then their offset trackers are dropped: messages not started yet
+        are skipped (the new owner resumes from the commit) and messages still
+        running finish without committing anything.
+        """
+        revoked = set(revoked)
+        if not revoked:
+            return
+        try:
+            self._commit(revoked)
+        except Exception as e:
+            logging.warning(f"Committing revoked partitions failed: {e}")
+        with self._lock:
+            for tp in revoked:
+                tracker = self._offsets.pop(tp, None)
+                if tracker is not None:
+                    tracker.revoked = True
+                    # Not started: they come back from the commit point, to us or another
+                    # consumer, and must not look like duplicates then
+                    for source in tracker.waiting.values():
+                        self._seen.pop(source, None)
+                self._committed.pop(tp, None)
+        REGISTRY.inc('kafka_partitions_revoked_total', len(revoked), help='Partitions taken away by rebalances')
+        logging.info(f"Partitions revoked: {sorted(revoked)}")
+
+    def on_partitions_assigned(self, assigned):
+        # Trackers for new partitions are created as their first messages arrive
+        logging.info(f"Partitions assigned: {sorted(assigned)}")
+
+    def _dispatch(self, tp, record, process_callback):
+        source = record.value['source']
+        with self._lock:
+            tracker = self._offsets.setdefault(tp, _PartitionOffsets())
+            tracker.add(record.offset)
+            if self._is_duplicate(source):
+                self.stats['skipped'] += 1
+                REGISTRY.inc('kafka_messages_total', help='Consumed messages by outcome', status='skipped')
+                tracker.finish(record.offset)
+                self._slots.release()
+                return
+            tracker.waiting[record.offset] = source
+            if not self.ordered:
+                self._pool.submit(self._run, tp, tracker, record, source, process_callback)
+                return
+            queue = self._partition_queues.setdefault(tp, deque())
+            queue.append((tracker, record, source))
+            if len(queue) > 1:
+                # The partition's runner picks it up after the messages ahead of it
+                return
+        self._pool.submit(self._run_partition, tp, process_callback)
+
+    def _is_duplicate(self, source):
+        if not self.dedup_window:
+            return False
+        now = time.monotonic()
+        while self._seen and next(iter(self._seen.values())) < now - self.dedup_window:
+            self._seen.popitem(last=False)
+        if source in self._seen:
+            return True
+        self._seen[source] = now
+        return False
+
+    def _run_partition(self, tp, process_callback):
+        # The runner owns the partition until its queue is empty; _dispatch starts a new one after that
+        queue = self._partition_queues[tp]
+        with self._lock:
+            tracker, record, source = queue[0]
+        while True:
+            self._run(tp, tracker, record, source, process_callback)
+            with self._lock:
+                queue.popleft()
+                if not queue:
+                    return
+                tracker, record, source = queue[0]
+
+    def _run(self, tp, tracker, record, source, process_callback):
+        # tracker is the partition's offsets when the message was dispatched; a
+        # revoke replaces it, so late results never move a newer commit point
+        try:
+            with self._lock:
+                # Decided once: a message that has started runs to the end
+                revoked = tracker.revoked
+                if revoked:
+                    self.stats['revoked'] += 1
+                else:
+                    del tracker.waiting[record.offset]
+            if revoked:
+                REGISTRY.inc('kafka_messages_total', status='revoked')
+                return
+            for attempt in range(self.max_retries + 1):
+                if self._error is not None:
+                    return
+                try:
+                    with timed('kafka_message', log=False):
+                        process_callback(source)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        logging.error(f"Giving up on {source} ({tp}, offset {record.offset}): {e}")
+                        REGISTRY.inc('kafka_messages_total', status='failed')
+                        with self._lock:
+                            self.stats['failed'] += 1
+                            self._seen.pop(source, None)
+                            self._error = self._error or e
+                        self._stop.set()
+                        return
+                    logging.warning(f"Processing {source} failed, retrying: {e}")
+                    REGISTRY.inc('kafka_retries_total', help='Message processing attempts retried')
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+            with self._lock:
+                self.stats['processed'] += 1
+                tracker.finish(record.offset)
+            REGISTRY.inc('kafka_messages_total', status='processed')
+        finally:
+            self._slots.release()
+
+    def _commit(self, partitions=None):
+        with self._lock:
+            offsets = {
+                tp: _commit_offset(tracker.committable)
+                for tp, tracker in self._offsets.items()
+                if (partitions is None or tp in partitions)
+                and tracker.committable is not None and tracker.committable != self._committed.get(tp)
+            }
+            for tp, offset in offsets.items():
+                self._committed[tp] = offset.offset
+        if offsets:
+            self.consumer.commit(offsets=offsets)
+
+
+class _PartitionOffsets:
+    # Offsets dispatched from one partition; the commit point only moves past finished ones
+
+    def __init__(self):
+        self.pending = deque()
+        self.done = set()
+        self.committable = None
+        # offset -> source of messages dispatched but not started
+        self.waiting = {}
+        # Set when the partition is revoked; its waiting messages are then skipped
+        self.revoked = False
+
+    def add(self, offset):
+        self.pending.append(offset)
+
+    def finish(self, offset):
+        self.done.add(offset)
+        while self.pending and self.pending[0] in self.done:
+            self.done.discard(self.pending[0])
+            self.committable = self.pending.popleft() + 1
+
+
+def _rebalance_listener(agent):
+    # kafka-python only accepts subclasses of its ConsumerRebalanceListener
+    from kafka import ConsumerRebalanceListener
+
+    class Listener(ConsumerRebalanceListener):
+        def on_partitions_revoked(self, revoked):
+            agent.on_partitions_revoked(revoked)
+
+        def on_partitions_assigned(self, assigned):
+            agent.on_partitions_assigned(assigned)
+
+    return Listener()
+
+
+def _commit_offset(offset):
+    # kafka-python 2.1 added leader_epoch to OffsetAndMetadata
+    OffsetAndMetadata = _offset_type()
+    if 'leader_epoch' in OffsetAndMetadata._fields:
+        return OffsetAndMetadata(offset, '', -1)
+    return OffsetAndMetadata(offset, '')
+
+
+@functools.lru_cache(maxsize=None)
+def _offset_type():
+    try:
+        from kafka.structs import OffsetAndMetadata
+        return OffsetAndMetadata
+    except ImportError:
+        return _Offset
+
+
+_Offset = namedtuple('OffsetAndMetadata', ['offset', 'metadata'])
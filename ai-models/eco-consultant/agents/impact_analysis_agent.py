@@ -1,19 +1,50 @@
 # agents/impact_analysis_agent.py
 
+import os
 from models.lca_model import LCAModel
+from models.lca_uncertainty import MonteCarloLCA
+from storage.table_store import TableStore
+from monitoring.metrics import timed
 
 class ImpactAnalysisAgent:
-    def __init__(self, processed_data_path):
+    def __init__(self, processed_data_path, impact_model=None, store=None, chunksize=None, uncertainty=None):
         self.processed_data_path = processed_data_path
-        self.lca_model = LCAModel()
+        self.lca_model = impact_model or LCAModel.from_environment()
+        # Optional MonteCarloLCA: adds per-row percentile columns (GWP_p5, GWP_p95, ...)
+        self.uncertainty = uncertainty or MonteCarloLCA.from_environment(self.lca_model)
+        self.store = store or TableStore(processed_data_path)
+        # Rows per chunk when reading the cleaned table; None reads it whole
+        self.chunksize = chunksize
 
     def analyze_impacts(self, file_name):
-        processed_file = os.path.join(self.processed_data_path, file_name)
-        df = pd.read_csv(processed_file)
-        
-        df['GWP'] = self.lca_model.calculate_gwp(df)
-        df['CED'] = self.lca_model.calculate_ced(df)
-        
-        impact_file = processed_file.replace('.csv', '_impact.csv')
-        df.to_csv(impact_file, index=False)
+        impact_name = impact_table_name(file_name)
+        with timed('impact_analysis', file=file_name):
+            impact_file = self._analyze(file_name, impact_name)
         print(f"Environmental impacts calculated and saved to {impact_file}")
+
+    def _analyze(self, file_name, impact_name):
+        if self.chunksize:
+            with self.store.writer(impact_name) as writer:
+                for chunk in self.store.iter_chunks(file_name, self.chunksize):
+                    writer.write(self.add_impacts(chunk))
+            impact_file = self.store.path(impact_name)
+        else:
+            df = self.store.read(file_name)
+            impact_file = self.store.write(self.add_impacts(df), impact_name)
+        return impact_file
+
+    def add_impacts(self, df):
+        # One column per impact category next to the inventory; df itself is left as is
+        with timed('impact_model', log=False) as timer:
+            timer.rows = len(df)
+            impacts = self.lca_model.calculate_impacts(df)
+            result = df.copy(deep=False)
+            result[impacts.columns] = impacts
+            if self.uncertainty is not None:
+                intervals = self.uncertainty.simulate(df)
+                result[intervals.columns] = intervals
+        return result
+
+def impact_table_name(file_name):
+    # data.csv -> data_impact
+    return os.path.splitext(file_name)[0] + '_impact'
@@ -1,6 +1,7 @@
 # agents/recommendation_agent.py
 
 from models.recommendation_model import RecommendationModel
+from monitoring.metrics import timed
 
 class RecommendationAgent:
     def __init__(self, interactions_file):
@@ -9,4 +10,5 @@ class RecommendationAgent:
         self.recommendation_model.build_user_product_matrix(self.interactions_df)
 
     def get_recommendations(self, user_id):
-        return self.recommendation_model.recommend_products(user_id)
+        with timed('recommendation', log=False):
+            return self.recommendation_model.recommend_products(user_id)
@@ -0,0 +1,136 @@
+# agents/registry.py
+
+import contextlib
+import gc
+import os
+import threading
+
+RAW_DATA_PATH = os.environ.get('ECO_RAW_DATA_PATH', './data/raw')
+PROCESSED_DATA_PATH = os.environ.get('ECO_PROCESSED_DATA_PATH', './data/processed')
+KAFKA_SERVER = os.environ.get('KAFKA_SERVER', 'localhost:9092')
+SUPPLY_CHAIN_NETWORK = os.environ.get('SUPPLY_CHAIN_NETWORK', './data/supply_chain_network.json')
+INTERACTIONS_FILE = os.environ.get('RECOMMENDATION_INTERACTIONS', './data/interactions.csv')
+
+
+class Registry:
+    """Models and agents built on first use and shared by everything in the process.
+
+    Entry points look agents up by name instead of constructing them at
+    import, so a process only pays for the dependencies it actually uses;
+    factories import what they need when they run.  A parent that forks
+    workers calls preload() for what they will use and forks them inside
+    frozen(): the workers inherit the built objects and their arrays stay
+    shared copy-on-write pages, instead of every worker building its own copy.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        # Reentrant: factories get() the objects they are built from
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Nothing registered as {name!r}")
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def loaded(self, name):
+        return name in self._instances
+
+    def preload(self, *names):
+        for name in names:
+            self.get(name)
+
+    def freeze(self):
+        # Moves everything built so far out of the collector's reach, so forked
+        # workers do not copy pages just by running a collection over them
+        gc.collect()
+        gc.freeze()
+
+    def unfreeze(self):
+        # Frozen objects are never collected, so a parent that forks again and
+        # again has to hand them back in between
+        gc.unfreeze()
+
+    @contextlib.contextmanager
+    def frozen(self):
+        self.freeze()
+        try:
+            yield
+        finally:
+            self.unfreeze()
+
+    def reset(self, name=None):
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+shared = Registry()
+
+
+def _table_store():
+    from storage.table_store import TableStore
+    return TableStore(PROCESSED_DATA_PATH)
+
+
+def _lca_model():
+    from models.lca_model import LCAModel
+    return LCAModel.from_environment()
+
+
+def _impact_analysis():
+    from agents.impact_analysis_agent import ImpactAnalysisAgent
+    return ImpactAnalysisAgent(processed_data_path=PROCESSED_DATA_PATH, impact_model=shared.get('lca_model'),
+                               store=shared.get('table_store'))
+
+
+def _data_cleaning():
+    from agents.data_cleaning_agent import DataCleaningAgent
+    return DataCleaningAgent(raw_data_path=RAW_DATA_PATH, processed_data_path=PROCESSED_DATA_PATH,
+                             store=shared.get('table_store'))
+
+
+def _data_ingestion():
+    from agents.data_ingestion_agent import DataIngestionAgent
+    return DataIngestionAgent(raw_data_path=RAW_DATA_PATH, kafka_server=KAFKA_SERVER)
+
+
+def _data_processing():
+    from agents.data_processing_agent import DataProcessingAgent
+    return DataProcessingAgent(kafka_server=KAFKA_SERVER)
+
+
+def _supply_chain():
+    # With SUPPLY_CHAIN_SNAPSHOT set the graph is memory-mapped, so forked and
+    # separately started processes alike share its pages
+    from agents.supply_chain_agent import SupplyChainAgent
+    return SupplyChainAgent(SUPPLY_CHAIN_NETWORK)
+
+
+def _recommendation():
+    from agents.recommendation_agent import RecommendationAgent
+    return RecommendationAgent(INTERACTIONS_FILE)
+
+
+shared.register('table_store', _table_store)
+shared.register('lca_model', _lca_model)
+shared.register('impact_analysis', _impact_analysis)
+shared.register('data_cleaning', _data_cleaning)
+shared.register('data_ingestion', _data_ingestion)
+shared.register('data_processing', _data_processing)
+shared.register('supply_chain', _supply_chain)
+shared.register('recommendation', _recommendation)
@@ -1,24 +1,45 @@
 # agents/supply_chain_agent.py
 
+import os
+from models.network_json import read_network_json
 from models.supply_chain_model import SupplyChainModel
+from monitoring.metrics import timed
 
 class SupplyChainAgent:
-    def __init__(self, network_data_file):
+    def __init__(self, network_data_file, snapshot_path=None):
         self.network_data_file = network_data_file
+        # Binary copy of the network; used instead of the JSON file while it is newer
+        self.snapshot_path = snapshot_path or os.environ.get('SUPPLY_CHAIN_SNAPSHOT')
         self.model = SupplyChainModel()
         self.load_network()
 
+    @timed('supply_chain_load')
     def load_network(self):
-        import json
-        with open(self.network_data_file, 'r') as f:
-            data = json.load(f)
-        nodes = data['nodes']
-        edges = data['edges']
-        self.model.build_network(nodes, edges)
+        if self.snapshot_path and os.path.exists(self.snapshot_path) and (
+                not os.path.exists(self.network_data_file)
+                or os.path.getmtime(self.snapshot_path) >= os.path.getmtime(self.network_data_file)):
+            self.model.load_snapshot(self.snapshot_path)
+            return
+        # Streamed straight into arrays, never holding the whole JSON tree
+        self.model.load_graph(read_network_json(self.network_data_file))
+        if self.snapshot_path:
+            self.model.save_snapshot(self.snapshot_path)
 
-    def analyze_network(self):
-        centrality = self.model.calculate_betweenness_centrality()
+    @timed('betweenness')
+    def analyze_network(self, k=None, epsilon=None):
+        # k pivots or a target epsilon switch to the sampled estimate; exact otherwise
+        centrality = self.model.calculate_betweenness_centrality(k=k, epsilon=epsilon)
         return centrality
 
+    @timed('shortest_path', log=False)
     def get_shortest_path(self, source, target):
         return self.model.find_shortest_path(source, target)
+
+    @timed('pareto_routes', log=False)
+    def get_pareto_routes(self, source, target):
+        return self.model.find_pareto_routes(source, target)
+
+    @timed('what_if', log=False)
+    def what_if(self, **changes):
+        # e.g. what_if(offline=['S12']).find_shortest_path(source, target)
+        return self.model.what_if(**changes)
@@ -1,22 +1,41 @@
 # api/data_cleaning_api.py
 
-from fastapi import FastAPI, HTTPException, Depends
+from typing import List
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
-from agents.data_ingestion_agent import DataIngestionAgent
 
-import pandas as pd
 import os
 import logging
-from fastapi.responses import FileResponse
-from fpdf import FPDF
+from fastapi.responses import FileResponse, JSONResponse
 from backend.main import authenticate_user  # Importing from backend
+from agents.registry import shared
+from monitoring import metrics
+from monitoring.web import instrument_fastapi
 
 app = FastAPI()
 
 PROCESSED_DATA_PATH = './data/processed'
 
+# The table store (pandas, pyarrow) and the report queue are built on the
+# first request that needs them, not when the app is imported
+def _report_jobs():
+    from api.report_jobs import ReportJobs
+    return ReportJobs(shared.get('table_store'))
+
+shared.register('report_jobs', _report_jobs)
+
+def __getattr__(name):
+    # Module attributes kept for callers of the old globals
+    if name == 'store':
+        return shared.get('table_store')
+    if name == 'report_jobs':
+        return shared.get('report_jobs')
+    raise AttributeError(name)
+
 logging.basicConfig(level=logging.INFO)
+metrics.configure()
+instrument_fastapi(app, 'data_cleaning_api')
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -32,17 +51,15 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=401, detail="Invalid token")
 
 @app.get("/clean_data/{file_name}")
-def get_clean_data(file_name: str):
+def get_clean_data(file_name: str, offset: int = 0, limit: int = None, cursor: str = None,
+                   columns: str = None, filters: List[str] = Query(None, alias='filter'),
+                   fmt: str = Query('json', alias='format')):
+    # e.g. ?columns=supplier,CO2&filter=region:eq:EU&limit=500, then ?cursor=<X-Next-Cursor>;
+    # format=ndjson or format=csv streams all matching rows instead of one page
+    from api.table_responses import table_response
     logging.info(f"Request to clean data for file: {file_name}")
-    try:
-        processed_file = os.path.join(PROCESSED_DATA_PATH, file_name)
-        if os.path.exists(processed_file):
-            df = pd.read_csv(processed_file)
-            return df.to_dict(orient='records')
-        else:
-            raise HTTPException(status_code=404, detail="File not found")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return table_response(shared.get('table_store'), file_name, columns=columns, filters=filters,
+                          offset=offset, limit=limit, cursor=cursor, fmt=fmt)
 
 @app.post("/fetch_data/api")
 def fetch_data_api(request: ApiFetchRequest, user: dict = Depends(get_current_user)):
@@ -50,19 +67,45 @@ def fetch_data_api(request: ApiFetchRequest, user: dict = Depends(get_current_us
         raise HTTPException(status_code=403, detail="Not authorized")
     # Existing implementation
 
+@app.on_event("shutdown")
+def stop_report_jobs():
+    if shared.loaded('report_jobs'):
+        shared.get('report_jobs').shutdown()
+
 @app.post("/generate_report/{file_name}")
 def generate_report(file_name: str, user: dict = Depends(get_current_user)):
-    processed_file = os.path.join(PROCESSED_DATA_PATH, file_name.replace('.csv', '_impact.csv'))
-    if not os.path.exists(processed_file):
+    # A cached report for unchanged data comes back at once; otherwise the
+    # report is queued and its job polled at /reports/{job_id}
+    from agents.impact_analysis_agent import impact_table_name
+    impact_name = impact_table_name(file_name)
+    if not shared.get('table_store').exists(impact_name):
         raise HTTPException(status_code=404, detail="Processed data not found")
 
-    df = pd.read_csv(processed_file)
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="Environmental Impact Report", ln=True, align='C')
-    for index, row in df.iterrows():
-        pdf.cell(200, 10, txt=f"{row['GWP']}, {row['CED']}", ln=True)
-    report_path = f"./reports/{file_name.replace('.csv', '_report.pdf')}"
-    pdf.output(report_path)
-    return FileResponse(report_path, media_type='application/pdf', filename=f"{file_name}_report.pdf")
+    job = shared.get('report_jobs').submit(file_name, impact_name)
+    if job['status'] == 'done':
+        return report_file(job['id'], file_name)
+    return JSONResponse(status_code=202, content={
+        'job_id': job['id'], 'status': job['status'], 'status_url': f"/reports/{job['id']}"
+    })
+
+@app.get("/reports/{job_id}")
+def report_status(job_id: str, user: dict = Depends(get_current_user)):
+    status = shared.get('report_jobs').status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+    if status['status'] == 'done':
+        status['download_url'] = f"/reports/{job_id}/pdf"
+    return status
+
+@app.get("/reports/{job_id}/pdf")
+def report_pdf(job_id: str, user: dict = Depends(get_current_user)):
+    status = shared.get('report_jobs').status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+    if status['status'] != 'done':
+        raise HTTPException(status_code=409, detail=f"Report is {status['status']}")
+    return report_file(job_id, status.get('file'))
+
+def report_file(job_id, file_name=None):
+    download_name = f"{file_name.replace('.csv', '')}_report.pdf" if file_name else f"{job_id}.pdf"
+    return FileResponse(shared.get('report_jobs').report_path(job_id), media_type='application/pdf', filename=download_name)
@@ -1,13 +1,58 @@
 # api/data_ingestion_api.py
 
+import os
+from typing import List
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from agents.data_ingestion_agent import DataIngestionAgent
+from agents.registry import shared
+from monitoring import metrics
+from monitoring.web import instrument_fastapi
+
+# Sources one /fetch_data/batch request may name
+MAX_BATCH_SOURCES = int(os.environ.get('INGESTION_MAX_BATCH_SOURCES', 100))
 
 app = FastAPI()
+metrics.configure()
+instrument_fastapi(app, 'data_ingestion_api')
+
+# The DataIngestionAgent (and its Kafka producer) is built by the first request
+# that uses it, so importing the app never connects to the broker.  Callers
+# name the URLs, so this agent checks every request it makes, redirects included
+def _api_ingestion_agent():
+    from agents.data_ingestion_agent import DataIngestionAgent, check_source
+    from agents.registry import KAFKA_SERVER, RAW_DATA_PATH
+    return DataIngestionAgent(raw_data_path=RAW_DATA_PATH, kafka_server=KAFKA_SERVER, source_check=check_source)
+
+shared.register('ingestion_api.data_ingestion', _api_ingestion_agent)
+
+def ingestion():
+    return shared.get('ingestion_api.data_ingestion')
+
+def __getattr__(name):
+    if name == 'data_ingestion':
+        return ingestion()
+    raise AttributeError(name)
 
-# Initialize the DataIngestionAgent with a specified raw data path
-data_ingestion = DataIngestionAgent(raw_data_path='./data/raw')
+# Downloads run on the event loop over the agent's pooled client, so a slow
+# source no longer holds a worker for the whole transfer
+@app.on_event("shutdown")
+async def close_client():
+    if shared.loaded('ingestion_api.data_ingestion'):
+        await ingestion().aclose()
+
+def check_sources(urls):
+    # Rejected up front with a 400 instead of failing one by one in the agent
+    from agents.data_ingestion_agent import check_source
+    for url in urls:
+        try:
+            check_source(url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+def checked(result):
+    if result['status'] != 'ok':
+        raise HTTPException(status_code=502, detail=f"Fetching {result['url']} failed: {result['error']}")
+    return result
 
 # Define a model for API parameters input
 class ApiFetchRequest(BaseModel):
@@ -16,8 +61,10 @@ class ApiFetchRequest(BaseModel):
 
 # Endpoint for fetching data from an API
 @app.post("/fetch_data/api")
-def fetch_data_api(request: ApiFetchRequest):
-    {{ fetch_data_from_api }}
+async def fetch_data_api(request: ApiFetchRequest):
+    check_sources([request.api_url])
+    results = await ingestion().fetch_many([{'url': request.api_url, 'params': request.params}])
+    return checked(results[0])
 
 # Define a model for file URL input
 class FileFetchRequest(BaseModel):
@@ -25,5 +72,22 @@ class FileFetchRequest(BaseModel):
 
 # Endpoint for downloading a file from a URL
 @app.post("/fetch_data/file")
-def fetch_data_file(request: FileFetchRequest):
-    {{ error_handling }}
+async def fetch_data_file(request: FileFetchRequest):
+    check_sources([request.file_url])
+    results = await ingestion().fetch_many([request.file_url])
+    return checked(results[0])
+
+# Define a model for several downloads at once
+class BatchFetchRequest(BaseModel):
+    apis: List[ApiFetchRequest] = []
+    file_urls: List[str] = []
+
+# Endpoint for fetching many sources concurrently; failures are reported per source
+@app.post("/fetch_data/batch")
+async def fetch_data_batch(request: BatchFetchRequest):
+    requests = [{'url': api.api_url, 'params': api.params} for api in request.apis] + request.file_urls
+    if len(requests) > MAX_BATCH_SOURCES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SOURCES} sources per request")
+    check_sources([api.api_url for api in request.apis] + request.file_urls)
+    results = await ingestion().fetch_many(requests)
+    return {'results': results, 'failed': sum(result['status'] != 'ok' for result in results)}
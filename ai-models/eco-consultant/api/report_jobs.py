@@ -0,0 +1,275 @@
+# api/report_jobs.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from storage.table_store import TableStore
+from monitoring.metrics import timed
+
+REPORTS_PATH = os.environ.get('REPORTS_PATH', './reports')
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+# Part of every cache key: bump it when the report layout changes
+REPORT_VERSION = 2
+METRICS = ['GWP', 'CED']
+# Columns broken down by group when the impact table has them
+GROUP_COLUMNS = ['supplier', 'region', 'year']
+TOP_GROUPS = 15
+# Rows listed individually; the rest of the table only appears in the aggregates
+DETAIL_ROWS = 200
+CHUNKSIZE = 200_000
+
+
+class ReportJobs:
+    """Builds impact reports on a process pool, cached by the content of the impact table.
+
+    A job is identified by its cache key (table hash + REPORT_VERSION), so
+    repeated requests for unchanged data share one job and one PDF, and a
+    table that changed gets a new key.  The report a file name pointed at
+    before is deleted once no other file name uses it.  Each job's status is
+    also written next to its PDF as <key>.json, so every API worker can
+    answer for jobs another one submitted.
+    """
+
+    def __init__(self, store, reports_path=REPORTS_PATH, max_workers=REPORT_WORKERS):
+        self.store = store
+        self.reports_path = reports_path
+        self.max_workers = max_workers
+        self._pool = None
+        self._jobs = {}
+        self._digests = {}
+        self._lock = threading.Lock()
+        self.index_file = os.path.join(reports_path, 'index.json')
+        os.makedirs(reports_path, exist_ok=True)
+
+    def report_path(self, key):
+        return os.path.join(self.reports_path, f"{key}.pdf")
+
+    def status_path(self, key):
+        return os.path.join(self.reports_path, f"{key}.json")
+
+    def cache_key(self, table_name):
+        return f"{self._digest(self.store.path(table_name))[:32]}-v{REPORT_VERSION}"
+
+    def submit(self, file_name, table_name):
+        # Returns the job dict; status is 'done' straight away when the report is cached
+        key = self.cache_key(table_name)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job['status'] != 'failed':
+                return job
+            job = {'id': key, 'file': file_name, 'submitted': time.time()}
+            self._jobs[key] = job
+            if os.path.exists(self.report_path(key)):
+                job['status'] = 'done'
+                self._save_status(job)
+                self._record(file_name, key)
+                return job
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            job['status'] = 'queued'
+            job['future'] = self._pool.submit(build_report, self.store.base_path, self.store.fmt,
+                                              table_name, self.report_path(key), file_name)
+            self._save_status(job)
+        job['future'].add_done_callback(lambda future: self._finished(job, future))
+        return job
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                # Submitted by another worker or an earlier process
+                stored = self._load_status(job_id)
+                if stored is not None and stored['status'] != 'done':
+                    return stored
+                if not os.path.exists(self.report_path(job_id)):
+                    return None
+                job = self._jobs[job_id] = stored or {'id': job_id, 'status': 'done'}
+            if job['status'] == 'queued' and job['future'].running():
+                job['status'] = 'running'
+            return {name: value for name, value in job.items() if name != 'future'}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, job, future):
+        with self._lock:
+            job.pop('future', None)
+            job['finished'] = time.time()
+            if future.cancelled():
+                job['status'] = 'failed'
+                job['error'] = 'cancelled'
+            elif future.exception() is not None:
+                job['status'] = 'failed'
+                job['error'] = str(future.exception())
+                logging.error(f"Report for {job['file']} failed: {job['error']}")
+            else:
+                job['status'] = 'done'
+                self._record(job['file'], job['id'])
+            self._save_status(job)
+
+    def _save_status(self, job):
+        status = {name: value for name, value in job.items() if name != 'future'}
+        # Per process: two workers can finish the same job
+        tmp_path = f"{self.status_path(job['id'])}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f)
+        os.replace(tmp_path, self.status_path(job['id']))
+
+    def _load_status(self, key):
+        try:
+            with open(self.status_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _record(self, file_name, key):
+        # Point file_name at its newest report and drop the one it replaces if nothing else uses it
+        index = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file) as f:
+                index = json.load(f)
+        previous = index.get(file_name)
+        index[file_name] = key
+        if previous and previous != key and previous not in index.values():
+            for path in (self.report_path(previous), self.status_path(previous)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._jobs.pop(previous, None)
+        tmp_path = self.index_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_file)
+
+    def _digest(self, path):
+        # Content hash, recomputed only when size or mtime moved
+        stat = os.stat(path)
+        cached = self._digests.get(path)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self._digests[path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        return self._digests[path][2]
+
+
+def summarize(store, table_name, chunksize=CHUNKSIZE):
+    """Totals, ranges and per-group sums of the impact metrics, read chunk by chunk."""
+    available = store.columns(table_name)
+    metrics = [m for m in METRICS if m in available]
+    if not metrics:
+        # Raised in the worker, so it becomes the job's error
+        raise ValueError(f"{table_name} has no impact columns to report on (expected one of {METRICS})")
+    groups = [g for g in GROUP_COLUMNS if g in available]
+    totals = {m: {'sum': 0.0, 'min': float('inf'), 'max': float('-inf'), 'count': 0} for m in metrics}
+    by_group = {g: None for g in groups}
+    detail = []
+    n_rows = 0
+    for chunk in store.iter_chunks(table_name, chunksize, columns=groups + metrics):
+        n_rows += len(chunk)
+        if sum(len(d) for d in detail) < DETAIL_ROWS:
+            detail.append(chunk.iloc[:DETAIL_ROWS - sum(len(d) for d in detail)])
+        for m in metrics:
+            values = chunk[m]
+            totals[m]['sum'] += values.sum()
+            totals[m]['count'] += int(values.count())
+            if values.count():
+                totals[m]['min'] = min(totals[m]['min'], values.min())
+                totals[m]['max'] = max(totals[m]['max'], values.max())
+        for g in groups:
+            partial = chunk.groupby(g)[metrics].agg(['sum', 'count'])
+            by_group[g] = partial if by_group[g] is None else by_group[g].add(partial, fill_value=0)
+    for m in metrics:
+        totals[m]['mean'] = totals[m]['sum'] / totals[m]['count'] if totals[m]['count'] else float('nan')
+    return {
+        'rows': n_rows,
+        'metrics': metrics,
+        'totals': totals,
+        'groups': {g: frame for g, frame in by_group.items() if frame is not None},
+        'detail': pd.concat(detail) if detail else pd.DataFrame(columns=groups + metrics),
+    }
+
+
+def build_report(base_path, fmt, table_name, report_path, file_name):
+    # Runs in a pool worker; the PDF appears under report_path only when complete
+    with timed('report', file=file_name) as timer:
+        summary = summarize(TableStore(base_path, fmt), table_name)
+        timer.rows = summary['rows']
+        return _render(summary, report_path, file_name)
+
+
+def _render(summary, report_path, file_name):
+    # Imported here: only report workers need fpdf
+    from fpdf import FPDF
+    metrics = summary['metrics']
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", style='B', size=14)
+    pdf.cell(0, 10, text="Environmental Impact Report", new_x='LMARGIN', new_y='NEXT', align='C')
+    pdf.set_font("Helvetica", size=10)
+    pdf.cell(0, 6, text=f"{file_name}: {summary['rows']} rows", new_x='LMARGIN', new_y='NEXT', align='C')
+
+    _section(pdf, "Totals")
+    _table(pdf, ['Metric', 'Total', 'Mean', 'Min', 'Max', 'Rows'],
+           [[m] + [_number(summary['totals'][m][s]) for s in ('sum', 'mean', 'min', 'max')]
+            + [str(summary['totals'][m]['count'])] for m in metrics])
+
+    for group, frame in summary['groups'].items():
+        first = metrics[0]
+        top = frame.sort_values((first, 'sum'), ascending=False).head(TOP_GROUPS)
+        _section(pdf, f"Largest {len(top)} of {len(frame)} by {group} ({first})")
+        _table(pdf, [group.capitalize(), 'Rows'] + [f"{m} total" for m in metrics],
+               [[str(value), str(int(row[(first, 'count')]))] + [_number(row[(m, 'sum')]) for m in metrics]
+                for value, row in top.iterrows()])
+
+    detail = summary['detail']
+    shown = f"First {len(detail)} rows" if summary['rows'] > len(detail) else "All rows"
+    _section(pdf, shown)
+    _table(pdf, ['#'] + list(detail.columns),
+           [[str(i)] + [_number(v) if isinstance(v, float) else str(v) for v in row]
+            for i, row in zip(detail.index, detail.itertuples(index=False))])
+
+    tmp_path = report_path + '.tmp'
+    pdf.output(tmp_path)
+    os.replace(tmp_path, report_path)
+    return report_path
+
+
+def _section(pdf, title):
+    pdf.ln(4)
+    pdf.set_font("Helvetica", style='B', size=11)
+    pdf.cell(0, 8, text=title, new_x='LMARGIN', new_y='NEXT')
+    pdf.set_font("Helvetica", size=9)
+
+
+def _table(pdf, header, rows):
+    # Fixed-width columns; the header is repeated at the top of every page the table spans
+    width = (pdf.w - pdf.l_margin - pdf.r_margin) / len(header)
+
+    def header_row():
+        pdf.set_font("Helvetica", style='B', size=9)
+        for name in header:
+            pdf.cell(width, 6, text=str(name)[:24], border=1)
+        pdf.ln()
+        pdf.set_font("Helvetica", size=9)
+
+    header_row()
+    for row in rows:
+        if pdf.will_page_break(6):
+            pdf.add_page()
+            header_row()
+        for value in row:
+            pdf.cell(width, 6, text=value[:24], border=1)
+        pdf.ln()
+
+
+def _number(value):
+    return f"{value:,.4g}" if pd.notna(value) else "-"
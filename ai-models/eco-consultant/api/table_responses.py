@@ -0,0 +1,136 @@
+# api/table_responses.py
+
+import base64
+import csv
+import io
+import json
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+from storage.table_store import FILTER_OPERATORS
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10_000
+# Rows per chunk written to a streamed response
+STREAM_CHUNK_ROWS = 10_000
+MEDIA_TYPES = {'json': 'application/json', 'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def parse_columns(columns, available):
+    # "GWP,CED" -> ['GWP', 'CED']; None keeps every column
+    if not columns:
+        return None
+    requested = [column.strip() for column in columns.split(',') if column.strip()]
+    unknown = [column for column in requested if column not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {unknown}")
+    return requested
+
+
+def parse_filters(filters, available):
+    # ["region:eq:EU", "year:in:2022|2023"] -> [('region', 'eq', 'EU'), ('year', 'in', ['2022', '2023'])]
+    parsed = []
+    for text in filters or []:
+        parts = text.split(':', 2)
+        if len(parts) != 3 or parts[1] not in FILTER_OPERATORS:
+            raise HTTPException(status_code=400, detail=f"Bad filter {text!r}; use column:op:value with op in "
+                                                        f"{sorted(FILTER_OPERATORS)}")
+        column, op, value = parts
+        if column not in available:
+            raise HTTPException(status_code=400, detail=f"Unknown filter column: {column}")
+        parsed.append((column, op, value.split('|') if op == 'in' else value))
+    return parsed
+
+
+def encode_cursor(row, version):
+    payload = json.dumps({'row': int(row), 'version': version}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_cursor(cursor, version):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        row = int(payload['row'])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get('version') != version:
+        raise HTTPException(status_code=410, detail="The table changed since this cursor was issued")
+    return row
+
+
+def table_response(store, name, columns=None, filters=None, offset=0, limit=None, cursor=None, fmt='json'):
+    """Rows of a stored table, projected and filtered while it is scanned.
+
+    fmt='json' returns one page (limit rows, DEFAULT_PAGE_SIZE by default)
+    as a list of records, with an X-Next-Cursor header when the page is full.
+    fmt='ndjson' or 'csv' streams every matching row (or limit rows) chunk
+    by chunk.  A cursor resumes right after the previous page without
+    rescanning it; offset skips matching rows.
+    """
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown format {fmt!r}; use one of {sorted(MEDIA_TYPES)}")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset and limit must not be negative")
+    if not store.exists(name):
+        raise HTTPException(status_code=404, detail="File not found")
+    available = store.columns(name)
+    columns = parse_columns(columns, available)
+    try:
+        # Checked against the table's types here, so a bad value is a 400 before any row is sent
+        filters = store.coerce_filters(name, parse_filters(filters, available))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Bad filter value: {e}")
+    version = store.mtime(name)
+
+    start_row = 0
+    if cursor:
+        start_row = decode_cursor(cursor, version)
+    elif offset and not filters:
+        # Without filters an offset is a row position, so the skipped rows are never read
+        start_row, offset = offset, 0
+    if fmt == 'json':
+        limit = min(DEFAULT_PAGE_SIZE if limit is None else limit, MAX_PAGE_SIZE)
+
+    chunksize = STREAM_CHUNK_ROWS if fmt != 'json' else max(limit, 1)
+    chunks = _window(store.scan(name, columns, filters, start_row, chunksize), offset, limit)
+
+    if fmt == 'json':
+        frames = list(chunks)
+        page = pd.concat(frames) if frames else pd.DataFrame(columns=columns or available)
+        headers = {}
+        if limit and len(page) == limit:
+            headers['X-Next-Cursor'] = encode_cursor(page.index[-1] + 1, version)
+        return Response(page.to_json(orient='records'), media_type=MEDIA_TYPES['json'], headers=headers)
+    header = list(columns or available)
+    return StreamingResponse(_encode(chunks, fmt, header), media_type=MEDIA_TYPES[fmt])
+
+
+def _window(chunks, offset, limit):
+    # Skip offset rows, then pass on at most limit rows (all when limit is None)
+    for chunk in chunks:
+        if offset >= len(chunk):
+            offset -= len(chunk)
+            continue
+        chunk = chunk.iloc[offset:]
+        offset = 0
+        if limit is not None:
+            chunk = chunk.iloc[:limit]
+            limit -= len(chunk)
+        if len(chunk):
+            yield chunk
+        if limit == 0:
+            return
+
+
+def _encode(chunks, fmt, header):
+    if fmt == 'csv':
+        # Through the csv module, so names are quoted the way to_csv quotes values
+        line = io.StringIO()
+        csv.writer(line, lineterminator='\n').writerow(header)
+        yield line.getvalue()
+        for chunk in chunks:
+            yield chunk.to_csv(index=False, header=False)
+        return
+    for chunk in chunks:
+        text = chunk.to_json(orient='records', lines=True)
+        yield text if text.endswith('\n') else text + '\n'
@@ -1,51 +1,192 @@
-import schedule
 import time
+import contextlib
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import hashlib
+import json
 import os
 import signal
-from agents.data_cleaning_agent import DataCleaningAgent
-from agents.impact_analysis_agent import ImpactAnalysisAgent
-
-# Initialize agents
-data_cleaning = DataCleaningAgent(
-    raw_data_path='./data/raw',
-    processed_data_path='./data/processed'
-)
-impact_analysis = ImpactAnalysisAgent(
-    processed_data_path='./data/processed'
-)
+from agents.registry import shared
+from monitoring import metrics
+from monitoring.metrics import timed
+
+RAW_DATA_PATH = './data/raw'
+PROCESSED_DATA_PATH = './data/processed'
+# Per-file fingerprints and outcomes; lets a crashed or repeated run skip finished files
+MANIFEST_FILE = os.path.join(PROCESSED_DATA_PATH, 'batch_manifest.json')
+REPORT_FILE = os.path.join(PROCESSED_DATA_PATH, 'batch_report.json')
+# 'process' sidesteps the GIL for the pandas work; 'thread' is the old behaviour
+EXECUTOR = os.environ.get('BATCH_EXECUTOR', 'process')
+# 'fused' hands cleaned frames straight to the LCA model; 'staged' rereads the cleaned table
+PIPELINE = os.environ.get('BATCH_PIPELINE', 'fused')
+# Rows per chunk for large raw files; unset cleans each file in memory
+CHUNKSIZE = int(os.environ['BATCH_CHUNKSIZE']) if os.environ.get('BATCH_CHUNKSIZE') else None
+
+# Agents come from the shared registry on first use.  With the process
+# executor they are built in the parent before the pool forks, so workers
+# inherit one copy instead of importing and building their own (with the
+# fork start method; spawned workers build theirs on first use)
+def _batch_cleaning_agent():
+    from agents.data_cleaning_agent import DataCleaningAgent
+    return DataCleaningAgent(
+        raw_data_path=RAW_DATA_PATH,
+        processed_data_path=PROCESSED_DATA_PATH,
+        chunksize=CHUNKSIZE
+    )
+
+shared.register('batch.data_cleaning', _batch_cleaning_agent)
+
+def data_cleaning():
+    return shared.get('batch.data_cleaning')
+
+def impact_analysis():
+    return shared.get('impact_analysis')
+
+def impact_table_name(file_name):
+    from agents.impact_analysis_agent import impact_table_name
+    return impact_table_name(file_name)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def process_file(file_name):
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def file_fingerprint(path, previous=None):
+    # The content hash is only recomputed when size or mtime moved
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime') == stat.st_mtime:
+        fingerprint['sha256'] = previous.get('sha256')
+        return fingerprint
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+def outputs_exist(file_name):
+    return data_cleaning().store.exists(file_name) and impact_analysis().store.exists(impact_table_name(file_name))
+
+def clean_and_analyze(file_name):
+    # Each cleaned frame (or chunk) is written once and passed on in memory,
+    # instead of analyze_impacts reading the cleaned table back from disk
+    with timed('clean_and_analyze', file=file_name) as timer, \
+            data_cleaning().store.writer(file_name) as cleaned, \
+            impact_analysis().store.writer(impact_table_name(file_name)) as impacts:
+        timer.rows = 0
+        for chunk in data_cleaning().clean_chunks(file_name):
+            cleaned.write(chunk)
+            impacts.write(impact_analysis().add_impacts(chunk))
+            timer.rows += len(chunk)
+
+def process_file(file_name, previous=None, force=False, pipeline=None):
+    start = time.perf_counter()
+    result = {'file': file_name}
     try:
-        data_cleaning.clean_csv(file_name)
-        impact_analysis.analyze_impacts(file_name)
-        logging.info(f"Successfully processed {file_name}")
+        fingerprint = file_fingerprint(os.path.join(RAW_DATA_PATH, file_name), previous)
+        result.update(fingerprint)
+        unchanged = (previous and previous.get('status') == 'ok'
+                     and previous.get('sha256') == fingerprint['sha256'])
+        if unchanged and not force and outputs_exist(file_name):
+            result['status'] = 'skipped'
+            logging.info(f"Skipping unchanged {file_name}")
+        else:
+            if (pipeline or PIPELINE) == 'fused':
+                clean_and_analyze(file_name)
+            else:
+                data_cleaning().clean_csv(file_name)
+                impact_analysis().analyze_impacts(file_name)
+            result['status'] = 'ok'
+            logging.info(f"Successfully processed {file_name}")
     except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
         logging.error(f"Error processing {file_name}: {str(e)}")
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE) as f:
+        return json.load(f)
 
-def batch_process():
-    raw_files = [f for f in os.listdir('./data/raw') if f.endswith('.csv')]
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = [executor.submit(process_file, file_name) for file_name in raw_files]
+def save_json(path, data):
+    # Written beside the target and renamed, so a crash never leaves a torn file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def batch_process(executor=None, max_workers=None, force=False, pipeline=None):
+    executor = executor or EXECUTOR
+    pipeline = pipeline or PIPELINE
+    raw_files = sorted(f for f in os.listdir(RAW_DATA_PATH) if f.endswith('.csv'))
+    manifest = load_manifest()
+    if executor == 'process':
+        shared.preload('batch.data_cleaning', 'impact_analysis')
+        # Frozen while the workers fork and run, then unfrozen: the scheduler calls this every day
+        frozen = shared.frozen()
+        pool = ProcessPoolExecutor(max_workers=max_workers or available_cores())
+    else:
+        frozen = contextlib.nullcontext()
+        pool = ThreadPoolExecutor(max_workers=max_workers or 4)
+
+    run_start = time.time()
+    results = []
+    with frozen, pool:
+        futures = [pool.submit(process_file, file_name, manifest.get(file_name), force, pipeline) for file_name in raw_files]
         for future in as_completed(futures):
-            future.result()  # This will raise any exceptions that occurred during execution
+            result = future.result()
+            results.append(result)
+            # Workers' own registries stay in the workers; the outcome is counted here
+            metrics.inc('batch_files_total', status=result['status'])
+            metrics.observe('batch_file_seconds', result['seconds'])
+            if result['status'] == 'ok':
+                # Recorded as each file finishes so a restart resumes where this run stopped
+                manifest[result['file']] = {
+                    key: result[key] for key in ('size', 'mtime', 'sha256', 'status', 'seconds')
+                }
+                manifest[result['file']]['finished'] = time.time()
+                save_json(MANIFEST_FILE, manifest)
+            elif result['status'] == 'skipped' and manifest[result['file']]['mtime'] != result['mtime']:
+                # Touched but identical content: remember the new mtime to avoid rehashing
+                manifest[result['file']]['mtime'] = result['mtime']
+                save_json(MANIFEST_FILE, manifest)
+            elif result['status'] == 'failed' and result['file'] in manifest:
+                manifest[result['file']]['status'] = 'failed'
+                save_json(MANIFEST_FILE, manifest)
 
-# Schedule the batch process to run daily at midnight and additional run on Mondays at noon
-schedule.every().day.at("00:00").do(batch_process)
-schedule.every().monday.at("12:00").do(batch_process)
+    counts = {status: sum(r['status'] == status for r in results) for status in ('ok', 'skipped', 'failed')}
+    save_json(REPORT_FILE, {
+        'started': run_start,
+        'seconds': round(time.time() - run_start, 3),
+        'executor': executor,
+        'pipeline': pipeline,
+        'counts': counts,
+        'files': sorted(results, key=lambda r: r['file']),
+    })
+    logging.info(f"Batch finished: {counts['ok']} processed, {counts['skipped']} skipped, {counts['failed']} failed",
+                 extra={'fields': {'event': 'batch', 'counts': counts, 'seconds': round(time.time() - run_start, 3)}})
+    return results
 
 def signal_handler(signum, frame):
     logging.info("Received shutdown signal. Exiting...")
     exit(0)
 
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
-
 if __name__ == "__main__":
+    import schedule
+    metrics.configure()
+    # Schedule the batch process to run daily at midnight and additional run on Mondays at noon
+    schedule.every().day.at("00:00").do(batch_process)
+    schedule.every().monday.at("12:00").do(batch_process)
+    # Only the scheduler process handles signals; pool workers keep the defaults
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
     while True:
         schedule.run_pending()
         time.sleep(60)  # Wait for one minute
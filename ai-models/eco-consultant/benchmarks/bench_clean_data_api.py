@@ -0,0 +1,81 @@
+# benchmarks/bench_clean_data_api.py
+#
+# Response size and latency of /clean_data/{file_name}: the old
+# whole-table to_dict endpoint vs pages, projection, filters and streaming.
+# TestClient collects streamed bodies, so times are for the whole response.
+# Run from eco-consultant/: python -m benchmarks.bench_clean_data_api
+
+import argparse
+import tempfile
+import time
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.testclient import TestClient
+from typing import List
+from api.table_responses import table_response
+from storage.table_store import TableStore
+from benchmarks.generators import synthetic_inventory
+
+
+def build_app(store):
+    app = FastAPI()
+
+    @app.get("/legacy/{file_name}")
+    def legacy(file_name: str):
+        if not store.exists(file_name):
+            raise HTTPException(status_code=404, detail="File not found")
+        return store.read(file_name).to_dict(orient='records')
+
+    @app.get("/clean_data/{file_name}")
+    def clean_data(file_name: str, offset: int = 0, limit: int = None, cursor: str = None,
+                   columns: str = None, filters: List[str] = Query(None, alias='filter'),
+                   fmt: str = Query('json', alias='format')):
+        return table_response(store, file_name, columns=columns, filters=filters,
+                              offset=offset, limit=limit, cursor=cursor, fmt=fmt)
+
+    return app
+
+
+def measure(client, url):
+    start = time.perf_counter()
+    response = client.get(url)
+    response.raise_for_status()
+    return time.perf_counter() - start, len(response.content), response.headers.get('X-Next-Cursor')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--pages', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TableStore(tmp)
+        store.write(synthetic_inventory(args.rows).ffill(), 'data')
+        client = TestClient(build_app(store))
+        cases = [
+            ('old endpoint, whole table', '/legacy/data'),
+            ('page of 1000', '/clean_data/data'),
+            ('page of 1000, 2 columns', '/clean_data/data?columns=supplier,CO2'),
+            ('page deep in the table (offset)', f'/clean_data/data?offset={args.rows // 2}'),
+            ('filtered page', '/clean_data/data?filter=region:eq:EU&filter=CO2:gt:50'),
+            ('ndjson stream, whole table', '/clean_data/data?format=ndjson'),
+            ('csv stream, whole table', '/clean_data/data?format=csv'),
+            ('csv stream, 2 columns, filtered', '/clean_data/data?format=csv&columns=supplier,CO2&filter=region:eq:EU'),
+        ]
+        print(f"{args.rows} rows")
+        for label, url in cases:
+            elapsed, size, _ = measure(client, url)
+            print(f"{label:>34}: {elapsed * 1000:8.1f}ms, {size / 2**20:7.1f}MB")
+
+        start = time.perf_counter()
+        url, cursor, pages = '/clean_data/data?filter=region:eq:EU', None, 0
+        while pages < args.pages:
+            _, _, cursor = measure(client, url + (f'&cursor={cursor}' if cursor else ''))
+            pages += 1
+            if not cursor:
+                break
+        print(f"{'cursor walk, filtered':>34}: {(time.perf_counter() - start) * 1000 / pages:8.1f}ms per page")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/bench_dashboard_summary.py
+#
+# Dashboard summary latency: reading a table and calling describe() on every
+# request vs the TableSummary saved by the writer (first load from disk, then
+# from the in-process cache), plus the cost the summary adds to a write.
+# Run from eco-consultant/: python -m benchmarks.bench_dashboard_summary
+
+import argparse
+import os
+import tempfile
+import time
+from storage.table_store import TableStore
+from storage.table_summary import TableSummary
+from benchmarks.generators import synthetic_inventory
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--fmt', default='parquet', choices=['parquet', 'csv'])
+    args = parser.parse_args()
+
+    df = synthetic_inventory(args.rows).ffill()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TableStore(tmp, args.fmt)
+        plain, _ = timed(lambda: df.to_parquet(os.path.join(tmp, 'plain.parquet')) if args.fmt == 'parquet'
+                         else df.to_csv(os.path.join(tmp, 'plain.csv'), index=False))
+        summarized, _ = timed(lambda: store.write(df, 'data'))
+        print(f"{args.rows} rows, {args.fmt}")
+        print(f"{'write without / with summary':>32}: {plain:7.3f}s / {summarized:7.3f}s")
+
+        per_request, expected = timed(lambda: store.read('data').describe(), repeat=3)
+        cold, _ = timed(lambda: TableSummary.load(store.summary_path('data')))
+        store.summary('data')
+        warm, summary = timed(lambda: store.summary('data').describe(), repeat=100)
+        print(f"{'read + describe per request':>32}: {per_request * 1000:9.3f}ms")
+        print(f"{'summary loaded from disk':>32}: {cold * 1000:9.3f}ms")
+        print(f"{'cached summary + describe':>32}: {warm * 1000:9.3f}ms")
+        error = ((summary - expected).abs() / expected.abs()).max().max()
+        print(f"{'largest relative difference':>32}: {error:.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_data_processing.py
+#
+# DataProcessingAgent throughput in messages per second against the
+# in-process fake broker, vs the old one-message-at-a-time loop.
+# Run from eco-consultant/: python -m benchmarks.bench_data_processing
+
+import argparse
+import json
+import threading
+import time
+import numpy as np
+from agents.data_processing_agent import DataProcessingAgent
+from benchmarks.fake_kafka import FakeBroker
+
+TOPIC = 'data_fetched'
+GROUP = 'data_processing_group'
+
+
+def fill_broker(n_messages, duplicate_share, partitions, seed=0):
+    rng = np.random.default_rng(seed)
+    broker = FakeBroker(partitions)
+    n_unique = max(1, int(n_messages * (1 - duplicate_share)))
+    for i in range(n_messages):
+        source = i if i < n_unique else int(rng.integers(n_unique))
+        broker.produce(TOPIC, json.dumps({'source': f'https://api.example.com/data/{source}'}).encode('utf-8'))
+    return broker
+
+
+def consumer_for(broker):
+    return broker.consumer(TOPIC, GROUP, value_deserializer=lambda x: json.loads(x.decode('utf-8')))
+
+
+def run_sequential(broker, work):
+    # The previous agent: one record per poll, processed inline
+    consumer = consumer_for(broker)
+    while True:
+        batch = consumer.poll(max_records=1)
+        if not batch:
+            return
+        for records in batch.values():
+            for record in records:
+                work(record.value['source'])
+
+
+def run_agent(broker, work, **kwargs):
+    agent = DataProcessingAgent(consumer=consumer_for(broker), poll_timeout_ms=10, **kwargs)
+
+    def stop_when_drained():
+        while broker.lag(TOPIC, GROUP) > 0:
+            time.sleep(0.005)
+        agent.stop()
+
+    watcher = threading.Thread(target=stop_when_drained)
+    watcher.start()
+    stats = agent.listen_and_process(work)
+    watcher.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--partitions', type=int, default=8)
+    parser.add_argument('--duplicates', type=float, default=0.2, help='share of messages repeating a source')
+    parser.add_argument('--work-ms', type=float, default=2.0, help='simulated I/O-bound work per message')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+
+    def work(source):
+        time.sleep(args.work_ms / 1000)
+
+    broker = fill_broker(args.messages, args.duplicates, args.partitions)
+    start = time.perf_counter()
+    run_sequential(broker, work)
+    print(f"sequential loop: {args.messages / (time.perf_counter() - start):.0f} msgs/s")
+
+    for ordered in (False, True):
+        for workers in args.workers:
+            broker = fill_broker(args.messages, args.duplicates, args.partitions)
+            start = time.perf_counter()
+            stats = run_agent(broker, work, max_workers=workers, ordered=ordered)
+            elapsed = time.perf_counter() - start
+            print(f"agent, {workers} worker(s){', per-partition order' if ordered else ''}: "
+                  f"{args.messages / elapsed:.0f} msgs/s ({stats['processed']} processed, "
+                  f"{stats['skipped']} duplicates skipped, lag {broker.lag(TOPIC, GROUP)})")
+
+
+if __name__ == '__main__':
+    main()
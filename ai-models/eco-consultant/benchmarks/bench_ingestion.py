@@ -0,0 +1,72 @@
+# benchmarks/bench_ingestion.py
+#
+# Downloads per second from a local stub server: the old one-at-a-time
+# fetch vs DataIngestionAgent.fetch_many with pooled, concurrent streaming.
+# Run from eco-consultant/: python -m benchmarks.bench_ingestion
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import httpx
+from agents.data_ingestion_agent import DataIngestionAgent, raw_file_name
+from benchmarks.fake_kafka import FakeBroker
+from benchmarks.stub_http import StubServer
+
+
+def fetch_sequential(urls, raw_data_path, producer):
+    # Previous behaviour: one blocking request at a time, body held in memory
+    with httpx.Client() as client:
+        for url in urls:
+            response = client.get(url)
+            response.raise_for_status()
+            with open(os.path.join(raw_data_path, raw_file_name(url)), 'wb') as f:
+                f.write(response.content)
+            producer.send('data_fetched', {'source': url})
+            producer.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--kb', type=int, default=256)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--flaky', type=float, default=0.1, help='share of sources that fail twice first')
+    parser.add_argument('--per-host', type=int, nargs='+', default=[4, 16])
+    args = parser.parse_args()
+
+    with StubServer(args.kb * 1024, args.latency_ms / 1000) as server, tempfile.TemporaryDirectory() as tmp:
+        n_flaky = int(args.files * args.flaky)
+        urls = [f"{server.url}/data/source{i}" for i in range(args.files - n_flaky)]
+        broker = FakeBroker()
+        producer = broker.producer(value_serializer=lambda v: json.dumps(v).encode('utf-8'))
+
+        start = time.perf_counter()
+        fetch_sequential(urls, tmp, producer)
+        elapsed = time.perf_counter() - start
+        print(f"sequential ({len(urls)} files, no flaky sources): {len(urls) / elapsed:.1f} files/s, "
+              f"{len(urls) * args.kb / 1024 / elapsed:.1f} MB/s")
+
+        urls += [f"{server.url}/flaky/source{i}" for i in range(n_flaky)]
+        for per_host in args.per_host:
+            server.requests.clear()
+            agent = DataIngestionAgent(tmp, producer=producer, per_host_limit=per_host, retry_backoff=0.05)
+
+            async def run():
+                try:
+                    return await agent.fetch_many(urls)
+                finally:
+                    await agent.aclose()
+            start = time.perf_counter()
+            results = asyncio.run(run())
+            elapsed = time.perf_counter() - start
+            ok = sum(result['status'] == 'ok' for result in results)
+            retries = sum(result['attempts'] - 1 for result in results)
+            print(f"agent, {per_host} per host ({len(urls)} files, {n_flaky} flaky): {len(urls) / elapsed:.1f} files/s, "
+                  f"{ok * args.kb / 1024 / elapsed:.1f} MB/s, {ok} ok, {retries} retries")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_lca_uncertainty.py
+#
+# Monte Carlo LCA throughput in row-samples per second, serial vs process pool.
+# Run from eco-consultant/: python -m benchmarks.bench_lca_uncertainty
+
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from models.lca_model import LCAModel
+from models.lca_uncertainty import MonteCarloLCA
+from benchmarks.generators import synthetic_inventory
+
+FACTOR_UNCERTAINTY = pd.DataFrame({
+    'category': ['GWP', 'GWP', 'GWP'],
+    'substance': ['CO2', 'CH4', 'N2O'],
+    'distribution': ['uniform', 'lognormal', 'triangular'],
+    'gsd': [np.nan, 1.3, np.nan],
+    'low': [0.95, np.nan, 0.8],
+    'high': [1.05, np.nan, 1.4],
+})
+INVENTORY_UNCERTAINTY = pd.DataFrame({
+    'substance': ['CO2', 'CH4', 'N2O', 'energy_stage1', 'energy_stage2', 'energy_stage3'],
+    'distribution': ['lognormal', 'lognormal', 'lognormal', 'triangular', 'triangular', 'uniform'],
+    'gsd': [1.1, 1.5, 1.5, np.nan, np.nan, np.nan],
+    'low': [np.nan, np.nan, np.nan, 0.9, 0.9, 0.8],
+    'high': [np.nan, np.nan, np.nan, 1.2, 1.2, 1.2],
+})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    model = LCAModel()
+    for n_rows in args.rows:
+        df = synthetic_inventory(n_rows).ffill().bfill()
+        for workers in sorted(set(args.workers)):
+            mc = MonteCarloLCA(model, FACTOR_UNCERTAINTY, INVENTORY_UNCERTAINTY,
+                               n_samples=args.samples, max_workers=workers)
+            start = time.perf_counter()
+            mc.simulate(df)
+            elapsed = time.perf_counter() - start
+            print(f"{len(df)} rows x {args.samples} samples, {workers} worker(s): "
+                  f"{elapsed:.2f}s, {len(df) * args.samples / elapsed / 1e6:.2f}M row-samples/s")
+
+
+if __name__ == '__main__':
+    main()
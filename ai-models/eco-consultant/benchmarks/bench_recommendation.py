@@ -0,0 +1,54 @@
+# benchmarks/bench_recommendation.py
+#
+# Dense (pivot + all-pairs cosine) vs sparse (CSR + on-demand scoring) recommender.
+# Run from eco-consultant/: python -m benchmarks.bench_recommendation
+
+import argparse
+import time
+import numpy as np
+from models.recommendation_model import RecommendationModel
+from benchmarks.generators import synthetic_interactions
+
+
+def time_model(engine, df, users, top_n):
+    model = RecommendationModel(engine=engine)
+    start = time.perf_counter()
+    model.build_user_product_matrix(df)
+    build = time.perf_counter() - start
+    results = []
+    start = time.perf_counter()
+    for user_id in users:
+        results.append(model.recommend_products(user_id, top_n))
+    query = (time.perf_counter() - start) / len(users)
+    return build, query, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--top-n', type=int, default=5)
+    parser.add_argument('--max-dense-gb', type=float, default=2.0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        df = synthetic_interactions(size)
+        n_users, n_products = df['user_id'].nunique(), df['product_id'].nunique()
+        users = np.random.default_rng(1).choice(df['user_id'].unique(), args.queries, replace=False).tolist()
+        print(f"{size} interactions ({n_users} users x {n_products} products)")
+
+        build, query, sparse_results = time_model('sparse', df, users, args.top_n)
+        print(f"  sparse: build {build:.3f}s, {query * 1000:.2f} ms/query")
+
+        dense_gb = (n_users * n_users + n_users * n_products) * 8 / 1e9
+        if dense_gb > args.max_dense_gb:
+            print(f"  dense:  skipped (needs ~{dense_gb:.1f} GB)")
+            continue
+        build, query, dense_results = time_model('dense', df, users, args.top_n)
+        matches = sum(a == b for a, b in zip(sparse_results, dense_results))
+        print(f"  dense:  build {build:.3f}s, {query * 1000:.2f} ms/query")
+        print(f"  identical rankings: {matches}/{len(users)}")
+
+
+if __name__ == '__main__':
+    main()
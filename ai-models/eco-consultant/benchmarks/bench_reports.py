@@ -0,0 +1,73 @@
+# benchmarks/bench_reports.py
+#
+# Report generation for an impact table: the old one-cell-per-row FPDF
+# render vs the aggregated report built by ReportJobs, and a cached repeat.
+# Run from eco-consultant/: python -m benchmarks.bench_reports
+
+import argparse
+import os
+import tempfile
+import time
+from fpdf import FPDF
+from api.report_jobs import ReportJobs
+from storage.table_store import TableStore
+from benchmarks.generators import synthetic_impacts
+
+
+def legacy_report(store, name, path):
+    df = store.read(name, columns=['GWP', 'CED'])
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=12)
+    pdf.cell(200, 10, text="Environmental Impact Report", new_x='LMARGIN', new_y='NEXT', align='C')
+    for index, row in df.iterrows():
+        pdf.cell(200, 10, text=f"Row {index}: GWP={row['GWP']}, CED={row['CED']}", new_x='LMARGIN', new_y='NEXT')
+    pdf.output(path)
+
+
+def wait(jobs, job):
+    while jobs.status(job['id'])['status'] not in ('done', 'failed'):
+        time.sleep(0.01)
+    return jobs.status(job['id'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--legacy-rows', type=int, default=50_000,
+                        help="the per-row render is run on a prefix this long")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TableStore(os.path.join(tmp, 'processed'))
+        df = synthetic_impacts(args.rows)
+        store.write(df.iloc[:args.legacy_rows], 'legacy_impact')
+        store.write(df, 'data_impact')
+
+        start = time.perf_counter()
+        legacy_report(store, 'legacy_impact', os.path.join(tmp, 'legacy.pdf'))
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(tmp, 'legacy.pdf'))
+        print(f"{'per-row render':>26}: {elapsed:8.2f}s for {args.legacy_rows} rows, {size / 2**20:6.1f}MB")
+
+        jobs = ReportJobs(store, os.path.join(tmp, 'reports'))
+        try:
+            start = time.perf_counter()
+            job = jobs.submit('data.csv', 'data_impact')
+            submitted = time.perf_counter() - start
+            status = wait(jobs, job)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(jobs.report_path(job['id']))
+            print(f"{'queue (request returns)':>26}: {submitted * 1000:8.2f}ms")
+            print(f"{'aggregated report':>26}: {elapsed:8.2f}s for {args.rows} rows, {size / 2**20:6.1f}MB "
+                  f"({status['status']})")
+
+            start = time.perf_counter()
+            job = jobs.submit('data.csv', 'data_impact')
+            print(f"{'cached repeat':>26}: {(time.perf_counter() - start) * 1000:8.2f}ms ({job['status']})")
+        finally:
+            jobs.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_startup.py
+#
+# Cold start of each entry point: import time and peak RSS of a fresh
+# interpreter importing the module, and which heavy dependencies that
+# import pulled in.  Agents and models load on first use (agents/registry.py),
+# so an entry point should only pay for what its routes or jobs need.
+# Run from eco-consultant/: python -m benchmarks.bench_startup
+
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ENTRY_POINTS = ['main', 'batch_processor', 'dashboard.app', 'api.data_ingestion_api', 'api.data_cleaning_api',
+                'models.recommendation.app']
+RECOMMENDATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'recommendation')
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'sklearn', 'scipy', 'networkx', 'fpdf', 'kafka', 'fastapi', 'flask']
+
+# Runs in the child; prints one JSON line
+PROBE = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+error = None
+try:
+    importlib.import_module(sys.argv[1])
+except BaseException as e:
+    error = f"{type(e).__name__}: {e}"
+seconds = time.perf_counter() - start
+print(json.dumps({
+    'seconds': seconds,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'loaded': [name for name in sys.argv[2:] if name in sys.modules],
+    'error': error,
+}))
+"""
+
+
+def recommendation_root(directory, n_rows):
+    # The recommendation service has its own import root (it imports itself as
+    # models.recommendation) and reads data/interactions.csv from its working
+    # directory, so both are laid out under directory
+    os.makedirs(os.path.join(directory, 'models'))
+    os.symlink(os.path.realpath(RECOMMENDATION_DIR), os.path.join(directory, 'models', 'recommendation'))
+    os.makedirs(os.path.join(directory, 'data'))
+    rng = random.Random(0)
+    with open(os.path.join(directory, 'data', 'interactions.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_id', 'product_id', 'interaction'])
+        pairs = {(rng.randrange(n_rows // 20), rng.randrange(n_rows // 10)) for _ in range(n_rows)}
+        writer.writerows((user, product, round(rng.uniform(0.5, 5.0), 2)) for user, product in sorted(pairs))
+    return directory
+
+
+def probe(module, root=None):
+    # root is the import root and working directory; eco-consultant/ when None
+    root = root or os.getcwd()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-c', PROBE, module] + HEAVY_MODULES,
+                            capture_output=True, text=True, env=env, cwd=root)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='+', default=ENTRY_POINTS)
+    parser.add_argument('--interactions', type=int, default=100_000,
+                        help='rows of synthetic data/interactions.csv for the recommendation service')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        roots = {'models.recommendation.app': recommendation_root(tmp, args.interactions)}
+        run(args, roots)
+
+
+def run(args, roots):
+    # Warm the OS page cache so the first run is not an outlier
+    probe('json')
+    baseline = [probe('json') for _ in range(args.repeat)]
+    print(f"{'interpreter':>25}: {statistics.median(r['seconds'] for r in baseline) * 1000:8.1f}ms "
+          f"{statistics.median(r['max_rss_mb'] for r in baseline):7.1f}MB")
+    for module in args.only:
+        runs = [probe(module, roots.get(module)) for _ in range(args.repeat)]
+        seconds = statistics.median(r['seconds'] for r in runs)
+        rss = statistics.median(r['max_rss_mb'] for r in runs)
+        line = f"{module:>25}: {seconds * 1000:8.1f}ms {rss:7.1f}MB  loads {', '.join(runs[-1]['loaded']) or '-'}"
+        if runs[-1]['error']:
+            line += f"  (import failed: {runs[-1]['error']})"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_storage.py
+#
+# End-to-end clean -> impact -> dashboard read with CSV vs Parquet intermediates.
+# Run from eco-consultant/: python -m benchmarks.bench_storage
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from agents.data_cleaning_agent import DataCleaningAgent
+from agents.impact_analysis_agent import ImpactAnalysisAgent
+from storage.table_store import TableStore
+from benchmarks.generators import synthetic_inventory
+
+
+def run_pipeline(raw_path, processed_path, fmt):
+    store = TableStore(processed_path, fmt=fmt)
+    cleaning = DataCleaningAgent(raw_path, processed_path, store=store)
+    impact = ImpactAnalysisAgent(processed_path, store=store)
+    start = time.perf_counter()
+    cleaning.clean_csv('data.csv')
+    impact.analyze_impacts('data.csv')
+    pipeline = time.perf_counter() - start
+    start = time.perf_counter()
+    store.read('data_impact', columns=['GWP', 'CED']).describe()
+    dashboard = time.perf_counter() - start
+    size = sum(os.path.getsize(store.path(name)) for name in ('data', 'data_impact'))
+    return pipeline, dashboard, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for n_rows in args.rows:
+            raw_path = os.path.join(tmp_dir, 'raw')
+            os.makedirs(raw_path, exist_ok=True)
+            synthetic_inventory(n_rows).to_csv(os.path.join(raw_path, 'data.csv'), index=False)
+            raw_size = os.path.getsize(os.path.join(raw_path, 'data.csv'))
+            print(f"{n_rows} rows ({raw_size / 1e6:.1f} MB raw CSV)")
+            for fmt in ('csv', 'parquet'):
+                processed_path = os.path.join(tmp_dir, fmt)
+                pipeline, dashboard, size = run_pipeline(raw_path, processed_path, fmt)
+                print(f"  {fmt:8} clean+impact {pipeline:6.2f}s  dashboard read {dashboard:6.3f}s  "
+                      f"on disk {size / 1e6:7.1f} MB")
+                shutil.rmtree(processed_path)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
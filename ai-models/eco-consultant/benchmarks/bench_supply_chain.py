@@ -0,0 +1,72 @@
+# benchmarks/bench_supply_chain.py
+#
+# Betweenness (networkx vs array graph, exact vs sampled) and repeated
+# shortest-path queries on a synthetic supplier network.
+# Run from eco-consultant/: python -m benchmarks.bench_supply_chain
+
+import argparse
+import os
+import time
+import networkx as nx
+import numpy as np
+from models.supply_chain_model import SupplyChainModel, betweenness_error_bound
+from benchmarks.generators import synthetic_network
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=2000)
+    parser.add_argument('--out-degree', type=int, default=4)
+    parser.add_argument('--pivots', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--origins', type=int, default=20)
+    parser.add_argument('--skip-networkx', action='store_true')
+    args = parser.parse_args()
+
+    nodes, edges = synthetic_network(args.nodes, args.out_degree)
+    model = SupplyChainModel()
+    model.build_network(nodes, edges)
+    print(f"{len(nodes)} nodes, {len(edges)} edges")
+
+    exact = None
+    if not args.skip_networkx:
+        exact, elapsed = timed(lambda: nx.betweenness_centrality(model.G, weight='weight'))
+        print(f"networkx exact betweenness: {elapsed:.2f}s")
+    for workers in sorted({1, args.workers}):
+        result, elapsed = timed(lambda: model.calculate_betweenness_centrality(max_workers=workers))
+        print(f"array graph exact betweenness, {workers} worker(s): {elapsed:.2f}s")
+        exact = exact or result
+    for k in args.pivots:
+        result, elapsed = timed(lambda: model.calculate_betweenness_centrality(k=k, max_workers=1))
+        error = max(abs(result[v] - exact[v]) for v in nodes)
+        print(f"sampled betweenness, k={k}: {elapsed:.2f}s, max error {error:.4f} "
+              f"(bound {betweenness_error_bound(len(nodes), k):.4f} at 90%)")
+
+    rng = np.random.default_rng(1)
+    origins = rng.choice(len(nodes), size=args.origins, replace=False)
+    pairs = [(nodes[origins[rng.integers(args.origins)]], nodes[t]) for t in rng.integers(0, len(nodes), args.queries)]
+
+    def run_queries(find):
+        for source, target in pairs:
+            try:
+                find(source, target)
+            except nx.NetworkXNoPath:
+                pass
+
+    _, elapsed = timed(lambda: run_queries(
+        lambda s, t: nx.dijkstra_path(model.G, source=s, target=t, weight='emission')))
+    print(f"networkx dijkstra_path: {args.queries / elapsed:.0f} queries/s")
+    model.invalidate()
+    _, elapsed = timed(lambda: run_queries(model.find_shortest_path))
+    print(f"cached emission trees ({args.origins} origins): {args.queries / elapsed:.0f} queries/s")
+
+
+if __name__ == '__main__':
+    main()
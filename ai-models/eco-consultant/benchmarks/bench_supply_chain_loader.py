@@ -0,0 +1,83 @@
+# benchmarks/bench_supply_chain_loader.py
+#
+# Network load time and peak memory: json.load + build_network, streaming
+# JSON into arrays, and a memory-mapped binary snapshot.  Each loader runs in
+# a process forked from a small server, so peak RSS is its own.
+# Run from eco-consultant/: python -m benchmarks.bench_supply_chain_loader
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from benchmarks.generators import synthetic_network
+
+
+def load_json(path, model):
+    with open(path) as f:
+        data = json.load(f)
+    model.build_network(data['nodes'], data['edges'])
+    model.csr
+
+
+def load_streaming(path, model):
+    from models.network_json import read_network_json
+    model.load_graph(read_network_json(path))
+
+
+def load_snapshot(path, model):
+    model.load_snapshot(path)
+
+
+LOADERS = {'json.load': load_json, 'streaming': load_streaming, 'snapshot': load_snapshot}
+
+
+def run(name, path, source, target, queue):
+    from models.supply_chain_model import SupplyChainModel
+    model = SupplyChainModel()
+    start = time.perf_counter()
+    LOADERS[name](path, model)
+    loaded = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    load_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    model.find_shortest_path(source, target)
+    first_query = time.perf_counter() - start
+    queue.put((loaded, first_query, load_peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=200_000)
+    parser.add_argument('--out-degree', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'network.json')
+        snapshot_path = os.path.join(tmp, 'network_snapshot')
+        nodes, edges = synthetic_network(args.nodes, args.out_degree)
+        with open(json_path, 'w') as f:
+            json.dump({'nodes': nodes, 'edges': edges}, f)
+        del edges
+
+        from models.network_json import read_network_json
+        read_network_json(json_path).save(snapshot_path)
+        snapshot_mb = sum(os.path.getsize(os.path.join(snapshot_path, name))
+                          for name in os.listdir(snapshot_path)) / 2**20
+        print(f"{args.nodes} nodes, JSON {os.path.getsize(json_path) / 2**20:.0f}MB, snapshot {snapshot_mb:.0f}MB")
+
+        context = multiprocessing.get_context('forkserver')
+        for name in LOADERS:
+            path = snapshot_path if name == 'snapshot' else json_path
+            queue = context.Queue()
+            process = context.Process(target=run, args=(name, path, nodes[0], nodes[-1], queue))
+            process.start()
+            loaded, first_query, load_peak, query_peak = queue.get()
+            process.join()
+            print(f"{name:>10}: load {loaded:.2f}s (peak RSS {load_peak:.0f}MB), "
+                  f"+ first path query {first_query:.2f}s (peak RSS {query_peak:.0f}MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_supply_chain_scenarios.py
+#
+# What-if scenario queries per second on a synthetic supplier network:
+# incremental repair of cached results vs recomputing each scenario.
+# Run from eco-consultant/: python -m benchmarks.bench_supply_chain_scenarios
+
+import argparse
+import time
+import networkx as nx
+import numpy as np
+from models.csr_graph import pareto_search
+from models.supply_chain_model import SupplyChainModel
+from benchmarks.generators import synthetic_network
+
+
+def random_scenarios(model, n_scenarios, seed=0):
+    # Alternates "supplier goes offline" and "edge emission drops 30%"
+    rng = np.random.default_rng(seed)
+    nodes = list(model.G.nodes)
+    edges = list(model.G.edges)
+    scenarios = []
+    for i in range(n_scenarios):
+        if i % 2 == 0:
+            scenarios.append({'offline': [nodes[rng.integers(len(nodes))]]})
+        else:
+            scenarios.append({'emission_factors': {edges[rng.integers(len(edges))]: 0.7}})
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=100_000)
+    parser.add_argument('--out-degree', type=int, default=4)
+    parser.add_argument('--origins', type=int, default=5)
+    parser.add_argument('--scenarios', type=int, default=200)
+    parser.add_argument('--pareto-scenarios', type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    nodes, edges = synthetic_network(args.nodes, args.out_degree)
+    model = SupplyChainModel()
+    model.build_network(nodes, edges)
+    csr = model.csr
+    print(f"{len(nodes)} nodes, {len(edges)} edges, built in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(1)
+    origins = [nodes[i] for i in rng.choice(len(nodes), size=args.origins, replace=False)]
+    queries = [(origins[i % len(origins)], nodes[rng.integers(len(nodes))]) for i in range(args.scenarios)]
+    scenarios = random_scenarios(model, args.scenarios)
+
+    start = time.perf_counter()
+    for origin in origins:
+        model.emission_tree(origin)
+    print(f"base emission trees for {len(origins)} origins: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    for changes, (source, target) in zip(scenarios, queries):
+        try:
+            model.what_if(**changes).find_shortest_path(source, target)
+        except nx.NetworkXNoPath:
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"emission path, incremental repair: {len(scenarios) / elapsed:.1f} scenario queries/s")
+
+    n_full = min(len(scenarios), 20)
+    start = time.perf_counter()
+    for changes, (source, _) in zip(scenarios[:n_full], queries):
+        csr.dijkstra(csr.index[source], 'emission', model.what_if(**changes).emission_overrides)
+    elapsed = time.perf_counter() - start
+    print(f"emission path, full recompute: {n_full / elapsed:.1f} scenario queries/s")
+
+    pairs = queries[:args.pareto_scenarios]
+    start = time.perf_counter()
+    for source, target in pairs:
+        try:
+            model.find_pareto_routes(source, target)
+        except nx.NetworkXNoPath:
+            pass
+    print(f"base Pareto fronts for {len(pairs)} pairs: {time.perf_counter() - start:.2f}s")
+
+    reused = 0
+    start = time.perf_counter()
+    for changes, (source, target) in zip(scenarios, pairs):
+        scenario = model.what_if(**changes)
+        try:
+            routes = scenario.find_pareto_routes(source, target)
+            reused += routes is model.find_pareto_routes(source, target)
+        except nx.NetworkXNoPath:
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"Pareto routes, incremental: {len(pairs) / elapsed:.1f} scenario queries/s ({reused} reused)")
+
+    start = time.perf_counter()
+    for changes, (source, target) in zip(scenarios, pairs):
+        pareto_search(csr, csr.index[source], csr.index[target], model.what_if(**changes).overrides)
+    elapsed = time.perf_counter() - start
+    print(f"Pareto routes, full unbounded search: {len(pairs) / elapsed:.1f} scenario queries/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# benchmarks/fake_kafka.py
+#
+# In-process stand-in for a Kafka broker, with the parts of kafka-python's
+# KafkaConsumer / KafkaProducer the agents use: poll, commit, send, flush.
+# Committed offsets live on the broker, so a new consumer in the same group
+# resumes where the last one committed -- enough to exercise crash recovery.
+# rebalance() moves partitions the way kafka-python's eager protocol does:
+# inside the next poll, every partition is revoked, the new set assigned and
+# positions reset to the committed offsets.  Committing a partition the
+# consumer does not own raises CommitFailedError, as the broker would.
+
+import threading
+import time
+from collections import namedtuple
+
+TopicPartition = namedtuple('TopicPartition', ['topic', 'partition'])
+ConsumerRecord = namedtuple('ConsumerRecord', ['topic', 'partition', 'offset', 'key', 'value'])
+
+
+class CommitFailedError(Exception):
+    pass
+
+
+class FakeBroker:
+    def __init__(self, partitions=4):
+        self.partitions = partitions
+        self.logs = {}
+        self.committed = {}
+        self.lock = threading.Lock()
+        self._next_partition = 0
+
+    def produce(self, topic, value, key=None):
+        with self.lock:
+            logs = self.logs.setdefault(topic, [[] for _ in range(self.partitions)])
+            if key is None:
+                partition = self._next_partition
+                self._next_partition = (self._next_partition + 1) % self.partitions
+            else:
+                partition = hash(key) % self.partitions
+            logs[partition].append((key, value))
+            return TopicPartition(topic, partition), len(logs[partition]) - 1
+
+    def consumer(self, topic, group_id, value_deserializer=None):
+        return FakeConsumer(self, topic, group_id, value_deserializer)
+
+    def producer(self, value_serializer=None):
+        return FakeProducer(self, value_serializer)
+
+    def lag(self, topic, group_id):
+        # Messages not yet committed by the group
+        with self.lock:
+            logs = self.logs.get(topic, [])
+            return sum(len(log) - self.committed.get((group_id, TopicPartition(topic, p)), 0)
+                       for p, log in enumerate(logs))
+
+
+class FakeConsumer:
+    def __init__(self, broker, topic, group_id, value_deserializer=None):
+        self.broker = broker
+        self.topic = topic
+        self.group_id = group_id
+        self.value_deserializer = value_deserializer
+        self.listener = None
+        self._next_assignment = None
+        self.positions = self._committed_positions(range(broker.partitions))
+        self.commits = 0
+
+    def subscribe(self, topics, listener=None):
+        # Only the listener matters: the topic is fixed at construction
+        self.listener = listener
+
+    def rebalance(self, partitions):
+        # Takes effect inside the next poll, on the polling thread
+        self._next_assignment = sorted(partitions)
+
+    def assignment(self):
+        return set(self.positions)
+
+    def _committed_positions(self, partitions):
+        with self.broker.lock:
+            return {
+                TopicPartition(self.topic, p): self.broker.committed.get((self.group_id, TopicPartition(self.topic, p)), 0)
+                for p in partitions
+            }
+
+    def _apply_rebalance(self):
+        partitions, self._next_assignment = self._next_assignment, None
+        if self.listener is not None:
+            self.listener.on_partitions_revoked(set(self.positions))
+        self.positions = self._committed_positions(partitions)
+        if self.listener is not None:
+            self.listener.on_partitions_assigned(set(self.positions))
+
+    def poll(self, timeout_ms=0, max_records=None):
+        # Records are taken round-robin across partitions, one at a time, up to max_records
+        if self._next_assignment is not None:
+            self._apply_rebalance()
+        batch = {}
+        remaining = max_records or float('inf')
+        with self.broker.lock:
+            logs = self.broker.logs.get(self.topic)
+            active = list(self.positions) if logs else []
+            while active and remaining > 0:
+                for tp in list(active):
+                    position = self.positions[tp]
+                    log = logs[tp.partition]
+                    if position >= len(log) or remaining <= 0:
+                        active.remove(tp)
+                        continue
+                    key, value = log[position]
+                    if self.value_deserializer is not None:
+                        value = self.value_deserializer(value)
+                    batch.setdefault(tp, []).append(ConsumerRecord(self.topic, tp.partition, position, key, value))
+                    self.positions[tp] = position + 1
+                    remaining -= 1
+        if not batch and timeout_ms:
+            time.sleep(min(timeout_ms, 10) / 1000)
+        return batch
+
+    def commit(self, offsets):
+        not_owned = set(offsets) - set(self.positions)
+        if not_owned:
+            raise CommitFailedError(f"Partitions not assigned to this consumer: {sorted(not_owned)}")
+        with self.broker.lock:
+            for tp, offset in offsets.items():
+                self.broker.committed[(self.group_id, tp)] = offset.offset
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+class FakeProducer:
+    def __init__(self, broker, value_serializer=None):
+        self.broker = broker
+        self.value_serializer = value_serializer
+        self.sent = 0
+
+    def send(self, topic, value, key=None):
+        if self.value_serializer is not None:
+            value = self.value_serializer(value)
+        self.broker.produce(topic, value, key)
+        self.sent += 1
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
@@ -0,0 +1,79 @@
+# benchmarks/generators.py
+#
+# Seeded synthetic inputs shared by the benchmarks: emission inventories,
+# impact tables, user-product interactions and supplier networks.  The same
+# (size, seed) always gives the same data, so timings are comparable across
+# runs and machines.
+
+import numpy as np
+import pandas as pd
+
+# Input sizes for benchmarks/suite.py; small runs in seconds, large needs a few GB of RAM
+SCALES = {
+    'small': {'inventory_rows': 20_000, 'interactions': 50_000, 'graph_nodes': 1_000,
+              'messages': 500, 'files': 20, 'file_kb': 64},
+    'medium': {'inventory_rows': 200_000, 'interactions': 500_000, 'graph_nodes': 10_000,
+               'messages': 2_000, 'files': 100, 'file_kb': 256},
+    'large': {'inventory_rows': 2_000_000, 'interactions': 5_000_000, 'graph_nodes': 100_000,
+              'messages': 10_000, 'files': 400, 'file_kb': 256},
+}
+
+
+def synthetic_inventory(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'supplier': rng.choice([f'supplier_{i}' for i in range(500)], n_rows),
+        'region': rng.choice(['EU', 'NA', 'APAC', 'LATAM'], n_rows),
+        'year': rng.integers(2015, 2025, n_rows),
+        'CO2': rng.lognormal(3, 1, n_rows).round(4),
+        'CH4': rng.lognormal(0, 1, n_rows).round(4),
+        'N2O': rng.lognormal(-2, 1, n_rows).round(5),
+        'energy_stage1': rng.uniform(0, 100, n_rows).round(3),
+        'energy_stage2': rng.uniform(0, 50, n_rows).round(3),
+        'energy_stage3': rng.uniform(0, 25, n_rows).round(3),
+    })
+    # Some gaps for ffill and some repeated rows for drop_duplicates
+    for column in ['CO2', 'CH4', 'energy_stage2']:
+        df.loc[rng.random(n_rows) < 0.02, column] = np.nan
+    repeats = df.sample(frac=0.05, random_state=seed)
+    return pd.concat([df, repeats], ignore_index=True)
+
+
+def synthetic_interactions(n_interactions, seed=0):
+    rng = np.random.default_rng(seed)
+    n_users = max(50, n_interactions // 20)
+    n_products = max(100, n_interactions // 100)
+    # Zipf-ish product popularity so neighbourhoods look like real baskets
+    popularity = 1.0 / np.arange(1, n_products + 1) ** 0.8
+    df = pd.DataFrame({
+        'user_id': rng.integers(0, n_users, n_interactions),
+        'product_id': rng.choice(n_products, n_interactions, p=popularity / popularity.sum()),
+        'interaction': rng.uniform(0.5, 5.0, n_interactions).round(3),
+    })
+    return df.drop_duplicates(['user_id', 'product_id'])
+
+
+def synthetic_network(n_nodes, out_degree=4, seed=0):
+    # Nodes and edges in the network JSON layout: {'from', 'to', 'weight', 'emission'}
+    rng = np.random.default_rng(seed)
+    nodes = [f"S{i}" for i in range(n_nodes)]
+    sources = np.repeat(np.arange(n_nodes), out_degree)
+    targets = rng.integers(0, n_nodes, size=len(sources))
+    keep = sources != targets
+    weights = rng.integers(1, 10, size=len(sources))
+    emissions = rng.gamma(2.0, 5.0, size=len(sources)).round(3)
+    edges = [
+        {'from': nodes[a], 'to': nodes[b], 'weight': int(w), 'emission': float(e)}
+        for a, b, w, e in zip(sources[keep], targets[keep], weights[keep], emissions[keep])
+    ]
+    return nodes, edges
+
+
+def synthetic_impacts(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'supplier': rng.choice([f'supplier_{i}' for i in range(200)], n_rows),
+        'region': rng.choice(['EU', 'US', 'ASIA', 'LATAM'], n_rows),
+        'GWP': rng.gamma(2.0, 50.0, n_rows),
+        'CED': rng.gamma(2.0, 300.0, n_rows),
+    })
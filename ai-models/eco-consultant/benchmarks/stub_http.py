@@ -0,0 +1,61 @@
+# benchmarks/stub_http.py
+#
+# Local HTTP server standing in for data sources: GET /<name> returns a CSV
+# body of `body_bytes`, after `latency` seconds.  Paths under /flaky/ answer
+# 503 to their first `failures` requests, to exercise retries.
+
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    def __init__(self, body_bytes=256 * 1024, latency=0.02, failures=2):
+        self.body_bytes = body_bytes
+        self.latency = latency
+        self.failures = failures
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        row = b'supplier,region,year,CO2,CH4,N2O\nacme,EU,2023,1.5,0.02,0.001\n'
+        self.body = (row * (body_bytes // len(row) + 1))[:body_bytes]
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.requests[self.path] += 1
+                    count = server.requests[self.path]
+                time.sleep(server.latency)
+                if self.path.startswith('/flaky/') and count <= server.failures:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/csv')
+                self.send_header('Content-Length', str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
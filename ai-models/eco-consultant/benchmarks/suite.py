@@ -0,0 +1,400 @@
+# benchmarks/suite.py
+#
+# Runs every registered case at one scale (benchmarks/generators.py SCALES)
+# without Kafka or network access, writes time and peak memory per case to
+# a JSON file and flags regressions against a stored baseline.
+# Run from eco-consultant/:
+#   python -m benchmarks.suite --scale small --output results.json
+#   python -m benchmarks.suite --scale small --update-baseline
+#   python -m benchmarks.suite --scale small --only 'supply_chain.*' --baseline benchmarks/baselines/small.json
+#
+# Each case runs in its own process started from a forkserver, so the peak
+# RSS reported is that case's alone.  Inputs are generated in that process
+# before the clock starts; only the body a case returns is timed, and on
+# Linux the peak RSS is reset after setup so it covers the body only.
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.generators import SCALES
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines')
+# Slower or larger than the baseline by more than this share counts as a regression
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.20
+# Timings below this are too noisy to compare
+MIN_COMPARABLE_SECONDS = 0.005
+
+CASES = {}
+
+
+def case(name):
+    """Registers fn(scale, tmp) -> body, the callable timed on each repeat.
+
+    fn may return (prepare, body) instead: prepare() runs untimed before
+    every repeat and its result is passed to body.
+    """
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+@case('lca.calculate_impacts')
+def lca_impacts(scale, tmp):
+    from models.lca_model import LCAModel
+    from benchmarks.generators import synthetic_inventory
+    df = synthetic_inventory(scale['inventory_rows']).ffill()
+    model = LCAModel()
+    return lambda: model.calculate_impacts(df)
+
+
+@case('cleaning.in_memory')
+def cleaning_in_memory(scale, tmp):
+    return _cleaning(scale, tmp, None)
+
+
+@case('cleaning.streaming')
+def cleaning_streaming(scale, tmp):
+    return _cleaning(scale, tmp, max(1000, scale['inventory_rows'] // 10))
+
+
+def _cleaning(scale, tmp, chunksize):
+    from agents.data_cleaning_agent import DataCleaningAgent
+    from benchmarks.generators import synthetic_inventory
+    raw_path = os.path.join(tmp, 'raw')
+    os.makedirs(raw_path, exist_ok=True)
+    synthetic_inventory(scale['inventory_rows']).to_csv(os.path.join(raw_path, 'data.csv'), index=False)
+    agent = DataCleaningAgent(raw_path, os.path.join(tmp, 'processed'), chunksize=chunksize)
+    return lambda: agent.clean_csv('data.csv')
+
+
+@case('pipeline.clean_and_analyze')
+def pipeline(scale, tmp):
+    from agents.data_cleaning_agent import DataCleaningAgent
+    from agents.impact_analysis_agent import ImpactAnalysisAgent
+    from benchmarks.generators import synthetic_inventory
+    raw_path, processed_path = os.path.join(tmp, 'raw'), os.path.join(tmp, 'processed')
+    os.makedirs(raw_path, exist_ok=True)
+    synthetic_inventory(scale['inventory_rows']).to_csv(os.path.join(raw_path, 'data.csv'), index=False)
+    cleaning = DataCleaningAgent(raw_path, processed_path)
+    impact = ImpactAnalysisAgent(processed_path, store=cleaning.store)
+
+    def body():
+        cleaning.clean_csv('data.csv')
+        impact.analyze_impacts('data.csv')
+    return body
+
+
+@case('dashboard.summary')
+def dashboard_summary(scale, tmp):
+    from storage.table_store import TableStore
+    from benchmarks.generators import synthetic_impacts
+    store = TableStore(tmp)
+    store.write(synthetic_impacts(scale['inventory_rows']), 'data_impact')
+    # Drops the in-process cache each time, so the saved summary is loaded from disk
+    return lambda: TableStore(tmp).summary('data_impact').describe(['GWP', 'CED'])
+
+
+@case('api.clean_data_page')
+def clean_data_page(scale, tmp):
+    from fastapi.testclient import TestClient
+    from storage.table_store import TableStore
+    from benchmarks.bench_clean_data_api import build_app
+    from benchmarks.generators import synthetic_inventory
+    store = TableStore(tmp)
+    store.write(synthetic_inventory(scale['inventory_rows']).ffill(), 'data')
+    client = TestClient(build_app(store))
+    url = f"/clean_data/data?columns=supplier,CO2&filter=region:eq:EU&offset={scale['inventory_rows'] // 4}"
+    return lambda: client.get(url).raise_for_status()
+
+
+@case('recommendation.build')
+def recommendation_build(scale, tmp):
+    from models.recommendation_model import RecommendationModel
+    from benchmarks.generators import synthetic_interactions
+    df = synthetic_interactions(scale['interactions'])
+    return lambda: RecommendationModel().build_user_product_matrix(df)
+
+
+@case('recommendation.recommend')
+def recommendation_recommend(scale, tmp):
+    from models.recommendation_model import RecommendationModel
+    from benchmarks.generators import synthetic_interactions
+    df = synthetic_interactions(scale['interactions'])
+    model = RecommendationModel()
+    model.build_user_product_matrix(df)
+    users = df['user_id'].drop_duplicates().sample(100, random_state=0, replace=True).tolist()
+    return lambda: [model.recommend_products(user) for user in users]
+
+
+@case('supply_chain.load_streaming')
+def supply_chain_load(scale, tmp):
+    from models.network_json import read_network_json
+    from models.supply_chain_model import SupplyChainModel
+    path = _network_file(scale, tmp)
+    return lambda: SupplyChainModel().load_graph(read_network_json(path))
+
+
+@case('supply_chain.shortest_paths')
+def supply_chain_paths(scale, tmp):
+    model, nodes = _network_model(scale, tmp)
+    pairs = [(nodes[i], nodes[-1 - i]) for i in range(20)]
+
+    def body():
+        # Caches dropped so every repeat computes the paths
+        model._clear_caches()
+        for source, target in pairs:
+            model.find_shortest_path(source, target)
+    return body
+
+
+@case('supply_chain.betweenness_sampled')
+def supply_chain_betweenness(scale, tmp):
+    model, _ = _network_model(scale, tmp)
+    return lambda: model.calculate_betweenness_centrality(k=min(64, scale['graph_nodes']), max_workers=1)
+
+
+@case('supply_chain.pareto_routes')
+def supply_chain_pareto(scale, tmp):
+    model, nodes = _network_model(scale, tmp)
+    pairs = [(nodes[i], nodes[-1 - i]) for i in range(5)]
+
+    def body():
+        model._clear_caches()
+        for source, target in pairs:
+            model.find_pareto_routes(source, target)
+    return body
+
+
+def _network_file(scale, tmp):
+    from benchmarks.generators import synthetic_network
+    nodes, edges = synthetic_network(scale['graph_nodes'])
+    path = os.path.join(tmp, 'network.json')
+    with open(path, 'w') as f:
+        json.dump({'nodes': nodes, 'edges': edges}, f)
+    return path
+
+
+def _network_model(scale, tmp):
+    from models.network_json import read_network_json
+    from models.supply_chain_model import SupplyChainModel
+    path = _network_file(scale, tmp)
+    model = SupplyChainModel()
+    model.load_graph(read_network_json(path))
+    return model, [f"S{i}" for i in range(scale['graph_nodes'])]
+
+
+@case('processing.kafka_messages')
+def processing_messages(scale, tmp):
+    from benchmarks.bench_data_processing import fill_broker, run_agent
+    # Consumed messages cannot be replayed, so each repeat gets a freshly filled broker
+    prepare = lambda: fill_broker(scale['messages'], 0.2, partitions=4)
+    return prepare, lambda broker: run_agent(broker, lambda source: time.sleep(0.001), max_workers=8)
+
+
+@case('ingestion.http_downloads')
+def ingestion_downloads(scale, tmp):
+    from agents.data_ingestion_agent import DataIngestionAgent
+    from benchmarks.fake_kafka import FakeBroker
+    from benchmarks.stub_http import StubServer
+    server = StubServer(scale['file_kb'] * 1024, latency=0.01).__enter__()
+    producer = FakeBroker().producer(value_serializer=lambda v: json.dumps(v).encode('utf-8'))
+    agent = DataIngestionAgent(tmp, producer=producer, per_host_limit=8, retry_backoff=0.01)
+    n_flaky = scale['files'] // 10
+    urls = [f"{server.url}/data/source{i}" for i in range(scale['files'] - n_flaky)]
+    urls += [f"{server.url}/flaky/source{i}" for i in range(n_flaky)]
+
+    def body():
+        server.requests.clear()
+
+        async def run():
+            try:
+                return await agent.fetch_many(urls)
+            finally:
+                await agent.aclose()
+        results = asyncio.run(run())
+        if any(result['status'] != 'ok' for result in results):
+            raise RuntimeError("Some downloads failed")
+    return body
+
+
+def run_case(name, scale_name, repeat, queue):
+    # In the child: inputs first, then the timed repeats
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            body = CASES[name](SCALES[scale_name], tmp)
+            prepare = None
+            if isinstance(body, tuple):
+                prepare, body = body
+            setup_rss = _peak_rss_mb()
+            _reset_peak_rss()
+            times = []
+            for _ in range(repeat):
+                args = (prepare(),) if prepare else ()
+                start = time.perf_counter()
+                body(*args)
+                times.append(time.perf_counter() - start)
+            queue.put({'seconds_min': min(times), 'seconds_median': statistics.median(times), 'repeat': repeat,
+                       'peak_rss_mb': _peak_rss_mb(), 'setup_rss_mb': setup_rss})
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_suite(scale_name, patterns=None, repeat=3):
+    context = multiprocessing.get_context('forkserver')
+    results = {}
+    for name in sorted(CASES):
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        queue = context.Queue()
+        process = context.Process(target=run_case, args=(name, scale_name, repeat, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results[name] = result
+        if 'error' in result:
+            print(f"{name:>34}: FAILED {result['error']}")
+        else:
+            print(f"{name:>34}: {result['seconds_min'] * 1000:10.1f}ms (median {result['seconds_median'] * 1000:.1f}ms), "
+                  f"peak RSS {result['peak_rss_mb']:.0f}MB")
+    return {'meta': environment(scale_name, repeat), 'results': results}
+
+
+def environment(scale_name, repeat):
+    return {
+        'scale': scale_name,
+        'sizes': SCALES[scale_name],
+        'repeat': repeat,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(current, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Returns (name, what, baseline value, current value) for every regression."""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None or 'error' in before:
+            continue
+        if 'error' in result:
+            regressions.append((name, 'error', None, result['error']))
+            continue
+        if (before['seconds_min'] >= MIN_COMPARABLE_SECONDS
+                and result['seconds_min'] > before['seconds_min'] * (1 + time_tolerance)):
+            regressions.append((name, 'seconds_min', before['seconds_min'], result['seconds_min']))
+        if result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + memory_tolerance):
+            regressions.append((name, 'peak_rss_mb', before['peak_rss_mb'], result['peak_rss_mb']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite with a regression check')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--only', nargs='+', help='glob patterns of case names, e.g. "supply_chain.*"')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='results JSON file (default: benchmark-<scale>.json)')
+    parser.add_argument('--baseline', help='baseline JSON file (default: benchmarks/baselines/<scale>.json)')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(sorted(CASES)))
+        return 0
+    print(f"scale {args.scale}: {SCALES[args.scale]}")
+    current = run_suite(args.scale, args.only, args.repeat)
+    output = args.output or f'benchmark-{args.scale}.json'
+    _save(output, current)
+    print(f"Results written to {output}")
+
+    baseline_file = args.baseline or os.path.join(BASELINE_PATH, f'{args.scale}.json')
+    if args.update_baseline:
+        if os.path.exists(baseline_file):
+            # Cases left out by --only keep their previous baseline
+            with open(baseline_file) as f:
+                merged = json.load(f)
+            merged['results'].update(current['results'])
+            merged['meta'] = current['meta']
+            current = merged
+        _save(baseline_file, current)
+        print(f"Baseline written to {baseline_file}")
+        return 0
+    if not os.path.exists(baseline_file):
+        print(f"No baseline at {baseline_file}; run with --update-baseline to store one")
+        return 0
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    if (baseline['meta'].get('machine'), baseline['meta'].get('cpus')) != (current['meta']['machine'],
+                                                                          current['meta']['cpus']):
+        print(f"Warning: baseline was taken on {baseline['meta'].get('platform')} with "
+              f"{baseline['meta'].get('cpus')} CPUs; timings may not be comparable")
+    regressions = compare(current, baseline, args.time_tolerance, args.memory_tolerance)
+    for name, what, before, after in regressions:
+        if what == 'error':
+            print(f"REGRESSION {name}: now fails ({after})")
+        else:
+            print(f"REGRESSION {name}: {what} {before:.4g} -> {after:.4g} (+{(after / before - 1) * 100:.0f}%)")
+    if not regressions:
+        print(f"No regressions against {baseline_file} (commit {baseline['meta'].get('commit')})")
+    return 1 if regressions else 0
+
+
+def _reset_peak_rss():
+    # Linux resets VmHWM on this write; elsewhere the peak includes setup
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _save(path, data):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,12 @@
 from flask import Flask
 from dashboard.routes import dashboard_bp
+from monitoring import metrics
+from monitoring.web import instrument_flask
 
 app = Flask(__name__)
 app.register_blueprint(dashboard_bp)
+metrics.configure()
+instrument_flask(app, 'dashboard')
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -1,29 +1,79 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, render_template, jsonify
-import pandas as pd
-from agents.data_cleaning_agent import DataCleaningAgent
-from agents.impact_analysis_agent import ImpactAnalysisAgent
+from agents.registry import shared
+
+PROCESSED_DATA_PATH = './data/processed'
+IMPACT_COLUMNS = ['GWP', 'CED']
 
 dashboard_bp = Blueprint('dashboard', __name__)
+# The table store and the impact agent (LCA model, pandas) come from the shared
+# registry on first use; importing the dashboard builds neither
+# One analysis at a time, off the request thread
+analysis_executor = ThreadPoolExecutor(max_workers=1)
+analysis_lock = threading.Lock()
+analysis_runs = {}
+
+# Summaries come from TableStore.summary: written alongside each table and
+# cached in memory until the file changes, so no route reads the table itself
+
+def __getattr__(name):
+    # Module attributes kept for callers of the old globals
+    if name == 'store':
+        return shared.get('table_store')
+    if name == 'impact_analysis':
+        return shared.get('impact_analysis')
+    raise AttributeError(name)
+
+def summary_html(name, columns=None):
+    store = shared.get('table_store')
+    if not store.exists(name):
+        return f"<p>{name} has not been processed yet.</p>"
+    return store.summary(name).describe(columns).to_html()
+
+def analysis_status(file_name):
+    with analysis_lock:
+        future = analysis_runs.get(file_name)
+    if future is None:
+        return {'file': file_name, 'status': 'idle'}
+    if not future.done():
+        return {'file': file_name, 'status': 'running'}
+    if future.exception() is not None:
+        return {'file': file_name, 'status': 'failed', 'error': str(future.exception())}
+    return {'file': file_name, 'status': 'done'}
+
+def start_analysis(file_name):
+    with analysis_lock:
+        future = analysis_runs.get(file_name)
+        if future is None or future.done():
+            future = analysis_executor.submit(lambda: shared.get('impact_analysis').analyze_impacts(file_name))
+            future.add_done_callback(lambda f: f.exception() and logging.error(
+                f"Impact analysis of {file_name} failed: {f.exception()}"))
+            analysis_runs[file_name] = future
 
 @dashboard_bp.route('/')
 def index():
-    processed_data_path = './data/processed/data.csv'
-    df = pd.read_csv(processed_data_path)
-    summary = df.describe().to_html()
-    return render_template('index.html', summary=summary)
+    return render_template('index.html', summary=summary_html('data'))
 
 @dashboard_bp.route('/analyze')
 def analyze():
+    # Starts the analysis and answers straight away with the latest impact summary;
+    # poll /api/analysis_status for completion
+    from agents.impact_analysis_agent import impact_table_name
     file_name = 'data.csv'
-    impact_analysis.analyze_impacts(file_name)
-    impact_file = f'./data/processed/{file_name.replace(".csv", "_impact.csv")}'
-    df = pd.read_csv(impact_file)
-    summary = df.describe().to_html()
-    return render_template('index.html', summary=summary)
+    start_analysis(file_name)
+    return render_template('index.html', summary=summary_html(impact_table_name(file_name)),
+                           status=analysis_status(file_name))
+
+@dashboard_bp.route('/api/analysis_status')
+def analysis_status_api():
+    return jsonify(analysis_status('data.csv'))
 
 @dashboard_bp.route('/api/impact_data')
 def impact_data():
-    processed_data_path = './data/processed/data_impact.csv'
-    df = pd.read_csv(processed_data_path)
-    summary = df[['GWP', 'CED']].describe()
+    store = shared.get('table_store')
+    if not store.exists('data_impact'):
+        return jsonify({'error': 'data_impact has not been processed yet'}), 404
+    summary = store.summary('data_impact').describe(IMPACT_COLUMNS)
     return jsonify(summary.to_dict())
\ No newline at end of file
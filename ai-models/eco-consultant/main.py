@@ -1,28 +1,19 @@
 # main.py
 
-from agents.data_ingestion_agent import DataIngestionAgent
-from agents.data_processing_agent import DataProcessingAgent
-from agents.data_cleaning_agent import DataCleaningAgent
-from agents.impact_analysis_agent import ImpactAnalysisAgent
-from models.lca_model import LCAModel
+from agents.registry import shared
+from monitoring import metrics
 
 def main():
-    # Initialize agents
-    data_ingestion = DataIngestionAgent(raw_data_path='./data/raw')
-    data_cleaning = DataCleaningAgent(
-        raw_data_path='./data/raw',
-        processed_data_path='./data/processed'
-    )
-    data_processing_agent = DataProcessingAgent()
-    lca_model = LCAModel()
-    impact_analysis = ImpactAnalysisAgent(
-        processed_data_path='./data/processed',
-        impact_model=lca_model
-    )
+    # Agents are built by the shared registry (./data/raw, ./data/processed by default)
+    from agents.data_ingestion_agent import raw_file_name
+    data_ingestion = shared.get('data_ingestion')
+    data_cleaning = shared.get('data_cleaning')
+    data_processing_agent = shared.get('data_processing')
+    impact_analysis = shared.get('impact_analysis')
 
     # Define the callback function for processing data
     def process_data(api_url):
-        file_name = api_url.split('/')[-1] + '.csv'
+        file_name = raw_file_name(api_url)
         data_cleaning.clean_csv(file_name)  # Trigger the data cleaning
 
     # Example workflow
@@ -39,4 +30,5 @@ def main():
     impact_analysis.analyze_impacts('data.csv')
 
 if __name__ == "__main__":
+    metrics.configure()
     main()
@@ -0,0 +1,380 @@
+# models/csr_graph.py
+
+import heapq
+import json
+import os
+import shutil
+import networkx as nx
+import numpy as np
+
+
+class CSRGraph:
+    """Directed graph as compressed sparse rows: node i's out-edges are
+    indices[indptr[i]:indptr[i + 1]], with one parallel array per edge attribute.
+
+    Searches read the arrays in place, a node's slice at a time, so a graph
+    loaded from a snapshot stays memory-mapped and shared between processes.
+    """
+
+    def __init__(self, nodes, indptr, indices, data):
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self._sources = None
+        self._in_edges = None
+
+    @classmethod
+    def from_networkx(cls, G, attributes=('weight', 'emission')):
+        nodes = list(G.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        n_edges = G.number_of_edges()
+        sources = np.empty(n_edges, dtype=np.int64)
+        targets = np.empty(n_edges, dtype=np.int64)
+        data = {attr: np.empty(n_edges, dtype=np.float64) for attr in attributes}
+        for i, (u, v, attrs) in enumerate(G.edges(data=True)):
+            sources[i] = index[u]
+            targets[i] = index[v]
+            for attr in attributes:
+                data[attr][i] = attrs.get(attr, 1.0)
+        return cls.from_edges(nodes, sources, targets, data)
+
+    @classmethod
+    def from_edges(cls, nodes, sources, targets, data):
+        # Rows sorted by target so edge_position can binary search; a repeated
+        # edge keeps its last attributes, as DiGraph.add_edge does
+        order = np.lexsort((targets, sources))
+        sources, targets = sources[order], targets[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources[keep], minlength=len(nodes)), out=indptr[1:])
+        return cls(nodes, indptr, targets[keep], {attr: values[order][keep] for attr, values in data.items()})
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        # Edge arrays are memory-mapped by default: loading is near-instant and pages come in on use.
+        # Nothing is unpickled, so a snapshot cannot carry code
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, 'nodes.json'), encoding='utf-8') as f:
+            nodes = json.load(f)
+        indptr = np.load(os.path.join(path, 'indptr.npy'), mmap_mode=mode, allow_pickle=False)
+        indices = np.load(os.path.join(path, 'indices.npy'), mmap_mode=mode, allow_pickle=False)
+        data = {}
+        for name in sorted(os.listdir(path)):
+            if name.startswith('data_'):
+                data[name[len('data_'):-len('.npy')]] = np.load(os.path.join(path, name), mmap_mode=mode,
+                                                                allow_pickle=False)
+        return cls(nodes, indptr, indices, data)
+
+    def save(self, path):
+        # Written next to the target and swapped in, so a crash never leaves half a snapshot.
+        # Node ids go to JSON, so they must be strings or numbers
+        unsupported = {type(node).__name__ for node in self.nodes
+                       if isinstance(node, bool) or not isinstance(node, (str, int, float))}
+        if unsupported:
+            raise ValueError(f"Snapshots need string or number node ids, got {sorted(unsupported)}")
+        tmp_path, old_path = path + '.tmp', path + '.old'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        with open(os.path.join(tmp_path, 'nodes.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.nodes, f)
+        np.save(os.path.join(tmp_path, 'indptr.npy'), np.asarray(self.indptr))
+        np.save(os.path.join(tmp_path, 'indices.npy'), np.asarray(self.indices))
+        for attr, values in self.data.items():
+            np.save(os.path.join(tmp_path, f'data_{attr}.npy'), np.asarray(values))
+        if os.path.exists(path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def to_networkx(self):
+        G = nx.DiGraph()
+        G.add_nodes_from(self.nodes)
+        sources = self.edge_sources().tolist()
+        targets = self.indices.tolist()
+        columns = {attr: values.tolist() for attr, values in self.data.items()}
+        G.add_edges_from(
+            (self.nodes[u], self.nodes[v], {attr: columns[attr][e] for attr in columns})
+            for e, (u, v) in enumerate(zip(sources, targets))
+        )
+        return G
+
+    @property
+    def n_nodes(self):
+        return len(self.nodes)
+
+    def adjacency(self, attr):
+        # (indptr, indices, values) without copying; loops take one node's slice at a time
+        return np.asarray(self.indptr), np.asarray(self.indices), np.asarray(self.data[attr])
+
+    def edge_sources(self):
+        # Source position of every edge
+        if self._sources is None:
+            self._sources = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+        return self._sources
+
+    def in_edges(self):
+        # Reverse index: edge positions entering node v are edges[ptr[v]:ptr[v + 1]]
+        if self._in_edges is None:
+            order = np.argsort(self.indices, kind='stable')
+            ptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.n_nodes), out=ptr[1:])
+            self._in_edges = (ptr, order)
+        return self._in_edges
+
+    def edge_position(self, u, v):
+        start, end = self.indptr[u], self.indptr[u + 1]
+        i = start + np.searchsorted(self.indices[start:end], v)
+        if i < end and self.indices[i] == v:
+            return int(i)
+        return None
+
+    def dijkstra(self, source, attr, overrides=None):
+        """Single-source shortest path tree from node position `source`.
+
+        overrides maps edge positions to replacement weights (inf drops the edge).
+        """
+        indptr, indices, weights = self.adjacency(attr)
+        dist = [float('inf')] * self.n_nodes
+        pred = [-1] * self.n_nodes
+        done = [False] * self.n_nodes
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            d, v = heapq.heappop(heap)
+            if done[v]:
+                continue
+            done[v] = True
+            start, end = indptr[v], indptr[v + 1]
+            for e, w, weight in zip(range(start, end), indices[start:end].tolist(), weights[start:end].tolist()):
+                nd = d + (overrides[e] if overrides and e in overrides else weight)
+                if nd < dist[w]:
+                    dist[w] = nd
+                    pred[w] = v
+                    heapq.heappush(heap, (nd, w))
+        return PathTree(source, dist, pred)
+
+
+    def distances_to(self, target, attr):
+        # Shortest distance from every node to `target` (inf if it cannot reach it), on reversed edges
+        _, _, weights = self.adjacency(attr)
+        sources = self.edge_sources()
+        in_ptr, in_edges = self.in_edges()
+        dist = [float('inf')] * self.n_nodes
+        done = [False] * self.n_nodes
+        dist[target] = 0.0
+        heap = [(0.0, target)]
+        while heap:
+            d, v = heapq.heappop(heap)
+            if done[v]:
+                continue
+            done[v] = True
+            edges = in_edges[in_ptr[v]:in_ptr[v + 1]]
+            for u, weight in zip(sources[edges].tolist(), weights[edges].tolist()):
+                nd = d + weight
+                if nd < dist[u]:
+                    dist[u] = nd
+                    heapq.heappush(heap, (nd, u))
+        return np.asarray(dist)
+
+class PathTree:
+    """Single-source shortest path tree: dist (inf when unreachable) and pred (-1) per node position."""
+
+    def __init__(self, source, dist, pred):
+        self.source = source
+        self.dist = np.asarray(dist, dtype=np.float64)
+        self.pred = np.asarray(pred, dtype=np.int32)
+        self._children = None
+
+    def path_to(self, target, pred=None):
+        # Node positions from the source to target, or None; a pred dict overlays the tree
+        path = [target]
+        position = target
+        while position != self.source:
+            position = pred[position] if pred and position in pred else int(self.pred[position])
+            if position < 0:
+                return None
+            path.append(position)
+        return path[::-1]
+
+    def subtree(self, roots):
+        # All positions whose tree path passes through one of roots
+        if self._children is None:
+            order = np.argsort(self.pred, kind='stable')
+            ptr = np.zeros(len(self.pred) + 2, dtype=np.int64)
+            np.cumsum(np.bincount(self.pred + 1, minlength=len(self.pred) + 1), out=ptr[1:])
+            self._children = (ptr.tolist(), order.tolist())
+        ptr, order = self._children
+        found = set(roots)
+        stack = list(found)
+        while stack:
+            v = stack.pop()
+            for child in order[ptr[v + 1]:ptr[v + 2]]:
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        return found
+
+    def repaired(self, graph, attr, overrides):
+        """(dist, pred) dicts for the nodes whose shortest path changes under overrides.
+
+        Only the subtrees hanging off edges that got worse are reset and rebuilt
+        from their unaffected in-neighbours; edges that got better seed a
+        Dijkstra that spreads only as far as distances keep improving.
+        """
+        indptr, indices, weights = graph.adjacency(attr)
+        sources = graph.edge_sources()
+        in_ptr, in_edges = graph.in_edges()
+        base_dist, base_pred = self.dist, self.pred
+        dist, pred = {}, {}
+
+        def distance(v):
+            return dist[v] if v in dist else base_dist[v]
+
+        def weight(e, base):
+            return overrides[e] if e in overrides else base
+
+        worse, better = [], []
+        for e, value in overrides.items():
+            u, v = int(sources[e]), int(indices[e])
+            if value > weights[e] and base_pred[v] == u:
+                worse.append(v)
+            elif value < weights[e]:
+                better.append(e)
+
+        heap = []
+        reset = self.subtree(worse) if worse else set()
+        for v in reset:
+            dist[v] = float('inf')
+            pred[v] = -1
+        for v in reset:
+            edges = in_edges[in_ptr[v]:in_ptr[v + 1]]
+            for e, u, base in zip(edges.tolist(), sources[edges].tolist(), weights[edges].tolist()):
+                if u not in reset:
+                    d = distance(u) + weight(e, base)
+                    if d < dist[v]:
+                        dist[v] = d
+                        pred[v] = u
+            if dist[v] < float('inf'):
+                heapq.heappush(heap, (dist[v], v))
+        for e in better:
+            u, v = int(sources[e]), int(indices[e])
+            d = distance(u) + weight(e, weights[e])
+            if d < distance(v):
+                dist[v] = d
+                pred[v] = u
+                heapq.heappush(heap, (d, v))
+
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > distance(v):
+                continue
+            start, end = indptr[v], indptr[v + 1]
+            for e, w, base in zip(range(start, end), indices[start:end].tolist(), weights[start:end].tolist()):
+                nd = d + weight(e, base)
+                if nd < distance(w):
+                    dist[w] = nd
+                    pred[w] = v
+                    heapq.heappush(heap, (nd, w))
+        return dist, pred
+
+
+def pareto_search(graph, source, target, overrides=None, bounds=None):
+    """Non-dominated (cost, emission) routes from source to target, cheapest first.
+
+    Bi-objective label setting: labels leave the heap in (cost, emission)
+    order, so a label is dominated exactly when its node (or the target)
+    already settled one with no more emission.  bounds are lower bounds on
+    the remaining (cost, emission) to the target per node, e.g.
+    distances_to for each objective; they order the heap by estimated total
+    and drop labels that cannot reach the target or cannot beat its front.
+    overrides maps edge positions to replacement (cost, emission) pairs;
+    inf drops the edge.
+    """
+    indptr, indices, cost = graph.adjacency('weight')
+    _, _, emission = graph.adjacency('emission')
+    if bounds is None:
+        to_cost = to_emission = [0.0] * graph.n_nodes
+    else:
+        to_cost, to_emission = (np.asarray(bound).tolist() for bound in bounds)
+    best = [float('inf')] * graph.n_nodes
+    labels = []
+    front = []
+    heap = [(to_cost[source], to_emission[source], 0.0, 0.0, source, -1)]
+    while heap:
+        _, f, c, em, v, parent = heapq.heappop(heap)
+        if em >= best[v] or f >= best[target]:
+            continue
+        best[v] = em
+        labels.append((v, parent))
+        if v == target:
+            front.append((c, em, len(labels) - 1))
+            continue
+        label = len(labels) - 1
+        start, end = indptr[v], indptr[v + 1]
+        for e, w, dc, de in zip(range(start, end), indices[start:end].tolist(),
+                                cost[start:end].tolist(), emission[start:end].tolist()):
+            if overrides and e in overrides:
+                dc, de = overrides[e]
+            ne = em + de
+            nf = ne + to_emission[w]
+            if ne < best[w] and nf < best[target]:
+                nc = c + dc
+                heapq.heappush(heap, (nc + to_cost[w], nf, nc, ne, w, label))
+
+    routes = []
+    for c, em, label in front:
+        path = []
+        while label >= 0:
+            v, label = labels[label]
+            path.append(v)
+        routes.append((path[::-1], c, em))
+    return routes
+
+def brandes_dependencies(adjacency, n_nodes, sources):
+    """Sum of Brandes dependencies over `sources` (weighted, directed); unnormalised.
+
+    Follows networkx's weighted single-source search and accumulation so the
+    totals match nx.betweenness_centrality before rescaling.
+    """
+    indptr, indices, weights = adjacency
+    betweenness = [0.0] * n_nodes
+    for s in sources:
+        order = []
+        preds = {}
+        sigma = {s: 1.0}
+        dist = {}
+        seen = {s: 0.0}
+        counter = 0
+        heap = [(0.0, counter, s, s)]
+        while heap:
+            d, _, pred, v = heapq.heappop(heap)
+            if v in dist:
+                continue
+            sigma[v] += sigma[pred] if pred != v else 0.0
+            order.append(v)
+            dist[v] = d
+            start, end = indptr[v], indptr[v + 1]
+            for w, weight in zip(indices[start:end].tolist(), weights[start:end].tolist()):
+                vw = d + weight
+                if w not in dist and (w not in seen or vw < seen[w]):
+                    seen[w] = vw
+                    counter += 1
+                    heapq.heappush(heap, (vw, counter, v, w))
+                    sigma[w] = 0.0
+                    preds[w] = [v]
+                elif vw == seen.get(w):
+                    sigma[w] += sigma[v]
+                    preds[w].append(v)
+        delta = dict.fromkeys(order, 0.0)
+        while order:
+            w = order.pop()
+            coeff = (1.0 + delta[w]) / sigma[w]
+            for v in preds.get(w, ()):
+                delta[v] += sigma[v] * coeff
+            if w != s:
+                betweenness[w] += delta[w]
+    return betweenness
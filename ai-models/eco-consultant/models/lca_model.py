@@ -1,24 +1,85 @@
 # models/lca_model.py
 
+import os
+import numpy as np
 import pandas as pd
 
+# Example GWP factors (in kg CO2 eq per unit emission)
+DEFAULT_GWP_FACTORS = {
+    'CO2': 1.0,
+    'CH4': 25.0,
+    'N2O': 298.0
+}
+# Cumulative Energy Demand is the plain sum of the stage energies
+DEFAULT_CED_COLUMNS = ['energy_stage1', 'energy_stage2', 'energy_stage3']
+# Characterization tables to load instead of the defaults, separated by os.pathsep
+FACTOR_FILES = os.environ.get('LCA_FACTOR_FILES')
+
 class LCAModel:
-    def __init__(self):
-        # Example GWP factors (in kg CO2 eq per unit emission)
-        self.gwp_factors = {
-            'CO2': 1.0,
-            'CH4': 25.0,
-            'N2O': 298.0
-        }
+    def __init__(self, factors=None, block_rows=100_000):
+        # Characterization factors: one row per substance (an inventory column),
+        # one column per impact category
+        if factors is None:
+            factors = default_factors()
+        self.factors = factors.fillna(0.0).astype('float64')
+        self.block_rows = block_rows
+        self.gwp_factors = self.factors['GWP'][self.factors['GWP'] != 0].to_dict() if 'GWP' in self.factors else {}
+
+    @classmethod
+    def from_files(cls, *paths, **kwargs):
+        """Load long-format tables with category, substance and factor columns.
+
+        Each file can hold any number of categories (e.g. GWP100, GWP20,
+        acidification); later files override earlier ones for the same pair.
+        """
+        frames = []
+        for path in paths:
+            if path.endswith('.parquet'):
+                frames.append(pd.read_parquet(path, columns=['category', 'substance', 'factor']))
+            else:
+                frames.append(pd.read_csv(path, usecols=['category', 'substance', 'factor']))
+        long = pd.concat(frames, ignore_index=True).drop_duplicates(['category', 'substance'], keep='last')
+        factors = long.pivot(index='substance', columns='category', values='factor')
+        return cls(factors, **kwargs)
+
+    @classmethod
+    def from_environment(cls):
+        if FACTOR_FILES:
+            return cls.from_files(*FACTOR_FILES.split(os.pathsep))
+        return cls()
+
+    @property
+    def categories(self):
+        return list(self.factors.columns)
+
+    def calculate_impacts(self, df, categories=None):
+        """All impact categories for every row as one (rows x substances) @ (substances x categories) product.
+
+        Substances missing from df contribute nothing and missing values count
+        as zero.  df is not modified; rows are processed block_rows at a time so
+        the dense inventory block stays bounded for wide inventories.
+        """
+        factors = self.factors if categories is None else self.factors[categories]
+        substances = factors.index[factors.index.isin(df.columns)]
+        matrix = factors.loc[substances].to_numpy()
+        positions = df.columns.get_indexer(substances)
+        result = np.zeros((len(df), matrix.shape[1]))
+        for start in range(0, len(df), self.block_rows):
+            block = df.iloc[start:start + self.block_rows, positions]
+            result[start:start + self.block_rows] = block.to_numpy(dtype='float64', na_value=0.0) @ matrix
+        return pd.DataFrame(result, index=df.index, columns=factors.columns)
 
     def calculate_gwp(self, df):
-        df['GWP'] = 0
-        for gas, factor in self.gwp_factors.items():
-            if gas in df.columns:
-                df['GWP'] += df[gas] * factor
-        return df['GWP']
+        return self.calculate_impacts(df, ['GWP'])['GWP']
 
     def calculate_ced(self, df):
         # Cumulative Energy Demand
-        df['CED'] = df[['energy_stage1', 'energy_stage2', 'energy_stage3']].sum(axis=1)
-        return df['CED']
+        return self.calculate_impacts(df, ['CED'])['CED']
+
+
+def default_factors():
+    substances = list(DEFAULT_GWP_FACTORS) + DEFAULT_CED_COLUMNS
+    factors = pd.DataFrame(0.0, index=pd.Index(substances, name='substance'), columns=['GWP', 'CED'])
+    factors.loc[list(DEFAULT_GWP_FACTORS), 'GWP'] = list(DEFAULT_GWP_FACTORS.values())
+    factors.loc[DEFAULT_CED_COLUMNS, 'CED'] = 1.0
+    return factors
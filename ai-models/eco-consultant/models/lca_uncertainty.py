@@ -0,0 +1,186 @@
+# models/lca_uncertainty.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Uncertainty is expressed as a multiplier around the deterministic value:
+#   lognormal   median 1, geometric standard deviation `gsd`
+#   triangular  mode 1, between `low` and `high` (e.g. 0.8 and 1.3)
+#   uniform     between `low` and `high`
+# Characterization factors get one multiplier per (substance, category) and
+# sample, shared by every row and every call; inventory values get independent
+# multipliers per row and sample.
+DISTRIBUTIONS = {'fixed': 0, 'lognormal': 1, 'triangular': 2, 'uniform': 3}
+SAMPLE_BLOCK = 256
+
+class MonteCarloLCA:
+    def __init__(self, lca_model, factor_uncertainty=None, inventory_uncertainty=None,
+                 n_samples=1000, percentiles=(5, 50, 95), seed=0, block_elements=2**23, max_workers=None):
+        """factor_uncertainty: frame with category, substance, distribution, gsd, low, high.
+        inventory_uncertainty: frame with substance, distribution, gsd, low, high.
+        Pairs or substances that are not listed stay fixed."""
+        self.lca_model = lca_model
+        self.n_samples = n_samples
+        self.percentiles = tuple(percentiles)
+        self.seed = seed
+        self.block_elements = block_elements
+        self.max_workers = max_workers
+        self._calls = 0
+
+        factors = lca_model.factors
+        self.substances = factors.index
+        self.categories = factors.columns
+        self.factors = factors.to_numpy()
+        # (kind, gsd, low, high), each substances x categories; samples are drawn per call
+        # for the substances present only (see _factor_samples)
+        self.factor_spec = tuple(array.reshape(factors.shape) for array in
+                                 _spec_arrays(factor_uncertainty, factors.stack().index, ['substance', 'category']))
+        self.inventory_spec = _spec_arrays(inventory_uncertainty, self.substances, ['substance'])
+
+    @classmethod
+    def from_files(cls, lca_model, factor_file=None, inventory_file=None, **kwargs):
+        return cls(lca_model,
+                   factor_uncertainty=pd.read_csv(factor_file) if factor_file else None,
+                   inventory_uncertainty=pd.read_csv(inventory_file) if inventory_file else None,
+                   **kwargs)
+
+    @classmethod
+    def from_environment(cls, lca_model):
+        # Enabled when LCA_MC_SAMPLES is set; returns None otherwise
+        if not os.environ.get('LCA_MC_SAMPLES'):
+            return None
+        return cls.from_files(lca_model,
+                              factor_file=os.environ.get('LCA_FACTOR_UNCERTAINTY'),
+                              inventory_file=os.environ.get('LCA_INVENTORY_UNCERTAINTY'),
+                              n_samples=int(os.environ['LCA_MC_SAMPLES']))
+
+    def columns(self):
+        return [f"{category}_p{q:g}" for category in self.categories for q in self.percentiles]
+
+    def simulate(self, df):
+        """Percentiles of every impact category per row, e.g. GWP_p5 / GWP_p50 / GWP_p95.
+
+        Substances absent from df contribute nothing and are dropped first.
+        Rows are processed in blocks whose working arrays (every sample of
+        every category, plus the temporaries of one sample block) stay under
+        block_elements float64s per block; the factor samples of the present
+        substances (samples x substances x categories) come on top, once per
+        call.  With max_workers the blocks fan out to a process pool; the
+        factor samples reach each worker once, not once per block.  Each block
+        has its own seeded stream, so results do not depend on the number of
+        workers.  Every call draws fresh inventory samples; a model built with
+        the same seed replays the same sequence of calls.
+        """
+        positions = df.columns.get_indexer(self.substances)
+        present = np.flatnonzero(positions >= 0)
+        inventory = df.iloc[:, positions[present]].to_numpy(dtype='float64', na_value=0.0)
+        factor_samples = self._factor_samples(present)
+        inventory_spec = tuple(array[present] for array in self.inventory_spec)
+
+        block_rows = max(1, self.block_elements // _row_elements(self.n_samples, len(present), len(self.categories)))
+        call = self._calls
+        self._calls += 1
+        tasks = [(inventory[start:start + block_rows], (self.seed, call, i))
+                 for i, start in enumerate(range(0, len(df), block_rows))]
+        if self.max_workers and self.max_workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(factor_samples, inventory_spec, self.percentiles)) as pool:
+                blocks = list(pool.map(_simulate_worker_block, tasks))
+        else:
+            blocks = [_simulate_block(block, factor_samples, inventory_spec, self.percentiles, key)
+                      for block, key in tasks]
+
+        result = np.concatenate(blocks, axis=0) if blocks else np.zeros((0, len(self.columns())))
+        return pd.DataFrame(result, index=df.index, columns=self.columns())
+
+    def _factor_samples(self, substances):
+        # (samples, substances, categories) factors for the given substance positions.  Each
+        # substance draws from its own stream, so its samples are the same in every call
+        # whatever else the frame holds
+        samples = np.empty((self.n_samples, len(substances), len(self.categories)))
+        for i, j in enumerate(substances):
+            rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(0, int(j))))
+            spec = tuple(array[j] for array in self.factor_spec)
+            samples[:, i, :] = self.factors[j] * _sample(rng, spec, (self.n_samples,))
+        return samples
+
+
+def _row_elements(n_samples, n_substances, n_categories):
+    # float64s held per row of a block: every sample of every category, the
+    # percentile copy of one category, and one sample block of multipliers
+    # (with the draw's temporaries), sampled inventory and products
+    sample_block = min(n_samples, SAMPLE_BLOCK)
+    return n_samples * (n_categories + 1) + sample_block * (4 * n_substances + n_categories)
+
+
+# Set in each pool worker by _init_worker
+_worker_args = None
+
+
+def _init_worker(factor_samples, inventory_spec, percentiles):
+    global _worker_args
+    _worker_args = (factor_samples, inventory_spec, percentiles)
+
+
+def _simulate_worker_block(task):
+    inventory, key = task
+    return _simulate_block(inventory, *_worker_args, key)
+
+
+def _simulate_block(inventory, factor_samples, inventory_spec, percentiles, key):
+    seed, call, block = key
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1, call, block)))
+    n_samples, _, n_categories = factor_samples.shape
+    varying = inventory_spec[0] != DISTRIBUTIONS['fixed']
+    # Category-major, so each category is reduced to its percentiles on its own
+    results = np.empty((n_categories, len(inventory), n_samples))
+    for start in range(0, n_samples, SAMPLE_BLOCK):
+        factors = factor_samples[start:start + SAMPLE_BLOCK]
+        if varying.any():
+            # (samples, rows, substances) @ (samples, substances, categories)
+            multipliers = _sample(rng, inventory_spec, (len(factors), len(inventory)))
+            sampled = inventory[None, :, :] * multipliers
+            results[:, :, start:start + len(factors)] = np.matmul(sampled, factors).transpose(2, 1, 0)
+        else:
+            results[:, :, start:start + len(factors)] = np.einsum('rj,sjc->crs', inventory, factors)
+    # rows x (category, percentile) columns
+    quantiles = np.empty((len(inventory), n_categories, len(percentiles)))
+    for c in range(n_categories):
+        quantiles[:, c, :] = np.percentile(results[c], percentiles, axis=1).T
+    return quantiles.reshape(len(inventory), -1)
+
+
+def _spec_arrays(spec, keys, key_columns):
+    # Align a distribution table to keys: (kind, gsd, low, high) arrays, fixed where unlisted
+    kind = np.zeros(len(keys), dtype=np.int8)
+    gsd, low, high = np.ones(len(keys)), np.ones(len(keys)), np.ones(len(keys))
+    if spec is None or len(spec) == 0:
+        return kind, gsd, low, high
+    spec = spec.set_index(key_columns if len(key_columns) > 1 else key_columns[0])
+    rows = spec.index.get_indexer(keys)
+    found = rows >= 0
+    unknown = set(spec['distribution']) - set(DISTRIBUTIONS)
+    if unknown:
+        raise ValueError(f"Unknown distributions: {sorted(unknown)}")
+    kind[found] = spec['distribution'].map(DISTRIBUTIONS).to_numpy()[rows[found]]
+    for name, array in (('gsd', gsd), ('low', low), ('high', high)):
+        if name in spec:
+            values = spec[name].to_numpy(dtype='float64')[rows[found]]
+            array[found] = np.where(np.isnan(values), 1.0, values)
+    return kind, gsd, low, high
+
+
+def _sample(rng, spec, shape):
+    kind, gsd, low, high = spec
+    out = np.ones(shape + (len(kind),))
+    for code, draw in (
+        (DISTRIBUTIONS['lognormal'], lambda n, m: np.exp(rng.standard_normal(shape + (n,)) * np.log(gsd[m]))),
+        (DISTRIBUTIONS['triangular'], lambda n, m: rng.triangular(low[m], 1.0, high[m], size=shape + (n,))),
+        (DISTRIBUTIONS['uniform'], lambda n, m: rng.uniform(low[m], high[m], size=shape + (n,))),
+    ):
+        mask = kind == code
+        if mask.any():
+            out[..., mask] = draw(mask.sum(), mask)
+    return out
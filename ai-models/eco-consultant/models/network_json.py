@@ -0,0 +1,125 @@
+# models/network_json.py
+
+import json
+from array import array
+import numpy as np
+from models.csr_graph import CSRGraph
+
+READ_SIZE = 1 << 20
+EDGE_ATTRIBUTES = ('weight', 'emission')
+
+
+def iter_network_json(path, read_size=READ_SIZE):
+    """Yield (key, item) for every element of the top-level arrays of a network
+    file, e.g. ('nodes', 'S1') or ('edges', {'from': ..., 'to': ...}).
+
+    The file is read read_size characters at a time and each element decoded
+    on its own, so memory stays bounded by one buffer plus one element.
+    Top-level values that are not arrays are yielded whole.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, read_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if reader.peek() == '[':
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.expect(']')
+                else:
+                    while True:
+                        yield key, reader.value()
+                        if reader.expect(',]') == ']':
+                            break
+            else:
+                yield key, reader.value()
+            if reader.expect(',}') == '}':
+                return
+
+
+def read_network_json(path, read_size=READ_SIZE):
+    """Build a CSRGraph from a {'nodes': [...], 'edges': [...]} file while streaming it.
+
+    Edges go straight into typed arrays; nodes first seen in an edge are
+    added, like DiGraph.add_edge does.
+    """
+    nodes, index = [], {}
+    sources, targets = array('q'), array('q')
+    columns = {attr: array('d') for attr in EDGE_ATTRIBUTES}
+
+    def position(node):
+        if node not in index:
+            index[node] = len(nodes)
+            nodes.append(node)
+        return index[node]
+
+    for key, item in iter_network_json(path, read_size):
+        if key == 'nodes':
+            position(item)
+        elif key == 'edges':
+            sources.append(position(item['from']))
+            targets.append(position(item['to']))
+            for attr in EDGE_ATTRIBUTES:
+                columns[attr].append(item[attr])
+
+    data = {attr: np.frombuffer(values, dtype=np.float64) for attr, values in columns.items()}
+    return CSRGraph.from_edges(nodes, np.frombuffer(sources, dtype=np.int64),
+                               np.frombuffer(targets, dtype=np.int64), data)
+
+
+class _Reader:
+    # Buffered JSON tokenizer: just enough structure to walk the top-level object
+
+    def __init__(self, f, read_size):
+        self.f = f
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of network file")
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number ending exactly at the buffer edge may continue in the next read
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill():
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
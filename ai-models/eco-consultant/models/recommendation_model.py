@@ -1,19 +1,32 @@
 # models/recommendation_model.py
 
-from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
+from models.sparse_interactions import SparseInteractions
 
 class RecommendationModel:
-    def __init__(self):
+    def __init__(self, engine='sparse'):
+        # 'sparse' keeps a CSR interaction store and scores on demand;
+        # 'dense' is the original pivot + all-pairs similarity path
+        if engine not in ('sparse', 'dense'):
+            raise ValueError(f"Unknown engine: {engine}")
+        self.engine = engine
         self.user_product_matrix = None
         self.similarity_matrix = None
+        self.interactions = None
 
     def build_user_product_matrix(self, interactions_df):
+        if self.engine == 'sparse':
+            self.interactions = SparseInteractions.from_frame(interactions_df)
+            return
+        # Imported here: scikit-learn is only needed by the dense engine and is slow to load
+        from sklearn.metrics.pairwise import cosine_similarity
         self.user_product_matrix = interactions_df.pivot(index='user_id', columns='product_id', values='interaction').fillna(0)
         self.similarity_matrix = cosine_similarity(self.user_product_matrix)
         self.similarity_df = pd.DataFrame(self.similarity_matrix, index=self.user_product_matrix.index, columns=self.user_product_matrix.index)
 
     def recommend_products(self, user_id, top_n=5):
+        if self.engine == 'sparse':
+            return self.interactions.recommend(user_id, top_n)
         if user_id not in self.user_product_matrix.index:
             return []
         user_similarity = self.similarity_df[user_id]
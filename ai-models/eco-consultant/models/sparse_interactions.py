@@ -0,0 +1,105 @@
+# models/sparse_interactions.py
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class SparseInteractions:
+    """User x product interactions kept as CSR, with cosine scoring done on demand."""
+
+    def __init__(self, matrix, user_ids, product_ids):
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        self.matrix.eliminate_zeros()
+        self.user_ids = pd.Index(user_ids)
+        self.product_ids = pd.Index(product_ids)
+        self.by_product = self.matrix.tocsc()
+        self.norms = np.sqrt(np.asarray(self.matrix.multiply(self.matrix).sum(axis=1)).ravel())
+
+    @classmethod
+    def from_frame(cls, interactions_df):
+        # Same aggregation as pivot_table: mean of repeated (user, product) pairs, NaN dropped
+        df = interactions_df.dropna(subset=['interaction'])
+        df = df.groupby(['user_id', 'product_id'], sort=False)['interaction'].mean().reset_index()
+        user_codes, user_ids = pd.factorize(df['user_id'], sort=True)
+        product_codes, product_ids = pd.factorize(df['product_id'], sort=True)
+        matrix = sparse.csr_matrix(
+            (df['interaction'].to_numpy(dtype=np.float64), (user_codes, product_codes)),
+            shape=(len(user_ids), len(product_ids))
+        )
+        return cls(matrix, user_ids, product_ids)
+
+    def __contains__(self, user_id):
+        return user_id in self.user_ids
+
+    def similarities(self, user_pos):
+        # Cosine similarity of one user against every user, without the n x n matrix.
+        # Only the columns of the user's own products are touched.
+        start, end = self.matrix.indptr[user_pos], self.matrix.indptr[user_pos + 1]
+        cols, vals = self.matrix.indices[start:end], self.matrix.data[start:end]
+        dots = self.by_product[:, cols].dot(vals)
+        denom = self.norms * self.norms[user_pos]
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    def recommend(self, user_id, top_n=5):
+        if user_id not in self.user_ids:
+            return []
+        user_pos = self.user_ids.get_loc(user_id)
+        products = self.top_n_for(user_pos, self.similarities(user_pos), top_n)
+        return self.product_ids[products].tolist()
+
+    def top_n_for(self, user_pos, sims, top_n, block=64):
+        """Walk neighbours by similarity until top_n candidates exist, then rank them.
+
+        Equivalent to the original loop: products the user has not interacted
+        with are scored by summing positive interactions of every neighbour up to
+        and including the one that brings the candidate count to top_n.  Ties keep
+        first-seen order.  Neighbours are ranked and sliced in growing blocks, so
+        a query rarely touches more than a few rows of the matrix.
+        """
+        seen = np.zeros(self.matrix.shape[1], dtype=bool)
+        start, end = self.matrix.indptr[user_pos], self.matrix.indptr[user_pos + 1]
+        seen[self.matrix.indices[start:end]] = True
+        pool = np.delete(np.arange(self.matrix.shape[0]), user_pos)
+
+        size = block
+        while True:
+            neighbours = self._ranked(sims, pool, size)
+            rows, cols, vals = self._candidates(neighbours, seen)
+            products, first = np.unique(cols, return_index=True)
+            first_rows = rows[first]
+            if len(products) >= top_n:
+                cutoff = np.partition(first_rows, top_n - 1)[top_n - 1] + 1
+                break
+            if len(neighbours) == len(pool):
+                cutoff = len(neighbours)
+                break
+            size *= 4
+
+        walked = rows < cutoff
+        scores = np.bincount(cols[walked], weights=vals[walked], minlength=self.matrix.shape[1])
+        keep = first_rows < cutoff
+        products, first_rows = products[keep], first_rows[keep]
+        product_scores = scores[products]
+
+        if len(products) > top_n:
+            # Partial sort: only candidates tied with or above the top_n-th score get fully ordered
+            threshold = np.partition(product_scores, len(products) - top_n)[len(products) - top_n]
+            keep = product_scores >= threshold
+            products, first_rows, product_scores = products[keep], first_rows[keep], product_scores[keep]
+        order = np.lexsort((products, first_rows, -product_scores))[:top_n]
+        return products[order]
+
+    def _ranked(self, sims, pool, size):
+        # Stable-order prefix of pool by descending similarity, at least size long
+        if size < len(pool):
+            kth = np.partition(-sims[pool], size - 1)[size - 1]
+            pool = pool[-sims[pool] <= kth]
+        return pool[np.lexsort((pool, -sims[pool]))]
+
+    def _candidates(self, neighbours, seen):
+        block = self.matrix[neighbours]
+        rows = np.repeat(np.arange(len(neighbours)), np.diff(block.indptr))
+        cols, vals = block.indices, block.data
+        keep = (vals > 0) & ~seen[cols]
+        return rows[keep], cols[keep], vals[keep]
@@ -1,18 +1,215 @@
 # models/supply_chain_model.py
 
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import networkx as nx
+import numpy as np
+from models.csr_graph import CSRGraph, brandes_dependencies, pareto_search
+from models.supply_chain_scenario import Scenario
+
+# Origins whose emission shortest-path tree (and origin/destination pairs whose
+# Pareto routes) are kept for repeated queries and what-if scenarios
+PATH_CACHE_SIZE = int(os.environ.get('SUPPLY_CHAIN_PATH_CACHE', 64))
+# Source partitions per worker for exact betweenness; more than one evens out uneven sources
+PARTITIONS_PER_WORKER = 4
 
 class SupplyChainModel:
-    def __init__(self):
-        self.G = nx.DiGraph()
+    def __init__(self, path_cache_size=PATH_CACHE_SIZE):
+        self._G = nx.DiGraph()
+        self.path_cache_size = path_cache_size
+        self._csr = None
+        self._trees = OrderedDict()
+        self._fronts = OrderedDict()
+        self._bounds = OrderedDict()
+        self._lock = threading.Lock()
 
     def build_network(self, nodes, edges):
         self.G.add_nodes_from(nodes)
         for edge in edges:
             self.G.add_edge(edge['from'], edge['to'], weight=edge['weight'], emission=edge['emission'])
+        self.invalidate()
+
+    def load_graph(self, csr):
+        # Adopt an array graph (e.g. streamed from JSON or a snapshot); G is only built if asked for
+        with self._lock:
+            self._csr = csr
+            self._G = None
+            self._clear_caches()
+
+    def save_snapshot(self, path):
+        self.csr.save(path)
+
+    def load_snapshot(self, path):
+        self.load_graph(CSRGraph.load(path))
+
+    def invalidate(self):
+        # Call after changing self.G directly; the array graph and cached results are rebuilt lazily
+        with self._lock:
+            if self._G is not None:
+                self._csr = None
+            self._clear_caches()
+
+    def _clear_caches(self):
+        self._trees.clear()
+        self._fronts.clear()
+        self._bounds.clear()
+
+    @property
+    def G(self):
+        if self._G is None:
+            self._G = self._csr.to_networkx()
+        return self._G
 
-    def calculate_betweenness_centrality(self):
-        return nx.betweenness_centrality(self.G, weight='weight')
+    @property
+    def csr(self):
+        if self._csr is None:
+            self._csr = CSRGraph.from_networkx(self._G)
+        return self._csr
+
+    def calculate_betweenness_centrality(self, k=None, epsilon=None, delta=0.1, seed=0, max_workers=None):
+        """Betweenness over 'weight', normalised like nx.betweenness_centrality.
+
+        Exact by default, with the sources split across a process pool.  With k
+        (pivots) or epsilon (target error) the dependencies are summed over a
+        uniform sample of sources and scaled up; see betweenness_error_bound.
+        """
+        csr = self.csr
+        n = csr.n_nodes
+        if k is None and epsilon is not None:
+            k = pivots_for_error(n, epsilon, delta)
+        if k is not None and k < n:
+            sources = np.random.default_rng(seed).choice(n, size=k, replace=False).tolist()
+        else:
+            k = None
+            sources = list(range(n))
+
+        totals = _parallel_dependencies(csr.adjacency('weight'), n, sources, max_workers)
+        if n > 2:
+            scale = 1.0 / ((n - 1) * (n - 2))
+            if k is not None:
+                scale *= n / k
+            totals = [value * scale for value in totals]
+        return dict(zip(csr.nodes, totals))
+
+    def emission_tree(self, source):
+        # Single-source emission shortest-path tree, LRU cached per origin
+        tree = self._cached(self._trees, source)
+        if tree is not None:
+            return tree
+        csr = self.csr
+        if source not in csr.index:
+            raise nx.NodeNotFound(f"Source {source} is not in G")
+        tree = csr.dijkstra(csr.index[source], 'emission')
+        self._store(self._trees, source, tree, csr)
+        return tree
 
     def find_shortest_path(self, source, target):
-        return nx.dijkstra_path(self.G, source=source, target=target, weight='emission')
+        tree = self.emission_tree(source)
+        csr = self.csr
+        if target not in csr.index:
+            raise nx.NodeNotFound(f"Target {target} is not in G")
+        path = tree.path_to(csr.index[target])
+        if path is None:
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        return [csr.nodes[i] for i in path]
+
+    def find_pareto_routes(self, source, target):
+        """Every route not beaten on both cost ('weight') and 'emission', cheapest first.
+
+        Each route is a dict with path, weight and emission.
+        """
+        routes = self._cached(self._fronts, (source, target))
+        if routes is not None:
+            return routes
+        csr = self.csr
+        for node in (source, target):
+            if node not in csr.index:
+                raise nx.NodeNotFound(f"Node {node} is not in G")
+        bounds = self.target_bounds(target)
+        routes = [
+            {'path': [csr.nodes[i] for i in path], 'weight': cost, 'emission': emission}
+            for path, cost, emission in pareto_search(csr, csr.index[source], csr.index[target], bounds=bounds)
+        ]
+        if not routes:
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        self._store(self._fronts, (source, target), routes, csr)
+        return routes
+
+    def target_bounds(self, target):
+        # Cheapest 'weight' and 'emission' from every node to target; prunes the Pareto search
+        bounds = self._cached(self._bounds, target)
+        if bounds is not None:
+            return bounds
+        csr = self.csr
+        position = csr.index[target]
+        bounds = (csr.distances_to(position, 'weight'), csr.distances_to(position, 'emission'))
+        self._store(self._bounds, target, bounds, csr)
+        return bounds
+
+    def what_if(self, offline=(), removed_edges=(), emission_factors=None, weight_factors=None):
+        """A scenario over the current network, e.g. what_if(offline=['S12'])
+        or what_if(emission_factors={('S1', 'S2'): 0.7}); see Scenario."""
+        return Scenario(self, offline, removed_edges, emission_factors, weight_factors)
+
+    def _cached(self, cache, key):
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        return None
+
+    def _store(self, cache, key, value, csr):
+        with self._lock:
+            # Skipped when the network changed while value was computed
+            if self._csr is csr and self.path_cache_size > 0:
+                cache[key] = value
+                while len(cache) > self.path_cache_size:
+                    cache.popitem(last=False)
+
+def betweenness_error_bound(n_nodes, k, delta=0.1):
+    """Largest absolute error of a k-pivot estimate, over all nodes, with probability >= 1 - delta.
+
+    Each pivot contributes n * dependency / ((n-1)(n-2)), a value in [0, n/(n-1)];
+    Hoeffding's inequality plus a union bound over the n nodes gives the bound.
+    """
+    if n_nodes <= 2 or k >= n_nodes:
+        return 0.0
+    spread = n_nodes / (n_nodes - 1)
+    return spread * math.sqrt(math.log(2 * n_nodes / delta) / (2 * k))
+
+
+def pivots_for_error(n_nodes, epsilon, delta=0.1):
+    # Smallest k for which betweenness_error_bound(n_nodes, k, delta) <= epsilon
+    if n_nodes <= 2:
+        return n_nodes
+    spread = n_nodes / (n_nodes - 1)
+    k = math.ceil(spread ** 2 * math.log(2 * n_nodes / delta) / (2 * epsilon ** 2))
+    return min(k, n_nodes)
+
+
+_worker_adjacency = None
+
+def _init_worker(adjacency, n_nodes):
+    # The graph is shipped once per worker instead of once per partition
+    global _worker_adjacency
+    _worker_adjacency = (adjacency, n_nodes)
+
+def _worker_dependencies(sources):
+    adjacency, n_nodes = _worker_adjacency
+    return brandes_dependencies(adjacency, n_nodes, sources)
+
+def _parallel_dependencies(adjacency, n_nodes, sources, max_workers=None):
+    workers = min(max_workers or os.cpu_count() or 1, len(sources))
+    if workers <= 1:
+        return brandes_dependencies(adjacency, n_nodes, sources)
+    n_parts = workers * PARTITIONS_PER_WORKER
+    partitions = [sources[i::n_parts] for i in range(n_parts) if sources[i::n_parts]]
+    totals = np.zeros(n_nodes)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(adjacency, n_nodes)) as pool:
+        for partial in pool.map(_worker_dependencies, partitions):
+            totals += partial
+    return totals.tolist()
@@ -0,0 +1,128 @@
+# models/supply_chain_scenario.py
+
+import networkx as nx
+import numpy as np
+from models.csr_graph import pareto_search
+
+INF = float('inf')
+
+class Scenario:
+    """What-if view of a SupplyChainModel: suppliers offline, edges removed, or
+    edge emission / weight scaled by a factor.
+
+    The model is left untouched.  Emission paths are repaired from the model's
+    cached shortest-path tree of the origin, so only nodes whose path crosses a
+    changed edge are recomputed; Pareto routes are reused as-is when no change
+    improves an edge and none touches a route on the current front.
+    """
+
+    def __init__(self, model, offline=(), removed_edges=(), emission_factors=None, weight_factors=None):
+        self.model = model
+        self.csr = csr = model.csr
+        indptr, _, base_weight = csr.adjacency('weight')
+        _, _, base_emission = csr.adjacency('emission')
+        in_ptr, in_edges = csr.in_edges()
+
+        emission, weight = {}, {}
+        for (u, v), factor in (emission_factors or {}).items():
+            e = self._edge(u, v)
+            emission[e] = base_emission[e] * factor
+        for (u, v), factor in (weight_factors or {}).items():
+            e = self._edge(u, v)
+            weight[e] = base_weight[e] * factor
+        removed = {self._edge(u, v) for u, v in removed_edges}
+        self.offline = {self._position(node) for node in offline}
+        for v in self.offline:
+            removed.update(range(indptr[v], indptr[v + 1]))
+            removed.update(in_edges[in_ptr[v]:in_ptr[v + 1]])
+        for e in removed:
+            emission[e] = weight[e] = INF
+
+        self.emission_overrides = emission
+        # (weight, emission) per changed edge, as pareto_search takes them
+        self.overrides = {
+            e: (weight.get(e, base_weight[e]), emission.get(e, base_emission[e]))
+            for e in set(emission) | set(weight)
+        }
+        self.improves = any(
+            w < base_weight[e] or em < base_emission[e] for e, (w, em) in self.overrides.items()
+        )
+        self._repairs = {}
+
+    def _position(self, node):
+        if node not in self.csr.index:
+            raise nx.NodeNotFound(f"Node {node} is not in G")
+        return self.csr.index[node]
+
+    def _edge(self, u, v):
+        e = self.csr.edge_position(self._position(u), self._position(v))
+        if e is None:
+            raise nx.NetworkXError(f"Edge {u}-{v} is not in G")
+        return e
+
+    def _check_current(self):
+        if self.model.csr is not self.csr:
+            raise RuntimeError("The network changed since this scenario was created")
+
+    def _repair(self, source):
+        if source not in self._repairs:
+            self._check_current()
+            tree = self.model.emission_tree(source)
+            self._repairs[source] = (tree,) + tree.repaired(self.csr, 'emission', self.emission_overrides)
+        return self._repairs[source]
+
+    def _reachable(self, source, target):
+        s, t = self._position(source), self._position(target)
+        if s in self.offline or t in self.offline:
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        return s, t
+
+    def find_shortest_path(self, source, target):
+        _, t = self._reachable(source, target)
+        tree, _, pred = self._repair(source)
+        path = tree.path_to(t, pred)
+        if path is None:
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        return [self.csr.nodes[i] for i in path]
+
+    def path_emission(self, source, target):
+        # Total emission of the scenario's shortest path (inf when unreachable)
+        _, t = self._reachable(source, target)
+        tree, dist, _ = self._repair(source)
+        return dist[t] if t in dist else float(tree.dist[t])
+
+    def find_pareto_routes(self, source, target):
+        s, t = self._reachable(source, target)
+        self._check_current()
+        if not self.improves:
+            # Costs only went up: a front that avoids every changed edge still dominates
+            routes = self.model.find_pareto_routes(source, target)
+            if not any(self._touches(route['path']) for route in routes):
+                return routes
+        routes = [
+            {'path': [self.csr.nodes[i] for i in path], 'weight': cost, 'emission': emission}
+            for path, cost, emission in pareto_search(self.csr, s, t, self.overrides, self._bounds(target))
+        ]
+        if not routes:
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        return routes
+
+    def _bounds(self, target):
+        # The model's bounds stay valid when edges only get worse.  An improved
+        # edge u->v can shorten any node's remaining distance to at most
+        # new value + bound(v), so each bound is capped at the smallest such value.
+        bounds = self.model.target_bounds(target)
+        if not self.improves:
+            return bounds
+        _, indices, base_weight = self.csr.adjacency('weight')
+        _, _, base_emission = self.csr.adjacency('emission')
+        capped = []
+        for objective, (bound, base) in enumerate(zip(bounds, (base_weight, base_emission))):
+            cap = min((values[objective] + bound[indices[e]] for e, values in self.overrides.items()
+                       if values[objective] < base[e]), default=INF)
+            capped.append(np.minimum(bound, cap) if cap < INF else bound)
+        return capped
+
+    def _touches(self, path):
+        positions = [self.csr.index[node] for node in path]
+        return any(self.csr.edge_position(u, v) in self.overrides for u, v in zip(positions, positions[1:]))
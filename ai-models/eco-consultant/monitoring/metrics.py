@@ -0,0 +1,279 @@
+# monitoring/metrics.py
+
+import bisect
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import socket
+import threading
+import time
+from monitoring.profiler import SamplingProfiler, profiling_enabled
+
+# Every metric is exported as eco_<name>
+METRICS_PREFIX = 'eco'
+# Histogram bucket bounds in seconds, from a fast API route to a batch stage
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+# JSON log lines go to stderr when ECO_LOG_FORMAT=json, and to Logstash's
+# json_lines TCP input when ECO_LOGSTASH=host:port (port 5000 in elk-stack)
+LOG_FORMAT = os.environ.get('ECO_LOG_FORMAT', 'text')
+LOGSTASH = os.environ.get('ECO_LOGSTASH')
+# Seconds between metric snapshots written to the log; 0 turns them off
+SNAPSHOT_INTERVAL = float(os.environ.get('ECO_METRICS_INTERVAL', 60))
+SERVICE = os.environ.get('ECO_SERVICE', 'eco-consultant')
+
+logger = logging.getLogger('eco.metrics')
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Counters and histograms for one process, keyed by name and labels.
+
+    Updates take a lock but no I/O, so they are cheap enough for per-message
+    and per-request use.  Process pool workers have registries of their own;
+    what they record reaches the logs through their own snapshots.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def inc(self, name, value=1, help=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, help=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+            if help:
+                self._help.setdefault(name, help)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        # One dict per series, in the shape the JSON logs carry
+        with self._lock:
+            series = [{'metric': name, 'type': 'counter', 'labels': dict(labels), 'value': value}
+                      for (name, labels), value in self._counters.items()]
+            series += [{'metric': name, 'type': 'histogram', 'labels': dict(labels),
+                        'count': h.count, 'sum': h.sum, 'mean': h.sum / h.count if h.count else None}
+                       for (name, labels), h in self._histograms.items()]
+        return series
+
+    def render_prometheus(self):
+        """The registry in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            help_text = dict(self._help)
+        seen = set()
+        for (name, labels), value in counters:
+            full_name = f'{METRICS_PREFIX}_{name}'
+            if name not in seen:
+                seen.add(name)
+                if name in help_text:
+                    lines.append(f'# HELP {full_name} {help_text[name]}')
+                lines.append(f'# TYPE {full_name} counter')
+            lines.append(f'{full_name}{_labels(labels)} {_number(value)}')
+        for (name, labels), histogram in histograms:
+            full_name = f'{METRICS_PREFIX}_{name}'
+            if name not in seen:
+                seen.add(name)
+                if name in help_text:
+                    lines.append(f'# HELP {full_name} {help_text[name]}')
+                lines.append(f'# TYPE {full_name} histogram')
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{full_name}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{full_name}_sum{_labels(labels)} {_number(histogram.sum)}')
+            lines.append(f'{full_name}_count{_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def inc(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+def render_prometheus():
+    return REGISTRY.render_prometheus()
+
+
+class timed:
+    """Times a pipeline stage, as a context manager or a decorator.
+
+    Records stage_seconds{stage} and stage_total{stage, status}, where status
+    is ok or error.  With log=True the finished stage is also logged as a
+    structured event; per-message and per-request timers leave it off.  When
+    ECO_PROFILE names the stage (or is 'all'), the calling thread is sampled
+    while the stage runs and the profile saved (see monitoring.profiler).
+
+        with timed('cleaning', file=file_name) as t:
+            ...
+            t.rows = len(df)        # also counted in rows_total{stage}
+    """
+
+    def __init__(self, stage, log=True, **fields):
+        self.stage = stage
+        self.log = log
+        self.fields = fields
+        self.rows = None
+        self.bytes = None
+        self._start = None
+        self._profiler = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        if profiling_enabled(self.stage):
+            self._profiler = SamplingProfiler().start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        status = 'ok' if exc_type is None else 'error'
+        REGISTRY.observe('stage_seconds', seconds, help='Wall time of pipeline stages', stage=self.stage)
+        REGISTRY.inc('stage_total', help='Finished pipeline stages by outcome', stage=self.stage, status=status)
+        if self.rows is not None:
+            REGISTRY.inc('rows_total', self.rows, help='Rows handled by pipeline stages', stage=self.stage)
+        if self.bytes is not None:
+            REGISTRY.inc('bytes_total', self.bytes, help='Bytes handled by pipeline stages', stage=self.stage)
+        profile = None
+        if self._profiler is not None:
+            profile = self._profiler.stop().save(self.stage)
+            self._profiler = None
+        if self.log or status == 'error':
+            event = dict(self.fields, event='stage', stage=self.stage, status=status, seconds=round(seconds, 6))
+            if self.rows is not None:
+                event['rows'] = self.rows
+            if self.bytes is not None:
+                event['bytes'] = self.bytes
+            if profile:
+                event['profile'] = profile
+            logger.info(f"{self.stage} {status} in {seconds:.3f}s", extra={'fields': event})
+        return False
+
+    def __call__(self, func):
+        # A fresh timer per call, so concurrent calls never share rows or start times
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage, self.log, **self.fields):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the fields Logstash's json_lines codec indexes."""
+
+    def format(self, record):
+        entry = {
+            '@timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                          + f'.{int(record.msecs):03d}Z',
+            'type': 'eco-consultant',
+            'service': SERVICE,
+            'host': socket.gethostname(),
+            'pid': record.process,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class JsonLinesSocketHandler(logging.handlers.SocketHandler):
+    # SocketHandler handles reconnects; the payload is a JSON line instead of a pickle
+    def makePickle(self, record):
+        return (self.format(record) + '\n').encode('utf-8')
+
+
+_configured = False
+
+
+def configure(log_format=None, logstash=None, snapshot_interval=None):
+    """Sets up structured logging for an entry point; safe to call more than once.
+
+    Call after logging.basicConfig.  With log_format='json' the root
+    handlers switch to JSON lines; with logstash='host:port' records are
+    also shipped to Logstash.  A daemon thread logs a snapshot of the
+    registry every snapshot_interval seconds.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    log_format = log_format or LOG_FORMAT
+    logstash = logstash or LOGSTASH
+    snapshot_interval = SNAPSHOT_INTERVAL if snapshot_interval is None else snapshot_interval
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(level=logging.INFO)
+    if log_format == 'json':
+        for handler in root.handlers:
+            handler.setFormatter(JsonFormatter())
+    if logstash:
+        host, port = logstash.rsplit(':', 1)
+        handler = JsonLinesSocketHandler(host, int(port))
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+    if snapshot_interval > 0:
+        threading.Thread(target=_log_snapshots, args=(snapshot_interval,), daemon=True,
+                         name='metrics-snapshots').start()
+
+
+def log_snapshot():
+    for series in REGISTRY.snapshot():
+        logger.info(f"metric {series['metric']}", extra={'fields': dict(series, event='metric')})
+
+
+def _log_snapshots(interval):
+    while True:
+        time.sleep(interval)
+        log_snapshot()
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,85 @@
+# monitoring/profiler.py
+
+import collections
+import os
+import sys
+import threading
+import time
+
+# Stages to sample, comma separated ('cleaning,impact_analysis'), or 'all'; empty disables profiling
+PROFILE_STAGES = {stage.strip() for stage in os.environ.get('ECO_PROFILE', '').split(',') if stage.strip()}
+PROFILE_INTERVAL = float(os.environ.get('ECO_PROFILE_INTERVAL', 0.005))
+PROFILE_PATH = os.environ.get('ECO_PROFILE_PATH', './profiles')
+MAX_STACK_DEPTH = 128
+
+
+def profiling_enabled(stage):
+    return 'all' in PROFILE_STAGES or stage in PROFILE_STAGES
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every `interval` seconds from a helper thread.
+
+    Stacks are counted in the collapsed format flamegraph.pl and speedscope
+    read ("outer;inner;leaf count").  Sampling only reads frames, so the
+    profiled code runs unchanged; the cost is one stack walk per interval.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True, name='sampling-profiler')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, n=10):
+        # Functions by samples spent in them directly (self time)
+        leaves = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def save(self, name, path=PROFILE_PATH):
+        # Returns the file written, or None when nothing was sampled
+        if not self.samples:
+            return None
+        os.makedirs(path, exist_ok=True)
+        file_name = os.path.join(path, f"{name}-{os.getpid()}-{int(time.time() * 1000)}.folded")
+        with open(file_name, 'w') as f:
+            f.write(self.folded())
+        return file_name
@@ -0,0 +1,75 @@
+# monitoring/web.py
+
+import time
+from monitoring.metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE
+
+
+def record_request(app_name, method, route, status, seconds):
+    # route is the matched template (/clean_data/{file_name}), never the raw path, to bound label values
+    REGISTRY.observe('http_request_seconds', seconds, help='HTTP request latency',
+                     app=app_name, method=method, route=route)
+    REGISTRY.inc('http_requests_total', help='HTTP requests by status', app=app_name, method=method,
+                 route=route, status=str(status))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request of a FastAPI app, streamed bodies included."""
+
+    def __init__(self, app, app_name):
+        self.app = app
+        self.app_name = app_name
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            record_request(self.app_name, scope['method'], getattr(route, 'path', 'unmatched'), status[0],
+                           time.perf_counter() - start)
+
+
+def instrument_fastapi(app, app_name):
+    """Times every route of a FastAPI app and serves the registry at GET /metrics."""
+    from fastapi.responses import Response
+
+    app.add_middleware(MetricsMiddleware, app_name=app_name)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(REGISTRY.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    return app
+
+
+def instrument_flask(app, app_name):
+    """Times every request of a Flask app and serves the registry at GET /metrics."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            record_request(app_name, request.method, route, response.status_code, time.perf_counter() - start)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render_prometheus(), mimetype=PROMETHEUS_CONTENT_TYPE)
+
+    return app
@@ -0,0 +1,333 @@
+# storage/table_store.py
+
+import importlib.util
+import os
+import argparse
+import operator
+import pandas as pd
+from storage.table_summary import TableSummary
+
+# Processed tables are stored as Parquet (typed, compressed, columnar) unless
+# ECO_STORAGE_FORMAT=csv.  Raw inputs stay CSV; CSV import/export is kept for
+# interchange with tools outside the pipeline.
+FORMATS = {'parquet': '.parquet', 'csv': '.csv'}
+DEFAULT_FORMAT = os.environ.get('ECO_STORAGE_FORMAT', 'parquet')
+PARQUET_COMPRESSION = 'zstd'
+SCAN_CHUNKSIZE = 50_000
+# Row filters for TableStore.scan, as (column, op, value); 'in' takes a list of values
+FILTER_OPERATORS = {
+    'eq': operator.eq, 'ne': operator.ne,
+    'lt': operator.lt, 'le': operator.le, 'gt': operator.gt, 'ge': operator.ge,
+    'in': lambda column, values: column.isin(values),
+}
+
+
+class TableStore:
+    def __init__(self, base_path, fmt=None):
+        self.base_path = base_path
+        self.fmt = fmt or DEFAULT_FORMAT
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unknown storage format: {self.fmt}")
+        if self.fmt == 'parquet':
+            # Checked without importing it; pyarrow loads on the first Parquet read or write
+            if importlib.util.find_spec('pyarrow') is None:
+                raise ImportError("Parquet storage needs pyarrow; install it or set ECO_STORAGE_FORMAT=csv")
+        os.makedirs(self.base_path, exist_ok=True)
+        # path -> TableSummary, revalidated against the file on every lookup
+        self._summaries = {}
+
+    def path(self, name):
+        # Tables are addressed by name; 'data', 'data.csv' and 'data.parquet' are the same table
+        stem = os.path.splitext(os.path.basename(name))[0]
+        return os.path.join(self.base_path, stem + FORMATS[self.fmt])
+
+    def summary_path(self, name):
+        # Stored next to the table: data.parquet -> data.summary.json
+        return os.path.splitext(self.path(name))[0] + '.summary.json'
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def mtime(self, name):
+        return os.path.getmtime(self.path(name))
+
+    def read(self, name, columns=None):
+        if self.fmt == 'parquet':
+            return pd.read_parquet(self.path(name), columns=columns)
+        return pd.read_csv(self.path(name), usecols=columns)
+
+    def columns(self, name):
+        if self.fmt == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.read_schema(self.path(name)).names
+        return list(pd.read_csv(self.path(name), nrows=0).columns)
+
+    def numeric_columns(self, name):
+        # Columns filter values are compared to as numbers; a CSV column counts when every chunk read it as numeric
+        if self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            return {field.name for field in pq.read_schema(self.path(name))
+                    if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+                    or pa.types.is_decimal(field.type)}
+        return set(self.summary(name).columns)
+
+    def coerce_filters(self, name, filters):
+        """filters with their values converted for the table's column types.
+
+        Raises ValueError for a value that does not fit its column, so callers
+        can reject it before reading anything; scan() accepts the result as is.
+        """
+        numeric = self.numeric_columns(name) if filters else set()
+        coerced = []
+        for column, op, value in filters or []:
+            if column in numeric:
+                try:
+                    value = [float(v) for v in value] if isinstance(value, (list, tuple)) else float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{column} is numeric, got {value!r}")
+            coerced.append((column, op, value))
+        return coerced
+
+    def iter_chunks(self, name, chunksize, columns=None, start_row=0):
+        if self.fmt == 'parquet':
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(self.path(name))
+            # Row groups that end before start_row are skipped without being read
+            row_groups, skip = [], start_row
+            for i in range(parquet_file.num_row_groups):
+                n_rows = parquet_file.metadata.row_group(i).num_rows
+                if row_groups or skip < n_rows:
+                    row_groups.append(i)
+                else:
+                    skip -= n_rows
+            if not row_groups:
+                return
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns, row_groups=row_groups):
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                yield batch.slice(skip).to_pandas()
+                skip = 0
+        else:
+            skiprows = range(1, start_row + 1) if start_row else None
+            for chunk in pd.read_csv(self.path(name), usecols=columns, chunksize=chunksize, skiprows=skiprows):
+                yield chunk if columns is None else chunk[columns]
+
+    def scan(self, name, columns=None, filters=None, start_row=0, chunksize=SCAN_CHUNKSIZE):
+        """Yield the table from start_row on, chunk by chunk, indexed by row position.
+
+        Only rows passing every (column, op, value) filter are kept and only
+        `columns` are returned; filter columns are read even when not returned.
+        """
+        filters = filters or []
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns) + [column for column, _, _ in filters]))
+        position = start_row
+        for chunk in self.iter_chunks(name, chunksize, read_columns, start_row):
+            chunk.index = pd.RangeIndex(position, position + len(chunk))
+            position += len(chunk)
+            for column, op, value in filters:
+                chunk = chunk[FILTER_OPERATORS[op](chunk[column], _coerce(chunk[column], value))]
+            yield chunk if columns is None else chunk[list(columns)]
+
+    def write(self, df, name):
+        with self.writer(name) as writer:
+            writer.write(df)
+        return self.path(name)
+
+    def writer(self, name):
+        return TableWriter(self.path(name), self.fmt, self.summary_path(name))
+
+    def summary(self, name):
+        """Summary statistics of a table without reading it.
+
+        Writers save a TableSummary next to every table; it is kept in memory
+        until the table file changes.  A table written by something else (or
+        before summaries existed) is scanned once and its summary saved.
+        """
+        path = self.path(name)
+        summary = self._summaries.get(path)
+        if summary is not None and summary.matches(path):
+            return summary
+        summary_path = self.summary_path(name)
+        summary = TableSummary.load(summary_path) if os.path.exists(summary_path) else None
+        if summary is None or not summary.matches(path):
+            summary = TableSummary()
+            for chunk in self.iter_chunks(name, SCAN_CHUNKSIZE):
+                summary.update(chunk)
+            summary.save(summary_path, path)
+        self._summaries[path] = summary
+        return summary
+
+    def import_csv(self, csv_file, name, chunksize=None):
+        if not chunksize:
+            return self.write(pd.read_csv(csv_file), name)
+        with self.writer(name) as writer:
+            for chunk in pd.read_csv(csv_file, chunksize=chunksize):
+                writer.write(chunk)
+        return self.path(name)
+
+    def export_csv(self, name, csv_file, chunksize=None):
+        if not chunksize:
+            self.read(name).to_csv(csv_file, index=False)
+            return csv_file
+        header = True
+        for chunk in self.iter_chunks(name, chunksize):
+            chunk.to_csv(csv_file, index=False, mode='w' if header else 'a', header=header)
+            header = False
+        return csv_file
+
+
+def _coerce(column, value):
+    # Filter values arriving as strings (e.g. from a query string) compare as numbers on numeric columns
+    if isinstance(value, (list, tuple)):
+        return [_coerce(column, v) for v in value]
+    if isinstance(value, str) and pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return float(value)
+    return value
+
+
+class TableWriter:
+    """Appends DataFrame chunks to one table; the file only appears once closed cleanly.
+
+    With a summary_path, the chunks are also summarized as they pass and the
+    TableSummary is saved there once the table is in place.  Parquet columns
+    that are all null so far are stored as text; when a later chunk brings
+    another type (or a wider one, ints then floats) the part already written
+    is rewritten with the merged schema.
+    """
+
+    def __init__(self, path, fmt, summary_path=None):
+        self.path = path
+        self.fmt = fmt
+        self.summary_path = summary_path
+        self.summary = TableSummary() if summary_path else None
+        self.tmp_path = path + '.tmp'
+        self._parquet_writer = None
+        self._schema = None
+        # Columns all null in every chunk so far, held as string until one says otherwise
+        self._untyped = set()
+        self._written = False
+        self._empty = None
+
+    def __enter__(self):
+        return self
+
+    def write(self, df):
+        if len(df) == 0:
+            # Held back: an empty chunk carries no reliable types for the schema
+            if self._empty is None:
+                self._empty = df.copy()
+            return
+        self._write(df)
+
+    def _write(self, df):
+        header = not self._written
+        self._written = True
+        if self.summary is not None:
+            self.summary.update(df)
+        if self.fmt == 'csv':
+            df.to_csv(self.tmp_path, index=False, mode='w' if header else 'a', header=header)
+            return
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._parquet_writer is None:
+            # An all-null column has no type yet; text is the likeliest
+            self._untyped = {field.name for field in table.schema if pa.types.is_null(field.type)}
+            self._open(pa.schema([field.with_type(pa.string()) if field.name in self._untyped else field
+                                  for field in table.schema], metadata=table.schema.metadata))
+        else:
+            schema = self._merged_schema(table.schema)
+            if schema is not None:
+                self._rewrite(schema)
+        self._parquet_writer.write_table(table.cast(self._schema))
+
+    def _open(self, schema):
+        import pyarrow.parquet as pq
+        self._schema = schema
+        self._parquet_writer = pq.ParquetWriter(self.tmp_path, schema, compression=PARQUET_COMPRESSION)
+
+    def _merged_schema(self, incoming):
+        # The schema the file needs to hold this chunk too, or None when it already does.
+        # Chunks can be narrower (all-null columns) or wider (ints, then floats)
+        import pyarrow as pa
+        fields = []
+        changed = False
+        for field in self._schema:
+            new_type = incoming.field(field.name).type
+            if pa.types.is_null(new_type) or new_type == field.type:
+                fields.append(field)
+                continue
+            if field.name in self._untyped:
+                # First values for a column that was all null: they decide its type
+                self._untyped.discard(field.name)
+                if not _is_text(new_type):
+                    field = field.with_type(new_type)
+                    changed = True
+            elif not (_is_text(field.type) and _is_text(new_type)):
+                try:
+                    merged = pa.unify_schemas([pa.schema([field]), pa.schema([field.with_type(new_type)])],
+                                              promote_options='permissive')
+                except (pa.ArrowTypeError, pa.ArrowInvalid):
+                    raise ValueError(f"Column {field.name} of {self.path} changes type from {field.type} "
+                                     f"to {new_type} between chunks")
+                field = merged.field(field.name)
+                changed = changed or field.type != self._schema.field(field.name).type
+            fields.append(field)
+        return pa.schema(fields, metadata=self._schema.metadata) if changed else None
+
+    def _rewrite(self, schema):
+        # The chunks written so far are copied batch by batch into a file with the new schema
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._parquet_writer.close()
+        old_path = self.tmp_path + '.old'
+        os.replace(self.tmp_path, old_path)
+        self._open(schema)
+        parquet_file = pq.ParquetFile(old_path)
+        try:
+            for batch in parquet_file.iter_batches():
+                self._parquet_writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+        finally:
+            parquet_file.close()
+        os.remove(old_path)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and not self._written and self._empty is not None:
+            self._write(self._empty)
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if exc_type is not None:
+            for path in (self.tmp_path, self.tmp_path + '.old'):
+                if os.path.exists(path):
+                    os.remove(path)
+            return False
+        if not os.path.exists(self.tmp_path):
+            raise ValueError(f"Nothing was written to {self.path}")
+        os.replace(self.tmp_path, self.path)
+        if self.summary is not None:
+            self.summary.save(self.summary_path, self.path)
+        return False
+
+
+def _is_text(arrow_type):
+    import pyarrow as pa
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move tables between CSV and the processed store')
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('name', help='table name, e.g. data or data_impact')
+    parser.add_argument('csv_file')
+    parser.add_argument('--base-path', default='./data/processed')
+    parser.add_argument('--chunksize', type=int, default=None)
+    args = parser.parse_args()
+
+    store = TableStore(args.base_path)
+    if args.action == 'import':
+        print(f"Imported {args.csv_file} to {store.import_csv(args.csv_file, args.name, args.chunksize)}")
+    else:
+        print(f"Exported {store.path(args.name)} to {store.export_csv(args.name, args.csv_file, args.chunksize)}")
@@ -0,0 +1,248 @@
+# storage/table_summary.py
+
+import json
+import math
+import os
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# Quantiles are estimated to within this relative error of the true value
+SKETCH_ACCURACY = float(os.environ.get('ECO_SUMMARY_ACCURACY', 0.01))
+# |x| below this counts as zero; log-spaced bins cannot reach it
+MIN_SKETCH_VALUE = 1e-12
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with log-spaced bins (DDSketch).
+
+    A value x > 0 is counted in bin ceil(log_gamma(x)); every value in a bin
+    is within `relative_accuracy` of the bin's representative value, so any
+    quantile read back is too.  Negative values use a mirrored set of bins.
+    Sketches of separate chunks merge by adding bin counts.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+
+    @property
+    def count(self):
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zeros
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        self.zeros += int(np.count_nonzero(np.abs(values) <= MIN_SKETCH_VALUE))
+        self._add(self.positive, values[values > MIN_SKETCH_VALUE])
+        self._add(self.negative, -values[values < -MIN_SKETCH_VALUE])
+
+    def _add(self, bins, values):
+        if len(values) == 0:
+            return
+        keys, counts = np.unique(np.ceil(np.log(values) / self.log_gamma).astype(np.int64), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            bins[key] = bins.get(key, 0) + count
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same accuracy can be merged")
+        for bins, other_bins in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_bins.items():
+                bins[key] = bins.get(key, 0) + count
+        self.zeros += other.zeros
+        return self
+
+    def quantile(self, q):
+        # Same rank convention as pandas' default linear interpolation, rounded to a bin
+        n = self.count
+        if n == 0:
+            return float('nan')
+        rank = q * (n - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'positive': sorted(self.positive.items()),
+            'negative': sorted(self.negative.items()),
+            'zeros': self.zeros,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.positive = {int(key): count for key, count in data['positive']}
+        sketch.negative = {int(key): count for key, count in data['negative']}
+        sketch.zeros = data['zeros']
+        return sketch
+
+
+class ColumnSummary:
+    """Count, mean, variance and range of one numeric column, updated chunk by chunk."""
+
+    def __init__(self, relative_accuracy=SKETCH_ACCURACY):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def update(self, series):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        chunk = ColumnSummary(self.sketch.relative_accuracy)
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        chunk.sketch.update(values)
+        self.merge(chunk)
+
+    def merge(self, other):
+        # Chan et al.'s pairwise update keeps the variance exact across chunks
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def describe(self, percentiles=DESCRIBE_PERCENTILES):
+        empty = self.count == 0
+        stats = {
+            'count': float(self.count),
+            'mean': float('nan') if empty else self.mean,
+            'std': math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan'),
+            'min': float('nan') if empty else self.min,
+        }
+        for q in percentiles:
+            stats[f'{q * 100:g}%'] = self.sketch.quantile(q)
+        stats['max'] = float('nan') if empty else self.max
+        return stats
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max,
+                'sketch': self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        column = cls()
+        column.count, column.mean, column.m2 = data['count'], data['mean'], data['m2']
+        column.min, column.max = data['min'], data['max']
+        column.sketch = QuantileSketch.from_dict(data['sketch'])
+        return column
+
+
+class TableSummary:
+    """describe()-style statistics of a table's numeric columns, built from its chunks.
+
+    The writer of a table feeds every chunk to update(); the result is saved
+    next to the table together with the file's size and mtime, so readers
+    can tell whether it still describes the file on disk.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.columns = {}
+        self.rows = 0
+        # Columns seen with a non-numeric dtype in any chunk are left out
+        self._excluded = set()
+        self.source = None
+
+    def update(self, df):
+        self.rows += len(df)
+        for name in df.columns:
+            if name in self._excluded:
+                continue
+            if not _summarizable(df[name]):
+                # An all-null chunk can come through as object; it holds nothing to count
+                if df[name].notna().any():
+                    self._excluded.add(name)
+                    self.columns.pop(name, None)
+                continue
+            self.columns.setdefault(name, ColumnSummary(self.relative_accuracy)).update(df[name])
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self._excluded |= other._excluded
+        for name in list(self.columns) + list(other.columns):
+            if name in self._excluded:
+                self.columns.pop(name, None)
+            elif name in other.columns:
+                self.columns.setdefault(name, ColumnSummary(self.relative_accuracy)).merge(other.columns[name])
+        return self
+
+    def describe(self, columns=None):
+        # Same layout as DataFrame.describe() on the numeric columns
+        names = [name for name in (columns or self.columns) if name in self.columns]
+        return pd.DataFrame({name: self.columns[name].describe() for name in names},
+                            index=['count', 'mean', 'std', 'min'] +
+                                  [f'{q * 100:g}%' for q in DESCRIBE_PERCENTILES] + ['max'])
+
+    def matches(self, path):
+        # True when the summary was taken of the file currently at path
+        if self.source is None or not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        return self.source == [stat.st_size, stat.st_mtime_ns]
+
+    def save(self, summary_path, table_path):
+        stat = os.stat(table_path)
+        self.source = [stat.st_size, stat.st_mtime_ns]
+        data = {
+            'source': self.source,
+            'rows': self.rows,
+            'relative_accuracy': self.relative_accuracy,
+            'excluded': sorted(self._excluded),
+            'columns': {name: column.to_dict() for name, column in self.columns.items()},
+        }
+        tmp_path = summary_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, summary_path)
+        return summary_path
+
+    @classmethod
+    def load(cls, summary_path):
+        with open(summary_path) as f:
+            data = json.load(f)
+        summary = cls(data['relative_accuracy'])
+        summary.source = data['source']
+        summary.rows = data['rows']
+        summary._excluded = set(data['excluded'])
+        summary.columns = {name: ColumnSummary.from_dict(column) for name, column in data['columns'].items()}
+        return summary
+
+
+def _summarizable(series):
+    return is_numeric_dtype(series) and not is_bool_dtype(series)
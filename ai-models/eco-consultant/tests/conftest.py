@@ -0,0 +1,7 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Modules import each other from the eco-consultant root (agents.*, storage.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,34 @@
+# tests/test_csr_graph.py
+
+import os
+import networkx as nx
+import numpy as np
+import pytest
+from models.csr_graph import CSRGraph
+
+
+def network():
+    G = nx.DiGraph()
+    for u, v, weight, emission in [('S1', 2, 1.0, 5.0), (2, 'S3', 1.0, 1.0), ('S1', 'S3', 4.0, 2.0), ('S3', 4, 1.0, 1.0)]:
+        G.add_edge(u, v, weight=weight, emission=emission)
+    return G
+
+
+def test_snapshot_round_trip_stays_memory_mapped(tmp_path):
+    path = str(tmp_path / 'graph')
+    CSRGraph.from_networkx(network()).save(path)
+    assert not os.path.exists(os.path.join(path, 'nodes.npy'))
+    graph = CSRGraph.load(path)
+    assert graph.nodes == ['S1', 2, 'S3', 4]
+    tree = graph.dijkstra(graph.index['S1'], 'emission')
+    assert [graph.nodes[i] for i in tree.path_to(graph.index[4])] == ['S1', 'S3', 4]
+    # Queries read the mapped arrays themselves, not copies
+    indptr, indices, emission = graph.adjacency('emission')
+    assert isinstance(graph.indices, np.memmap) and np.shares_memory(indices, graph.indices)
+    assert nx.utils.graphs_equal(graph.to_networkx(), network())
+
+
+def test_snapshot_rejects_node_ids_json_cannot_hold(tmp_path):
+    G = nx.DiGraph([(('S1', 'plant'), ('S2', 'plant'))])
+    with pytest.raises(ValueError, match='tuple'):
+        CSRGraph.from_networkx(G).save(str(tmp_path / 'graph'))
@@ -0,0 +1,39 @@
+# tests/test_data_cleaning_agent.py
+
+import pandas as pd
+import pytest
+from agents.data_cleaning_agent import DataCleaningAgent
+
+
+def clean_both_ways(tmp_path, df, chunksize=2):
+    raw_path, processed_path = tmp_path / 'raw', tmp_path / 'processed'
+    raw_path.mkdir()
+    df.to_csv(raw_path / 'data.csv', index=False)
+    agent = DataCleaningAgent(str(raw_path), str(processed_path))
+    in_memory = pd.concat(agent.clean_chunks('data.csv'))
+    streamed = pd.concat(agent.clean_chunks('data.csv', chunksize=chunksize))
+    return streamed.reset_index(drop=True), in_memory.reset_index(drop=True)
+
+
+@pytest.mark.parametrize('df', [
+    # A chunk of the text column is all null, so it is read as float64
+    pd.DataFrame({'a': [1, 1, 1, 1, 1, 2], 'b': ['x', None, None, None, 'x', 'y']}),
+    # Ids above 2**53 are distinct as int64 but equal as float64
+    pd.DataFrame({'id': [2**53, 2**53 + 1, 2**53 + 1], 'v': [1, 1, 1]}),
+    # Ints in one chunk, floats in the next
+    pd.DataFrame({'a': [1, 1, None, 1], 'b': [1, 1, 2, 1]}),
+    pd.DataFrame({'a': [0.0, -0.0, 1.5, 1.5]}),
+], ids=['all-null-chunk', 'large-ints', 'int-then-float', 'signed-zero'])
+def test_streaming_matches_in_memory(tmp_path, df):
+    streamed, in_memory = clean_both_ways(tmp_path, df)
+    pd.testing.assert_frame_equal(streamed, in_memory, check_dtype=False)
+
+
+def test_streaming_writes_same_table(tmp_path):
+    df = pd.DataFrame({'a': [1, 1, 1, 1, 1, 2], 'b': ['x', None, None, None, 'x', 'y']})
+    raw_path = tmp_path / 'raw'
+    raw_path.mkdir()
+    df.to_csv(raw_path / 'data.csv', index=False)
+    agent = DataCleaningAgent(str(raw_path), str(tmp_path / 'processed'), chunksize=2)
+    agent.clean_csv('data.csv')
+    assert agent.store.read('data.csv')['b'].tolist() == ['x', 'x', 'y']
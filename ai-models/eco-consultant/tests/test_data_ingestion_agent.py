@@ -0,0 +1,45 @@
+# tests/test_data_ingestion_agent.py
+
+import asyncio
+import os
+import threading
+import time
+from agents.data_ingestion_agent import DataIngestionAgent
+from benchmarks.stub_http import StubServer
+
+
+class SlowProducer:
+    # send blocks like a KafkaProducer with a full buffer
+    def __init__(self, delay):
+        self.delay = delay
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send(self, topic, value):
+        time.sleep(self.delay)
+        with self.lock:
+            self.sent.append(value)
+
+    def flush(self, timeout=None):
+        pass
+
+
+def test_blocking_send_does_not_stall_other_downloads(tmp_path):
+    producer = SlowProducer(delay=0.5)
+    agent = DataIngestionAgent(str(tmp_path), producer=producer, per_host_limit=8)
+
+    async def run(urls):
+        try:
+            return await agent.fetch_many(urls)
+        finally:
+            await agent.aclose()
+
+    with StubServer(body_bytes=64 * 1024, latency=0.01) as server:
+        start = time.perf_counter()
+        results = asyncio.run(run([f"{server.url}/source{i}" for i in range(8)]))
+        elapsed = time.perf_counter() - start
+    assert [result['status'] for result in results] == ['ok'] * 8
+    assert len(producer.sent) == 8
+    assert os.path.getsize(tmp_path / 'source0.csv') == 64 * 1024
+    # Eight sends one after another on the loop would take 4s
+    assert elapsed < 2.5
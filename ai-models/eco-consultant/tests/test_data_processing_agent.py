@@ -0,0 +1,129 @@
+# tests/test_data_processing_agent.py
+
+import json
+import threading
+import time
+import pytest
+from agents.data_processing_agent import DataProcessingAgent, ProcessingError
+from benchmarks.fake_kafka import FakeBroker, TopicPartition
+
+TOPIC = 'data_fetched'
+GROUP = 'data_processing_group'
+
+
+def make_broker(n_messages, partitions=4):
+    broker = FakeBroker(partitions=partitions)
+    for i in range(n_messages):
+        broker.produce(TOPIC, json.dumps({'source': f'https://example.com/{i}'}).encode('utf-8'))
+    return broker
+
+
+def make_agent(broker, **kwargs):
+    consumer = broker.consumer(TOPIC, GROUP, value_deserializer=lambda x: json.loads(x.decode('utf-8')))
+    kwargs.setdefault('max_workers', 4)
+    kwargs.setdefault('batch_size', 8)
+    agent = DataProcessingAgent(consumer=consumer, poll_timeout_ms=10, retry_backoff=0, **kwargs)
+    consumer.subscribe([TOPIC], listener=agent)
+    return agent
+
+
+def run(agent, callback, until, timeout=10):
+    # Runs listen_and_process on a thread until until() holds, then stops it
+    result = {}
+
+    def target():
+        try:
+            result['stats'] = agent.listen_and_process(callback)
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline and thread.is_alive():
+        time.sleep(0.005)
+    agent.stop()
+    thread.join(timeout)
+    assert not thread.is_alive()
+    if 'error' in result:
+        raise result['error']
+    return result['stats']
+
+
+@pytest.mark.parametrize('ordered', [False, True])
+def test_processes_and_commits_everything(ordered):
+    broker = make_broker(40)
+    processed = []
+    agent = make_agent(broker, ordered=ordered)
+    stats = run(agent, processed.append, until=lambda: len(processed) == 40)
+    assert sorted(processed) == sorted(f'https://example.com/{i}' for i in range(40))
+    assert stats['processed'] == 40
+    assert broker.lag(TOPIC, GROUP) == 0
+
+
+def test_repeated_source_is_skipped():
+    broker = make_broker(4, partitions=1)
+    broker.produce(TOPIC, json.dumps({'source': 'https://example.com/0'}).encode('utf-8'))
+    processed = []
+    agent = make_agent(broker)
+    stats = run(agent, processed.append, until=lambda: broker.lag(TOPIC, GROUP) == 0)
+    assert len(processed) == 4
+    assert stats['skipped'] == 1
+
+
+def test_failed_message_is_redelivered():
+    broker = make_broker(8, partitions=1)
+    failing = 'https://example.com/5'
+
+    def callback(source):
+        if source == failing:
+            raise RuntimeError('boom')
+
+    agent = make_agent(broker, ordered=True, max_retries=1)
+    with pytest.raises(ProcessingError):
+        run(agent, callback, until=lambda: False)
+    # Offsets 0-4 finished; the failed message and everything after it stay uncommitted
+    assert broker.committed[(GROUP, TopicPartition(TOPIC, 0))] == 5
+
+    processed = []
+    agent = make_agent(broker, ordered=True)
+    run(agent, processed.append, until=lambda: broker.lag(TOPIC, GROUP) == 0)
+    assert processed[0] == failing
+
+
+def test_revoked_partitions_are_committed_and_dropped():
+    broker = make_broker(40, partitions=2)
+    processed = []
+    agent = make_agent(broker, max_workers=2, batch_size=4, ordered=True)
+    consumer = agent.consumer
+
+    def callback(source):
+        time.sleep(0.005)
+        processed.append(source)
+        if len(processed) == 6:
+            # Partition 1 moves to another consumer on the next poll
+            consumer.rebalance([0])
+
+    revoked_at = {}
+    on_revoked = agent.on_partitions_revoked
+
+    def record_revoke(partitions):
+        on_revoked(partitions)
+        revoked_at.update({tp: broker.committed.get((GROUP, tp), 0) for tp in partitions})
+
+    agent.on_partitions_revoked = record_revoke
+    # The fake raises CommitFailedError if a revoked partition is committed afterwards
+    run(agent, callback, until=lambda: broker.committed.get((GROUP, TopicPartition(TOPIC, 0))) == 20)
+
+    partition_1 = TopicPartition(TOPIC, 1)
+    assert consumer.assignment() == {TopicPartition(TOPIC, 0)}
+    assert broker.committed.get((GROUP, partition_1), 0) == revoked_at[partition_1] > 0
+    # Queued messages of the revoked partition were dropped; at most the one running finished
+    from_partition_1 = [s for s in processed if int(s.rsplit('/', 1)[1]) % 2 == 1]
+    assert len(from_partition_1) <= revoked_at[partition_1] + 1
+
+    # The next owner picks up partition 1 from the commit made on revoke
+    rest = []
+    agent = make_agent(broker)
+    run(agent, rest.append, until=lambda: broker.lag(TOPIC, GROUP) == 0)
+    assert set(processed) | set(rest) == {f'https://example.com/{i}' for i in range(40)}
@@ -0,0 +1,49 @@
+# tests/test_lca_uncertainty.py
+
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+from models.lca_model import LCAModel
+from models.lca_uncertainty import MonteCarloLCA
+
+SUBSTANCES = ['CO2', 'CH4', 'N2O']
+INVENTORY_UNCERTAINTY = pd.DataFrame({'substance': SUBSTANCES, 'distribution': 'lognormal', 'gsd': 1.2})
+
+
+def lca_model(n_categories):
+    factors = pd.DataFrame(np.random.default_rng(0).uniform(1, 10, (len(SUBSTANCES), n_categories)),
+                           index=SUBSTANCES, columns=[f'C{i}' for i in range(n_categories)])
+    return LCAModel(factors)
+
+
+def inventory(n_rows):
+    return pd.DataFrame(np.random.default_rng(1).random((n_rows, len(SUBSTANCES))), columns=SUBSTANCES)
+
+
+@pytest.mark.parametrize('n_categories', [2, 20])
+def test_blocks_stay_within_block_elements(n_categories):
+    block_elements = 2 ** 18
+    df = inventory(2000)
+    mc = MonteCarloLCA(lca_model(n_categories), inventory_uncertainty=INVENTORY_UNCERTAINTY,
+                       n_samples=500, block_elements=block_elements)
+    tracemalloc.start()
+    try:
+        result = mc.simulate(df)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # The output is built twice (blocks, then the frame) and the factor samples once per call
+    fixed = 2 * result.to_numpy().nbytes + 8 * 500 * len(SUBSTANCES) * n_categories
+    assert peak < 8 * block_elements * 1.25 + fixed
+
+
+def test_results_do_not_depend_on_workers():
+    df = inventory(3000)
+    results = [
+        MonteCarloLCA(lca_model(4), inventory_uncertainty=INVENTORY_UNCERTAINTY, n_samples=300,
+                      seed=7, block_elements=2 ** 16, max_workers=workers).simulate(df)
+        for workers in (None, 2, 3)
+    ]
+    assert all(np.array_equal(results[0], other) for other in results[1:])
+    assert (results[0]['C0_p5'] <= results[0]['C0_p50']).all()
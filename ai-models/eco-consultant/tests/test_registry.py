@@ -0,0 +1,15 @@
+# tests/test_registry.py
+
+import gc
+from agents.registry import Registry
+
+
+def test_frozen_hands_objects_back_to_the_collector():
+    registry = Registry()
+    registry.register('model', lambda: {'weights': list(range(1000))})
+    registry.preload('model')
+    before = gc.get_freeze_count()
+    for _ in range(3):
+        with registry.frozen():
+            assert gc.get_freeze_count() > before
+    assert gc.get_freeze_count() == before
@@ -0,0 +1,50 @@
+# tests/test_report_jobs.py
+
+import time
+import pandas as pd
+import pytest
+from api.report_jobs import ReportJobs, summarize
+from storage.table_store import TableStore
+
+
+def test_summarize_groups_metrics(tmp_path):
+    store = TableStore(str(tmp_path), fmt='parquet')
+    store.write(pd.DataFrame({'region': ['EU', 'US', 'EU'], 'GWP': [1.0, 2.0, 3.0]}), 'impact')
+    summary = summarize(store, 'impact', chunksize=2)
+    assert summary['metrics'] == ['GWP']
+    assert summary['totals']['GWP']['sum'] == 6.0
+    assert summary['groups']['region'].loc['EU', ('GWP', 'sum')] == 4.0
+
+
+def test_summarize_without_metric_columns(tmp_path):
+    store = TableStore(str(tmp_path), fmt='parquet')
+    store.write(pd.DataFrame({'region': ['EU', 'US'], 'year': [2022, 2023]}), 'impact')
+    with pytest.raises(ValueError, match='no impact columns'):
+        summarize(store, 'impact')
+
+
+def wait(jobs, job_id):
+    while jobs.status(job_id)['status'] not in ('done', 'failed'):
+        time.sleep(0.01)
+    return jobs.status(job_id)
+
+
+def test_job_status_is_visible_to_other_workers(tmp_path):
+    store = TableStore(str(tmp_path / 'processed'), fmt='parquet')
+    store.write(pd.DataFrame({'region': ['EU', 'US'], 'GWP': [1.0, 2.0]}), 'good_impact')
+    store.write(pd.DataFrame({'region': ['EU', 'US']}), 'bad_impact')
+    reports_path = str(tmp_path / 'reports')
+    submitter, other = ReportJobs(store, reports_path, max_workers=1), ReportJobs(store, reports_path)
+    try:
+        good = submitter.submit('good.csv', 'good_impact')
+        bad = submitter.submit('bad.csv', 'bad_impact')
+        assert other.status(good['id'])['status'] in ('queued', 'done')
+        wait(submitter, good['id'])
+        wait(submitter, bad['id'])
+    finally:
+        submitter.shutdown()
+    assert other.status(good['id'])['status'] == 'done'
+    assert other.status(good['id'])['file'] == 'good.csv'
+    failed = other.status(bad['id'])
+    assert failed['status'] == 'failed' and 'no impact columns' in failed['error']
+    assert other.status('0' * 32 + '-v2') is None
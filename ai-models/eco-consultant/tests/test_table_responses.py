@@ -0,0 +1,33 @@
+# tests/test_table_responses.py
+
+import asyncio
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from api.table_responses import table_response
+from storage.table_store import TableStore
+
+
+def body(response):
+    async def collect():
+        return ''.join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'csv'])
+def test_bad_filter_value_is_rejected_before_streaming(tmp_path, fmt):
+    store = TableStore(str(tmp_path), fmt=fmt)
+    store.write(pd.DataFrame({'year': range(30), 'region': ['EU'] * 30}), 'data')
+    with pytest.raises(HTTPException) as e:
+        table_response(store, 'data', filters=['year:ge:soon'], fmt='csv')
+    assert e.value.status_code == 400
+    response = table_response(store, 'data', filters=['year:ge:25'], fmt='ndjson')
+    assert body(response).count('\n') == 5
+
+
+def test_csv_header_is_quoted(tmp_path):
+    store = TableStore(str(tmp_path), fmt='parquet')
+    store.write(pd.DataFrame({'GWP, kg': [1.5], 'region': ['EU']}), 'data')
+    lines = body(table_response(store, 'data', fmt='csv')).splitlines()
+    assert lines[0] == '"GWP, kg",region'
+    assert lines[1] == '1.5,EU'
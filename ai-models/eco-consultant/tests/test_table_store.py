@@ -0,0 +1,48 @@
+# tests/test_table_store.py
+
+import os
+import pandas as pd
+import pytest
+from agents.data_cleaning_agent import DataCleaningAgent
+from storage.table_store import TableStore
+
+
+def write_chunks(store, name, chunks):
+    with store.writer(name) as writer:
+        for chunk in chunks:
+            writer.write(pd.DataFrame(chunk))
+    return store.read(name)
+
+
+def test_streaming_clean_with_all_null_first_chunk(tmp_path):
+    raw_path = tmp_path / 'raw'
+    raw_path.mkdir()
+    pd.DataFrame({'a': [1, 2, 3, 4], 'b': [None, None, 'x', 'y']}).to_csv(raw_path / 'data.csv', index=False)
+    agent = DataCleaningAgent(str(raw_path), str(tmp_path / 'processed'), chunksize=2,
+                              store=TableStore(str(tmp_path / 'processed'), fmt='parquet'))
+    agent.clean_csv('data.csv')
+    df = agent.store.read('data.csv')
+    assert df['a'].tolist() == [1, 2, 3, 4]
+    assert df['b'].isna().tolist() == [True, True, False, False]
+    assert df['b'].tolist()[2:] == ['x', 'y']
+
+
+def test_null_column_takes_type_of_later_chunk(tmp_path):
+    store = TableStore(str(tmp_path), fmt='parquet')
+    df = write_chunks(store, 'data', [{'x': [None, None]}, {'x': [True, False]}])
+    assert df['x'].tolist() == [None, None, True, False]
+
+
+def test_later_chunk_widens_column(tmp_path):
+    store = TableStore(str(tmp_path), fmt='parquet')
+    df = write_chunks(store, 'data', [{'x': [1, 2]}, {'x': [1.5, None]}])
+    assert df['x'].tolist()[:3] == [1.0, 2.0, 1.5]
+    assert df['x'].dtype == 'float64'
+    assert not os.path.exists(store.path('data') + '.tmp.old')
+
+
+def test_incompatible_chunk_types_fail_cleanly(tmp_path):
+    store = TableStore(str(tmp_path), fmt='parquet')
+    with pytest.raises(ValueError, match='changes type'):
+        write_chunks(store, 'data', [{'x': [1, 2]}, {'x': ['a', 'b']}])
+    assert os.listdir(tmp_path) == []
@@ -1,22 +1,208 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from models.recommendation.model import RecommendationModel
+from models.recommendation.top_n_table import TopNTable
+import gc
+import os
+import sys
+import threading
+import time
+import logging
 import pandas as pd
 
+# Metrics come from eco-consultant's monitoring package.  This service has its
+# own import root, so that directory is appended when monitoring is not on the path already
+try:
+    from monitoring import metrics
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'eco-consultant'))
+    from monitoring import metrics
+from monitoring.web import instrument_flask
+
+INTERACTIONS_FILE = 'data/interactions.csv'
+TOP_N_TABLE_PATH = 'data/top_n'
+SNAPSHOT_PATH = 'data/snapshot'
+SNAPSHOT_INTERVAL = 300  # seconds between snapshots while updates are arriving
+UPDATE_INTERVAL = 1  # seconds queued interaction deltas wait to be merged as one batch
+MAX_PENDING_ROWS = 50000  # merge at once when this many rows are waiting
+MAX_BATCH_SIZE = 10000
+# Build the model at import instead of on the first request, e.g. under a
+# pre-forking server so every worker shares the parent's copy.  POST
+# /interactions then updates only the worker that receives it: each worker
+# merges and snapshots its own copy (the last snapshot written wins), so run a
+# single worker when every request must see every update
+PRELOAD = os.environ.get('RECOMMENDATION_PRELOAD') == '1'
+
 app = Flask(__name__)
 CORS(app)
+metrics.configure()
+instrument_flask(app, 'recommendation')
+
+# Built by load_model() on first use
+recommendation_model = None
+# Precomputed top-N (see top_n_table.py); None when missing or stale
+top_n_table = None
+_model_lock = threading.Lock()
+# Users with interactions newer than the table always get live scores; saved
+# with each snapshot, since the table is only ever rebuilt from the CSV
+updated_users = set()
+updates_pending = threading.Event()
+flush_updates = threading.Event()
+snapshot_pending = threading.Event()
+# Process the update and snapshot threads run in; threads do not survive a fork
+_background_pid = None
+_background_lock = threading.Lock()
+
+def load_model():
+    global recommendation_model, top_n_table
+    if recommendation_model is not None:
+        return recommendation_model
+    with _model_lock:
+        if recommendation_model is None:
+            model = build_model()
+            top_n_table = TopNTable.load(TOP_N_TABLE_PATH, source_file=INTERACTIONS_FILE)
+            # Published last: the check above does not take the lock
+            recommendation_model = model
+    return recommendation_model
+
+@metrics.timed('recommendation_load')
+def build_model():
+    # Resume from the latest snapshot unless the CSV is newer
+    model = RecommendationModel()
+    if os.path.exists(SNAPSHOT_PATH) and os.path.getmtime(SNAPSHOT_PATH) >= os.path.getmtime(INTERACTIONS_FILE):
+        updated_users.update(model.load_snapshot(SNAPSHOT_PATH))
+        return model
+    # Load interaction data
+    interactions_df = pd.read_csv(INTERACTIONS_FILE)
+    model.build_user_product_matrix(interactions_df)
+    if os.path.exists(SNAPSHOT_PATH):
+        # Updates accepted since the CSV was exported would be lost with the snapshot
+        restored = model.restore_updated_users(SNAPSHOT_PATH)
+        if restored:
+            logging.warning(f"{INTERACTIONS_FILE} is newer than the snapshot in {SNAPSHOT_PATH}: "
+                            f"{len(restored)} users updated through /interactions keep their "
+                            f"snapshot rows and their rows in the CSV are ignored")
+        updated_users.update(restored)
+    return model
+
+if PRELOAD:
+    load_model()
+    # Keeps the collector from touching (and so copying) the model's pages in forked workers
+    gc.collect()
+    gc.freeze()
 
-# Initialize model
-recommendation_model = RecommendationModel()
-# Load interaction data
-interactions_df = pd.read_csv('data/interactions.csv')
-recommendation_model.build_user_product_matrix(interactions_df)
+def update_loop():
+    while True:
+        updates_pending.wait()
+        flush_updates.wait(UPDATE_INTERVAL)
+        # Cleared before the merge: deltas queued from here on set them again
+        updates_pending.clear()
+        flush_updates.clear()
+        try:
+            with metrics.timed('recommendation_update', log=False) as timer:
+                timer.rows = recommendation_model.apply_pending()
+        except Exception as e:
+            logging.error(f"Applying interaction updates failed: {e}")
+        snapshot_pending.set()
+
+def snapshot_loop():
+    while True:
+        snapshot_pending.wait()
+        time.sleep(SNAPSHOT_INTERVAL)
+        snapshot_pending.clear()
+        try:
+            with metrics.timed('recommendation_snapshot'):
+                recommendation_model.save_snapshot(SNAPSHOT_PATH, updated_users)
+        except Exception as e:
+            logging.error(f"Snapshot failed: {e}")
+            snapshot_pending.set()
+
+def start_background():
+    # Started by the first update in each process, so forked workers get their own threads
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    with _background_lock:
+        if _background_pid != os.getpid():
+            threading.Thread(target=update_loop, daemon=True).start()
+            threading.Thread(target=snapshot_loop, daemon=True).start()
+            _background_pid = os.getpid()
+
+def lookup_recommendations(user_ids, top_n):
+    model = load_model()
+    results = {}
+    misses = []
+    for user_id in user_ids:
+        cached = None
+        if top_n_table is not None and user_id not in updated_users:
+            cached = top_n_table.get(user_id, top_n)
+        if cached is None:
+            misses.append(user_id)
+        else:
+            results[user_id] = cached
+    if misses:
+        results.update(model.recommend_batch(misses, top_n))
+    return results
+
+def parse_top_n(value):
+    # None when value is not a positive integer
+    try:
+        top_n = int(value)
+    except (TypeError, ValueError):
+        return None
+    return top_n if top_n > 0 else None
 
 @app.route('/recommend', methods=['GET'])
 def recommend():
-    user_id = int(request.args.get('user_id'))
-    recommendations = recommendation_model.recommend_products(user_id)
+    try:
+        user_id = int(request.args.get('user_id'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'user_id must be an integer'}), 400
+    top_n = parse_top_n(request.args.get('top_n', 5))
+    if top_n is None:
+        return jsonify({'error': 'top_n must be a positive integer'}), 400
+    recommendations = lookup_recommendations([user_id], top_n)[user_id]
     return jsonify({'user_id': user_id, 'recommendations': recommendations})
 
+@app.route('/recommend/batch', methods=['POST'])
+def recommend_batch():
+    payload = request.get_json(silent=True) or {}
+    try:
+        user_ids = [int(user_id) for user_id in payload.get('user_ids', [])]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'user_ids must be a list of integers'}), 400
+    top_n = parse_top_n(payload.get('top_n', 5))
+    if top_n is None:
+        return jsonify({'error': 'top_n must be a positive integer'}), 400
+    if len(user_ids) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} user_ids per request'}), 400
+    results = lookup_recommendations(user_ids, top_n)
+    return jsonify({'results': [
+        {'user_id': user_id, 'recommendations': results[user_id]} for user_id in user_ids
+    ]})
+
+@app.route('/interactions', methods=['POST'])
+def add_interactions():
+    # Accepts one event or {"interactions": [...]}; "accumulate": true adds instead of replacing.
+    # Deltas are merged in batches, so they show up in recommendations within UPDATE_INTERVAL
+    payload = request.get_json(silent=True) or {}
+    events = payload.get('interactions', [payload])
+    try:
+        deltas = pd.DataFrame({
+            'user_id': [int(event['user_id']) for event in events],
+            'product_id': [int(event['product_id']) for event in events],
+            'interaction': [float(event['interaction']) for event in events],
+        })
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each interaction needs user_id, product_id and interaction'}), 400
+    model = load_model()
+    start_background()
+    # Marked before the deltas are queued, so a snapshot never holds deltas for a user it does not list
+    updated_users.update(deltas['user_id'].tolist())
+    if model.queue_interactions(deltas, accumulate=bool(payload.get('accumulate', False))) >= MAX_PENDING_ROWS:
+        flush_updates.set()
+    updates_pending.set()
+    return jsonify({'queued': len(deltas)}), 202
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)
@@ -0,0 +1,76 @@
+# models/recommendation/benchmarks/bench_neighbour_index.py
+#
+# recall@k and query time of the approximate neighbour index against the exact scan.
+# Run: python -m models.recommendation.benchmarks.bench_neighbour_index
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from models.recommendation.sparse_interactions import SparseInteractions
+from models.recommendation.neighbour_index import ExactIndex, IVFIndex
+
+
+def synthetic_interactions(n_users, n_products, per_user, n_groups=50, seed=0):
+    # Users draw most products from their taste group and the rest from a
+    # Zipf-popular catalogue, so there are both neighbourhoods and hub products
+    rng = np.random.default_rng(seed)
+    groups = rng.integers(0, n_groups, n_users)
+    user_ids = np.repeat(np.arange(n_users), per_user)
+    group_size = n_products // n_groups
+    group_products = np.repeat(groups, per_user) * group_size + rng.integers(0, group_size, len(user_ids))
+    popularity = 1.0 / np.arange(1, n_products + 1)
+    popular_products = rng.choice(n_products, len(user_ids), p=popularity / popularity.sum())
+    in_group = rng.random(len(user_ids)) < 0.7
+    df = pd.DataFrame({
+        'user_id': user_ids,
+        'product_id': np.where(in_group, group_products, popular_products),
+        'interaction': rng.uniform(0.5, 5.0, len(user_ids)),
+    })
+    return df.drop_duplicates(['user_id', 'product_id'])
+
+
+def recall_at_k(interactions, index, users, k):
+    recalls, elapsed = [], 0.0
+    for user_pos in users:
+        start = time.perf_counter()
+        found = index.query(interactions, user_pos, k)
+        elapsed += time.perf_counter() - start
+        # Count by similarity so ties at the k-th place do not count as misses
+        sims = interactions.similarities(user_pos)
+        sims[user_pos] = -np.inf
+        kth = np.sort(sims)[-k]
+        recalls.append(np.sum(sims[found] >= kth) / k)
+    return float(np.mean(recalls)), elapsed / len(users)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--per-user', type=int, default=20)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    interactions = SparseInteractions.from_frame(
+        synthetic_interactions(args.users, args.products, args.per_user))
+    users = np.random.default_rng(1).choice(interactions.matrix.shape[0], args.queries, replace=False)
+    print(f"{interactions.matrix.shape[0]} users x {interactions.matrix.shape[1]} products, "
+          f"{interactions.matrix.nnz} interactions, recall@{args.k}")
+
+    recall, query = recall_at_k(interactions, ExactIndex(), users, args.k)
+    print(f"  exact           recall {recall:.3f}  {query * 1000:7.2f} ms/query")
+
+    start = time.perf_counter()
+    index = IVFIndex().fit(interactions)
+    print(f"  IVF fit ({len(index.centroids)} lists): {time.perf_counter() - start:.2f}s")
+    for n_probe in args.n_probe:
+        index.n_probe = n_probe
+        recall, query = recall_at_k(interactions, index, users, args.k)
+        print(f"  IVF n_probe={n_probe:<3} recall {recall:.3f}  {query * 1000:7.2f} ms/query")
+
+
+if __name__ == '__main__':
+    main()
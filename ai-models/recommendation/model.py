@@ -1,14 +1,40 @@
 # models/recommendation/model.py
 
+import itertools
+import os
+import threading
+import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+from models.recommendation.sparse_interactions import SparseInteractions
 
 class RecommendationModel:
-    def __init__(self):
+    def __init__(self, engine='sparse', neighbour_index=None):
+        # 'sparse' keeps a CSR interaction store and scores on demand;
+        # 'dense' is the original pivot + all-pairs similarity path.
+        # neighbour_index (see neighbour_index.py) restricts the sparse
+        # neighbour walk to approximate nearest users.
+        if engine not in ('sparse', 'dense'):
+            raise ValueError(f"Unknown engine: {engine}")
+        if neighbour_index is not None and engine != 'sparse':
+            raise ValueError("A neighbour index needs the sparse engine")
+        self.engine = engine
+        self.neighbour_index = neighbour_index
         self.user_product_matrix = None
         self.similarity_matrix = None
+        self.interactions = None
+        self._update_lock = threading.Lock()
+        # Deltas waiting for apply_pending(), as (frame, accumulate) in arrival order
+        self._pending = []
+        self._pending_rows = 0
+        self._pending_lock = threading.Lock()
 
     def build_user_product_matrix(self, interactions_df):
+        if self.engine == 'sparse':
+            self.interactions = SparseInteractions.from_frame(interactions_df)
+            self._fit_index()
+            return
+        # Imported here: scikit-learn is only needed by the dense engine and is slow to load
+        from sklearn.metrics.pairwise import cosine_similarity
         self.user_product_matrix = interactions_df.pivot_table(
             index='user_id', columns='product_id', values='interaction', fill_value=0
         )
@@ -19,7 +45,99 @@ class RecommendationModel:
             columns=self.user_product_matrix.index
         )
 
+    def update_interactions(self, interactions_df, accumulate=False):
+        # Readers keep whichever store they picked up; the new one is swapped in whole
+        if self.engine != 'sparse':
+            raise ValueError("Incremental updates need the sparse engine")
+        with self._update_lock:
+            self.interactions = self.interactions.updated(interactions_df, accumulate=accumulate)
+
+    def queue_interactions(self, interactions_df, accumulate=False):
+        """Buffer deltas for the next apply_pending(); returns the number of rows waiting.
+
+        Each update_interactions call copies the store's patch and norms, so
+        events arriving one at a time are queued and merged in batches.
+        """
+        if self.engine != 'sparse':
+            raise ValueError("Incremental updates need the sparse engine")
+        with self._pending_lock:
+            self._pending.append((interactions_df, accumulate))
+            self._pending_rows += len(interactions_df)
+            return self._pending_rows
+
+    def apply_pending(self):
+        # One rebuild per run of same-mode deltas; concatenated deltas keep arrival order,
+        # which is what replace (last wins) and accumulate (sum) need
+        with self._update_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+                rows, self._pending_rows = self._pending_rows, 0
+            for accumulate, run in itertools.groupby(pending, key=lambda item: item[1]):
+                deltas = pd.concat([df for df, _ in run], ignore_index=True)
+                self.interactions = self.interactions.updated(deltas, accumulate=accumulate)
+        return rows
+
+    def save_snapshot(self, path, updated_users=None):
+        # The store is picked up before the user set is copied, so a user whose
+        # deltas are in the snapshot is always in the saved set
+        interactions = self.interactions
+        extra = None
+        if updated_users is not None:
+            extra = {'updated_users': np.asarray(list(updated_users.copy()))}
+        interactions.save(path, extra=extra)
+
+    def load_snapshot(self, path):
+        """Load a snapshot; returns the updated-user set saved with it (empty if none)."""
+        if self.engine != 'sparse':
+            raise ValueError("Snapshots need the sparse engine")
+        self.interactions = SparseInteractions.load(path)
+        self._fit_index()
+        return _saved_users(path)
+
+    def restore_updated_users(self, path):
+        """Replace the rows of the users the snapshot at path lists as updated with their snapshot rows.
+
+        For a store rebuilt from a CSV written after the snapshot: deltas that
+        reached the snapshot but not the CSV are kept, at the cost of whatever
+        the CSV says about those users.  Returns the users restored.
+        """
+        users = _saved_users(path)
+        if not users:
+            return users
+        snapshot = SparseInteractions.load(path)
+        frames = []
+        # Current entries are cleared first so each user ends up with exactly the snapshot row
+        for store, interaction in ((self.interactions, 0.0), (snapshot, None)):
+            positions = store.user_ids.get_indexer(list(users))
+            positions = positions[positions >= 0]
+            rows = store.rows(positions).tocoo()
+            frames.append(pd.DataFrame({
+                'user_id': np.asarray(store.user_ids)[positions[rows.row]],
+                'product_id': np.asarray(store.product_ids)[rows.col],
+                'interaction': rows.data if interaction is None else interaction,
+            }))
+        self.update_interactions(pd.concat(frames, ignore_index=True))
+        return users
+
+    def _fit_index(self):
+        # Users added later by update_interactions are queried but not indexed
+        # until the next fit
+        if self.neighbour_index is not None:
+            self.neighbour_index.fit(self.interactions)
+
+    def recommend_batch(self, user_ids, top_n=5):
+        if self.engine == 'sparse' and self.neighbour_index is None:
+            return self.interactions.recommend_batch(user_ids, top_n)
+        return {user_id: self.recommend_products(user_id, top_n) for user_id in user_ids}
+
+    def all_user_ids(self):
+        if self.engine == 'sparse':
+            return self.interactions.user_ids
+        return self.user_product_matrix.index
+
     def recommend_products(self, user_id, top_n=5):
+        if self.engine == 'sparse':
+            return self.interactions.recommend(user_id, top_n, index=self.neighbour_index)
         if user_id not in self.user_product_matrix.index:
             return []
         user_similarity = self.similarity_df[user_id]
@@ -33,7 +151,15 @@ class RecommendationModel:
                         recommendations[product_id] = interaction
                     else:
                         recommendations[product_id] += interaction
-                if len(recommendations) >= top_n:
-                    break
+            if len(recommendations) >= top_n:
+                break
         recommended_products = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)[:top_n]
         return [product for product, score in recommended_products]
+
+
+def _saved_users(path):
+    # Users updated before the snapshot at path was taken; empty for snapshots without the list
+    users_file = os.path.join(path, 'updated_users.npy')
+    if not os.path.exists(users_file):
+        return set()
+    return set(np.load(users_file, allow_pickle=True).tolist())
@@ -0,0 +1,118 @@
+# models/recommendation/neighbour_index.py
+
+import numpy as np
+from scipy import sparse
+
+# Cells of the dense users x centroids score block built per chunk (32MB of float32)
+ASSIGN_BLOCK_CELLS = 2 ** 23
+
+# Neighbour indexes plug into RecommendationModel(neighbour_index=...).  Each one
+# implements fit(interactions) and query(interactions, user_pos, k), returning the
+# positions of up to k most similar users (self excluded), most similar first.
+
+
+class ExactIndex:
+    """All users scored exactly; the reference the approximate indexes are measured against."""
+
+    def fit(self, interactions):
+        return self
+
+    def query(self, interactions, user_pos, k):
+        sims = interactions.similarities(user_pos)
+        sims[user_pos] = -np.inf
+        k = min(k, len(sims) - 1)
+        top = np.argpartition(-sims, k - 1)[:k] if k > 0 else np.array([], dtype=np.int64)
+        return top[np.lexsort((top, -sims[top]))]
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means lists over the user vectors.
+
+    Users are grouped into `n_lists` lists by cosine to the list centroid, and a
+    query only scores the members of the `n_probe` lists closest to the user,
+    re-ranked with the exact cosine.  n_probe is the recall/speed knob; with
+    n_probe == n_lists the result is exact.  Centroids are held as a dense
+    float32 (n_lists, n_products) array.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, train_per_list=64, seed=0):
+        if n_lists is not None and n_lists < 1:
+            raise ValueError(f"n_lists must be at least 1, got {n_lists}")
+        if n_probe < 1:
+            raise ValueError(f"n_probe must be at least 1, got {n_probe}")
+        if n_lists is not None and n_probe > n_lists:
+            raise ValueError(f"n_probe ({n_probe}) cannot exceed n_lists ({n_lists})")
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_per_list = train_per_list
+        self.seed = seed
+        self.centroids = None
+
+    def fit(self, interactions):
+        rng = np.random.default_rng(self.seed)
+        n_users = interactions.shape[0]
+        self.centroids = None
+        users = self._unit_rows(interactions, np.arange(n_users))
+
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n_users))), n_users)
+        # k-means runs on a sample; every user is assigned once at the end
+        n_train = min(n_users, n_lists * self.train_per_list)
+        train = users[rng.choice(n_users, n_train, replace=False)]
+        centroids = train[:n_lists].toarray().astype(np.float32)
+        for _ in range(self.n_iter):
+            assignment = _nearest(train, centroids)
+            membership = sparse.csr_matrix(
+                (np.ones(n_train), (assignment, np.arange(n_train))), shape=(n_lists, n_train))
+            sums = np.asarray(membership.dot(train).toarray(), dtype=np.float32)
+            empty = ~sums.any(axis=1)
+            # Empty lists are reseeded from random users rather than left dead
+            sums[empty] = train[rng.choice(n_train, empty.sum())].toarray()
+            centroids = _normalize(sums)
+        assignment = _nearest(users, centroids)
+
+        self.centroids = centroids
+        self.centroids_by_product = np.ascontiguousarray(centroids.T)
+        self.list_members = np.argsort(assignment, kind='stable')
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        return self
+
+    def query(self, interactions, user_pos, k):
+        user = self._unit_rows(interactions, [user_pos])
+        # Only the centroid columns of the user's own products matter
+        scores = user.data.dot(self.centroids_by_product[user.indices])
+        n_probe = min(self.n_probe, len(scores))
+        probe = np.argpartition(-scores, n_probe - 1)[:n_probe]
+        candidates = np.concatenate([
+            self.list_members[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probe
+        ])
+        candidates = candidates[candidates != user_pos]
+        sims = interactions.similarities_to(user_pos, candidates)
+        order = np.lexsort((candidates, -sims))[:k]
+        return candidates[order]
+
+    def _unit_rows(self, interactions, positions):
+        rows = interactions.rows(positions)
+        # Products added after fit have no centroid column and are ignored
+        if self.centroids is not None and rows.shape[1] != self.centroids.shape[1]:
+            rows = rows[:, :self.centroids.shape[1]]
+        norms = interactions.norms[positions]
+        scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        return sparse.diags(scale).dot(rows).tocsr()
+
+
+def _nearest(users, centroids):
+    # Closest centroid per user; centroids transposed once so the sparse product stays in C.
+    # Users are scored in row chunks so the dense score block stays bounded
+    by_product = np.ascontiguousarray(centroids.T)
+    chunk = max(1, ASSIGN_BLOCK_CELLS // max(centroids.shape[0], 1))
+    assignment = np.empty(users.shape[0], dtype=np.int64)
+    for start in range(0, users.shape[0], chunk):
+        scores = users[start:start + chunk].dot(by_product)
+        assignment[start:start + chunk] = np.argmax(scores, axis=1)
+    return assignment
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
@@ -0,0 +1,308 @@
+# models/recommendation/sparse_interactions.py
+
+import copy
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Cells in the dense similarity block recommend_batch builds per chunk (64MB of float64)
+MAX_BLOCK_CELLS = 2 ** 23
+# Updated rows are kept in a patch over the base matrix; once the patch holds more
+# than this share of the base's entries (and at least COMPACT_MIN_ENTRIES) the
+# two are merged into a new base
+COMPACT_FRACTION = 0.1
+COMPACT_MIN_ENTRIES = 100_000
+
+
+class SparseInteractions:
+    """User x product interactions kept as CSR, with cosine scoring done on demand.
+
+    The interactions are a base CSR matrix (with a CSC copy for scoring by
+    product) plus a patch: a CSR of the same shape holding the current rows
+    of users updated since the base was built.  A patched row replaces its
+    base row.  Updates only touch the patch, so their cost follows the patch
+    size rather than the whole matrix; the base is rebuilt when the patch
+    outgrows COMPACT_FRACTION of it.
+    """
+
+    def __init__(self, matrix, user_ids, product_ids, norms=None):
+        self.base = sparse.csr_matrix(matrix, dtype=np.float64)
+        self.base.eliminate_zeros()
+        self.user_ids = pd.Index(user_ids)
+        self.product_ids = pd.Index(product_ids)
+        self.by_product = self.base.tocsc()
+        self.norms = _row_norms(self.base) if norms is None else norms
+        self.patch = sparse.csr_matrix(self.base.shape, dtype=np.float64)
+        self.patched = np.zeros(self.base.shape[0], dtype=bool)
+        self.patched_rows = np.array([], dtype=np.int64)
+
+    @property
+    def shape(self):
+        return len(self.user_ids), len(self.product_ids)
+
+    @property
+    def matrix(self):
+        # The whole matrix with the patch applied; built on first use, e.g. to fit an index or save
+        if not len(self.patched_rows):
+            return self.base
+        if getattr(self, '_matrix', None) is None:
+            self._matrix = self.rows(np.arange(self.shape[0]))
+        return self._matrix
+
+    @classmethod
+    def from_frame(cls, interactions_df):
+        # Same aggregation as pivot_table: mean of repeated (user, product) pairs, NaN dropped
+        df = interactions_df.dropna(subset=['interaction'])
+        df = df.groupby(['user_id', 'product_id'], sort=False)['interaction'].mean().reset_index()
+        user_codes, user_ids = pd.factorize(df['user_id'], sort=True)
+        product_codes, product_ids = pd.factorize(df['product_id'], sort=True)
+        matrix = sparse.csr_matrix(
+            (df['interaction'].to_numpy(dtype=np.float64), (user_codes, product_codes)),
+            shape=(len(user_ids), len(product_ids))
+        )
+        return cls(matrix, user_ids, product_ids)
+
+    @classmethod
+    def load(cls, path):
+        matrix = sparse.load_npz(os.path.join(path, 'matrix.npz'))
+        user_ids = np.load(os.path.join(path, 'user_ids.npy'), allow_pickle=True)
+        product_ids = np.load(os.path.join(path, 'product_ids.npy'), allow_pickle=True)
+        return cls(matrix, user_ids, product_ids)
+
+    def save(self, path, extra=None):
+        # Written next to the target and swapped in, so a crash never leaves half a snapshot.
+        # extra maps names to arrays saved in the same directory as <name>.npy
+        tmp_path, old_path = path + '.tmp', path + '.old'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        sparse.save_npz(os.path.join(tmp_path, 'matrix.npz'), self.matrix, compressed=False)
+        np.save(os.path.join(tmp_path, 'user_ids.npy'), np.asarray(self.user_ids))
+        np.save(os.path.join(tmp_path, 'product_ids.npy'), np.asarray(self.product_ids))
+        for name, array in (extra or {}).items():
+            np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+        if os.path.exists(path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def updated(self, interactions_df, accumulate=False):
+        """Return a new store with interaction deltas applied; self is not modified.
+
+        By default a delta replaces the stored value for its (user, product)
+        pair (0 removes it); with accumulate=True deltas are added to it.  New
+        users and products are appended.  Only the rows of touched users are
+        rebuilt, into the patch; the base matrix and its CSC copy are shared
+        with self until the patch is large enough to be compacted into them.
+        """
+        df = interactions_df.dropna(subset=['interaction'])
+        if accumulate:
+            df = df.groupby(['user_id', 'product_id'], sort=False)['interaction'].sum().reset_index()
+        else:
+            df = df.drop_duplicates(['user_id', 'product_id'], keep='last')
+
+        user_ids = _append_new(self.user_ids, df['user_id'])
+        product_ids = _append_new(self.product_ids, df['product_id'])
+        shape = (len(user_ids), len(product_ids))
+        touched, local = np.unique(user_ids.get_indexer(df['user_id']), return_inverse=True)
+        cols = product_ids.get_indexer(df['product_id'])
+
+        # Current rows of the touched users; new users sort last and start empty
+        n_known = np.searchsorted(touched, self.shape[0])
+        current = sparse.vstack([
+            _resize(self.rows(touched[:n_known]), (n_known, shape[1])),
+            sparse.csr_matrix((len(touched) - n_known, shape[1])),
+        ]).tocsr()
+        delta = sparse.csr_matrix((df['interaction'].to_numpy(dtype=np.float64), (local, cols)),
+                                  shape=current.shape)
+        if accumulate:
+            new_rows = current + delta
+        else:
+            pattern = sparse.csr_matrix((np.ones(len(local)), (local, cols)), shape=current.shape)
+            new_rows = current - current.multiply(pattern) + delta
+        new_rows = sparse.csr_matrix(new_rows)
+        new_rows.eliminate_zeros()
+
+        n_new_rows = shape[0] - self.shape[0]
+        norms = np.concatenate([self.norms, np.zeros(n_new_rows)])
+        norms[touched] = _row_norms(new_rows)
+        patched = np.concatenate([self.patched, np.zeros(n_new_rows, dtype=bool)])
+        patched[touched] = True
+        # The old patch minus the touched rows, plus their new contents
+        kept = np.ones(self.shape[0])
+        kept[touched[:n_known]] = 0
+        patch = (_resize(sparse.diags(kept).dot(self.patch).tocsr(), shape)
+                 + _placed(new_rows, touched, shape[0])).tocsr()
+
+        if patch.nnz > max(COMPACT_MIN_ENTRIES, COMPACT_FRACTION * self.base.nnz):
+            # Unpatched base rows plus the patch become the new base
+            base = sparse.diags((~patched).astype(np.float64)).dot(_resize(self.base, shape)) + patch
+            return SparseInteractions(base, user_ids, product_ids, norms=norms)
+        store = copy.copy(self)
+        store.user_ids, store.product_ids, store.norms = user_ids, product_ids, norms
+        store.patch, store.patched, store.patched_rows = patch, patched, np.flatnonzero(patched)
+        store._matrix = None
+        return store
+
+    def __contains__(self, user_id):
+        return user_id in self.user_ids
+
+    def row(self, user_pos):
+        # (products, values) of one user
+        source = self.patch if self.patched[user_pos] else self.base
+        start, end = source.indptr[user_pos], source.indptr[user_pos + 1]
+        return source.indices[start:end], source.data[start:end]
+
+    def rows(self, positions):
+        """CSR of the given users' rows, in order, with the patch applied."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(self.patched_rows):
+            return self.base[positions]
+        from_base = ~self.patched[positions]
+        base_rows = _resize(self.base[positions[from_base]], (int(from_base.sum()), self.shape[1]))
+        return (_placed(base_rows, np.flatnonzero(from_base), len(positions)) + self.patch[positions]).tocsr()
+
+    def similarities(self, user_pos):
+        # Cosine similarity of one user against every user, without the n x n matrix.
+        # Only the columns of the user's own products are touched
+        cols, vals = self.row(user_pos)
+        in_base = cols < self.base.shape[1]
+        dots = np.zeros(self.shape[0])
+        dots[:self.base.shape[0]] = self.by_product[:, cols[in_base]].dot(vals[in_base])
+        if len(self.patched_rows):
+            user = np.zeros(self.shape[1])
+            user[cols] = vals
+            dots[self.patched_rows] = self.patch.dot(user)[self.patched_rows]
+        denom = self.norms * self.norms[user_pos]
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    def similarities_to(self, user_pos, candidates):
+        # Cosine similarity of one user against a subset of users
+        user = np.zeros(self.shape[1])
+        cols, vals = self.row(user_pos)
+        user[cols] = vals
+        dots = self.rows(candidates).dot(user)
+        denom = self.norms[candidates] * self.norms[user_pos]
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    def similarities_batch(self, user_positions):
+        # One sparse product for a whole block of users: (n_users, len(user_positions))
+        queries = self.rows(user_positions)
+        dots = np.zeros((self.shape[0], len(user_positions)))
+        dots[:self.base.shape[0]] = self.base.dot(queries[:, :self.base.shape[1]].T).toarray()
+        if len(self.patched_rows):
+            dots[self.patched_rows] = self.patch[self.patched_rows].dot(queries.T).toarray()
+        denom = np.outer(self.norms, self.norms[user_positions])
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    def recommend(self, user_id, top_n=5, index=None, n_neighbours=200):
+        if user_id not in self.user_ids:
+            return []
+        user_pos = self.user_ids.get_loc(user_id)
+        if index is not None:
+            # Walk only the index's neighbours; fall back to the exact scan when
+            # they do not yield top_n candidates
+            neighbours = index.query(self, user_pos, n_neighbours)
+            sims = np.zeros(self.shape[0])
+            sims[neighbours] = -np.arange(len(neighbours), dtype=np.float64)
+            products = self.top_n_for(user_pos, sims, top_n, pool=neighbours)
+            if len(products) == top_n:
+                return self.product_ids[products].tolist()
+        products = self.top_n_for(user_pos, self.similarities(user_pos), top_n)
+        return self.product_ids[products].tolist()
+
+    def recommend_batch(self, user_ids, top_n=5, chunk_size=256):
+        """Recommendations for many users, keyed by user id (unknown users get [])."""
+        results = {user_id: [] for user_id in user_ids}
+        positions = self.user_ids.get_indexer(list(results))
+        known = [(user_id, pos) for user_id, pos in zip(results, positions) if pos >= 0]
+        # A chunk is a dense n_users x chunk_size block, so chunks shrink as users grow
+        chunk_size = max(1, min(chunk_size, MAX_BLOCK_CELLS // max(self.shape[0], 1)))
+        for start in range(0, len(known), chunk_size):
+            block = known[start:start + chunk_size]
+            sims = self.similarities_batch([pos for _, pos in block])
+            for column, (user_id, pos) in enumerate(block):
+                products = self.top_n_for(pos, sims[:, column], top_n)
+                results[user_id] = self.product_ids[products].tolist()
+        return results
+
+    def top_n_for(self, user_pos, sims, top_n, block=64, pool=None):
+        """Walk neighbours by similarity until top_n candidates exist, then rank them.
+
+        Equivalent to the original loop: products the user has not interacted
+        with are scored by summing positive interactions of every neighbour up to
+        and including the one that brings the candidate count to top_n.  Ties keep
+        first-seen order.  Neighbours are ranked and sliced in growing blocks, so
+        a query rarely touches more than a few rows of the matrix.  pool limits
+        the walk to a subset of users (default: everyone but the user).
+        """
+        seen = np.zeros(self.shape[1], dtype=bool)
+        seen[self.row(user_pos)[0]] = True
+        if pool is None:
+            pool = np.delete(np.arange(self.shape[0]), user_pos)
+
+        size = block
+        while True:
+            neighbours = self._ranked(sims, pool, size)
+            rows, cols, vals = self._candidates(neighbours, seen)
+            products, first = np.unique(cols, return_index=True)
+            first_rows = rows[first]
+            if len(products) >= top_n:
+                cutoff = np.partition(first_rows, top_n - 1)[top_n - 1] + 1
+                break
+            if len(neighbours) == len(pool):
+                cutoff = len(neighbours)
+                break
+            size *= 4
+
+        walked = rows < cutoff
+        scores = np.bincount(cols[walked], weights=vals[walked], minlength=self.shape[1])
+        keep = first_rows < cutoff
+        products, first_rows = products[keep], first_rows[keep]
+        product_scores = scores[products]
+
+        if len(products) > top_n:
+            # Partial sort: only candidates tied with or above the top_n-th score get fully ordered
+            threshold = np.partition(product_scores, len(products) - top_n)[len(products) - top_n]
+            keep = product_scores >= threshold
+            products, first_rows, product_scores = products[keep], first_rows[keep], product_scores[keep]
+        order = np.lexsort((products, first_rows, -product_scores))[:top_n]
+        return products[order]
+
+    def _ranked(self, sims, pool, size):
+        # Stable-order prefix of pool by descending similarity, at least size long
+        if size < len(pool):
+            kth = np.partition(-sims[pool], size - 1)[size - 1]
+            pool = pool[-sims[pool] <= kth]
+        return pool[np.lexsort((pool, -sims[pool]))]
+
+    def _candidates(self, neighbours, seen):
+        block = self.rows(neighbours)
+        rows = np.repeat(np.arange(len(neighbours)), np.diff(block.indptr))
+        cols, vals = block.indices, block.data
+        keep = (vals > 0) & ~seen[cols]
+        return rows[keep], cols[keep], vals[keep]
+
+
+def _row_norms(matrix):
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+
+
+def _resize(matrix, shape):
+    # Same entries in a larger shape, without copying them: new rows are empty, new columns unused
+    indptr = np.concatenate([matrix.indptr, np.full(shape[0] - matrix.shape[0], matrix.indptr[-1])])
+    return sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape)
+
+
+def _placed(rows, positions, n_rows):
+    # rows moved to the given row positions of an n_rows tall matrix
+    place = sparse.csr_matrix((np.ones(len(positions)), (positions, np.arange(len(positions)))),
+                              shape=(n_rows, len(positions)))
+    return place.dot(rows)
+
+
+def _append_new(index, ids):
+    new = pd.Index(pd.unique(ids)).difference(index)
+    return index.append(new) if len(new) else index
@@ -0,0 +1,97 @@
+# models/recommendation/top_n_table.py
+
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# On-disk layout: one directory holding plain .npy arrays so they can be memory-mapped
+#   user_ids.npy     (n_users,)         user ids, row order of products.npy
+#   product_ids.npy  (n_products,)      product ids referenced by position
+#   products.npy     (n_users, top_n)   int32 product positions, -1 padded
+#   meta.json        top_n, source file and its mtime at build time
+
+
+class TopNTable:
+    def __init__(self, user_ids, product_ids, products, meta):
+        self.user_ids = pd.Index(user_ids)
+        self.product_ids = product_ids
+        self.products = products
+        self.meta = meta
+        self.top_n = meta['top_n']
+
+    @classmethod
+    def load(cls, path, source_file=None):
+        """Memory-map a table; returns None if missing or built from an older source file."""
+        meta_file = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if source_file is not None and meta.get('source_mtime') != os.path.getmtime(source_file):
+            return None
+        return cls(
+            np.load(os.path.join(path, 'user_ids.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'product_ids.npy'), mmap_mode='r', allow_pickle=False),
+            np.load(os.path.join(path, 'products.npy'), mmap_mode='r'),
+            meta
+        )
+
+    def get(self, user_id, top_n=5):
+        """Precomputed recommendations, or None if the table cannot answer."""
+        # The neighbour walk stops at a depth that depends on top_n, so a top-20 list
+        # is not a top-5 list with extra items; only exact sizes are served.
+        if top_n != self.top_n or user_id not in self.user_ids:
+            return None
+        row = self.products[self.user_ids.get_loc(user_id)]
+        row = row[row >= 0]
+        return self.product_ids[row].tolist()
+
+
+def precompute_top_n(model, path, top_n=5, batch_size=1024, source_file=None):
+    user_ids = np.asarray(model.all_user_ids())
+    product_ids = model.interactions.product_ids
+    products = np.full((len(user_ids), top_n), -1, dtype=np.int32)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size].tolist()
+        results = model.recommend_batch(batch, top_n)
+        for offset, user_id in enumerate(batch):
+            positions = product_ids.get_indexer(results[user_id])
+            products[start + offset, :len(positions)] = positions
+
+    os.makedirs(path, exist_ok=True)
+    meta_file = os.path.join(path, 'meta.json')
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+    np.save(os.path.join(path, 'user_ids.npy'), _plain_array(user_ids))
+    np.save(os.path.join(path, 'product_ids.npy'), _plain_array(product_ids))
+    np.save(os.path.join(path, 'products.npy'), products)
+    meta = {'top_n': top_n, 'n_users': len(user_ids)}
+    if source_file is not None:
+        meta['source_file'] = source_file
+        meta['source_mtime'] = os.path.getmtime(source_file)
+    # meta.json last: its presence marks a complete table
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f)
+
+
+def _plain_array(ids):
+    # Object arrays cannot be memory-mapped; string ids are stored as fixed-width unicode
+    ids = np.asarray(ids)
+    return ids.astype(str) if ids.dtype == object else ids
+
+
+if __name__ == '__main__':
+    from models.recommendation.model import RecommendationModel
+
+    parser = argparse.ArgumentParser(description='Precompute every user\'s top-N recommendations')
+    parser.add_argument('--interactions', default='data/interactions.csv')
+    parser.add_argument('--output', default='data/top_n')
+    parser.add_argument('--top-n', type=int, default=5)
+    args = parser.parse_args()
+
+    model = RecommendationModel()
+    model.build_user_product_matrix(pd.read_csv(args.interactions))
+    precompute_top_n(model, args.output, top_n=args.top_n, source_file=args.interactions)
+    print(f"Top-{args.top_n} table for {len(model.all_user_ids())} users written to {args.output}")